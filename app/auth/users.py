@@ -11,6 +11,10 @@ from sqlalchemy.orm import Session
 from app.models.user import User
 from app.db.database import get_db
 from app.config import settings
+from app.logging_config import bind_request_context
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Configurar bcrypt para no lanzar error con >72 bytes y truncar de forma segura
 pwd_context = CryptContext(
@@ -28,7 +32,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         # PBKDF2-SHA256: verificar directamente con passlib handler
         if isinstance(hashed_password, str) and hashed_password.startswith("$pbkdf2-sha256$"):
             result = pbkdf2_sha256.verify(plain_password, hashed_password)
-            print(f"[VERIFY] scheme=pbkdf2_sha256, plain_len={len(plain_password)}, result={result}")
+            logger.debug("verify_password", extra={"scheme": "pbkdf2_sha256", "result": result})
             return result
 
         # bcrypt: usar la librería bcrypt directamente y truncar a 72 bytes en bytes
@@ -37,20 +41,18 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
             b72 = b[:72]
             try:
                 ok = bcrypt.checkpw(b72, hashed_password.encode('utf-8'))
-                print(f"[VERIFY] scheme=bcrypt, plain_len={len(plain_password)}, used_len={len(b72)}, result={ok}")
+                logger.debug("verify_password", extra={"scheme": "bcrypt", "truncated": len(b) > 72, "result": ok})
                 return ok
             except Exception as e:
-                print(f"[VERIFY][bcrypt error] {e}")
+                logger.warning("verify_password: error de bcrypt", extra={"error": str(e)})
                 return False
 
         # Fallback general a passlib (otros esquemas)
         result = pwd_context.verify(plain_password, hashed_password)
-        print(f"[VERIFY] scheme=passlib_fallback, plain_len={len(plain_password)}, result={result}")
+        logger.debug("verify_password", extra={"scheme": "passlib_fallback", "result": result})
         return result
-    except Exception as e:
-        print(f"[VERIFY][ERROR] {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("verify_password: error inesperado")
         return False
 
 def get_password_hash(password: str) -> str:
@@ -64,10 +66,7 @@ def get_password_hash(password: str) -> str:
         except UnicodeDecodeError:
             p72 = b72.decode('utf-8', errors='ignore')
         # Debug suave para diagnosticar problemas puntuales de longitud
-        try:
-            print(f"[PWD_HASH] len_bytes_orig={orig_len} len_bytes_trunc={len(b72)} text_len={len(p72)}")
-        except Exception:
-            pass
+        logger.debug("get_password_hash", extra={"len_bytes": orig_len, "truncated": orig_len > 72})
     try:
         # Si la contraseña supera 72 bytes, usar PBKDF2-SHA256 para evitar límites de bcrypt
         if orig_len > 72:
@@ -76,10 +75,7 @@ def get_password_hash(password: str) -> str:
         return pwd_context.hash(p72)
     except Exception as e:
         # Fallback explícito si alguna configuración de backend lanza error por longitud
-        try:
-            print(f"[PWD_HASH][fallback] Using bcrypt_hash. Cause: {e}")
-        except Exception:
-            pass
+        logger.warning("get_password_hash: usando bcrypt_hash como fallback", extra={"error": str(e)})
         try:
             return bcrypt_hash.using(truncate_error=False).hash(p72)
         except Exception:
@@ -105,21 +101,16 @@ def get_user_by_username(db: Session, username: str):
 def authenticate_user(db: Session, username: str, password: str):
     user = get_user_by_username(db, username)
     try:
-        print(f"[AUTH] lookup username={username!r} -> {'FOUND' if user else 'NONE'}")
+        logger.debug("authenticate_user: lookup", extra={"found": user is not None})
         if not user:
             return False
-        # Diagnóstico detallado para producción
-        print(f"[AUTH] user.hashed_password[:20]={user.hashed_password[:20] if user.hashed_password else 'NONE'}")
-        print(f"[AUTH] password length={len(password)}, first_char={password[0] if password else 'EMPTY'}")
         ok = verify_password(password, user.hashed_password)
-        print(f"[AUTH] verify_password returned: {ok}")
+        logger.debug("authenticate_user: verify", extra={"result": ok})
         if not ok:
             return False
         return user
-    except Exception as e:
-        print(f"[AUTH][ERROR] {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("authenticate_user: error inesperado")
         return False
 
 async def get_current_user(
@@ -155,6 +146,7 @@ async def get_current_user(
     user = get_user_by_username(db, username=username)
     if user is None:
         raise credentials_exception
+    bind_request_context(user=user.username)
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
@@ -25,4 +25,67 @@ class Settings(BaseSettings):
     snowflake_warehouse: str = "COMPUTE_WH"
     snowflake_role: str = "ACCOUNTADMIN"
 
+    # Migración: `python -m app.db.bootstrap`. Con AUTO_MIGRATE=false (producción)
+    # los workers sólo verifican la versión del esquema al arrancar
+    auto_migrate: bool = True
+    sqlite_busy_timeout_ms: int = 5000
+
+    # Token opcional para proteger /metrics (Authorization: Bearer <token>)
+    metrics_token: str = ""
+
+    # Logging estructurado (LOG_FORMAT=json|text, LOG_LEVELS="app.auth=DEBUG,...")
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_levels: str = ""
+    log_sample_burst: int = 10
+    log_sample_period_seconds: float = 60.0
+
+    # Registro de consultas lentas (/debug/slow-queries)
+    slow_query_ms: float = 100.0
+    slow_query_buffer_size: int = 200
+
+    # Archivo de meses fríos (ARCHIVE_RETENTION_MONTHS=0 lo desactiva)
+    archive_dir: str = str(Path(__file__).parent.parent / "archive")
+    archive_retention_months: int = 0
+    archive_batch_size: int = 20000
+
+    # Zona horaria por defecto para agrupar tendencias (fecha_hora se guarda en UTC)
+    report_timezone: str = "UTC"
+
+    # Caché de POST /reports/query (por consulta normalizada + marca de agua de datos)
+    report_query_cache_size: int = 256
+    report_query_cache_ttl_seconds: int = 300
+
+    # Compresión de respuestas y estáticos precomprimidos al arrancar
+    compression_min_size: int = 500
+    static_precompress: bool = True
+
+    # Latido de /reports/stream (SSE) para detectar clientes desconectados
+    sse_heartbeat_seconds: float = 15.0
+
+    # Perfilado bajo demanda (X-Profile: 1, sólo administradores)
+    profiling_interval_ms: int = 5
+
+    # Evaluación incremental de alertas (scheduler)
+    alert_eval_interval_seconds: int = 60
+    # Bajo umbral_critico la alerta es "critica" por debajo de este % y "alta" por encima;
+    # entre umbral_critico y umbral_advertencia es "advertencia"
+    alert_critica_below: float = 50.0
+
+    # Motor de anomalías sobre el rollup diario (línea base + ventana evaluada)
+    anomaly_interval_minutes: int = 15
+    anomaly_baseline_days: int = 60
+    anomaly_eval_days: int = 14
+    anomaly_min_daily_total: int = 5
+    anomaly_ewma_lambda: float = 0.2
+    anomaly_ewma_limit: float = 3.0
+    anomaly_cusum_k: float = 0.5
+    anomaly_cusum_h: float = 5.0
+    anomaly_z_threshold: float = 3.0
+
+    # Precalentado de resúmenes de voz
+    voice_warm_interval_minutes: int = 10
+    voice_warm_max_age_minutes: int = 60
+    voice_warm_daily_char_budget: int = 20000
+
 settings = Settings()
\ No newline at end of file
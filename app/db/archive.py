@@ -0,0 +1,343 @@
+"""
+Particionado mensual y archivo de meses fríos de checklist_facts.
+
+El mes de ``fecha_hora`` es la clave de partición. Los meses anteriores a
+la ventana de retención (``ARCHIVE_RETENTION_MONTHS``) se exportan a un CSV
+comprimido por mes (zstd si está instalado ``zstandard``, si no gzip) en
+``ARCHIVE_DIR``, se registran en ``archive_partitions`` (con el último id
+exportado) y se borran de la base por lotes sin pasar de ese id: las filas
+que llegan durante el archivado quedan para la siguiente corrida. El espacio liberado se reutiliza, así que el archivo SQLite
+deja de crecer; ``--vacuum`` además lo compacta.
+
+Consultas: ``include_archived(db, desde, hasta)`` carga los meses archivados
+que se solapan con el rango en una tabla TEMP de la conexión y crea una
+vista TEMP ``checklist_entries`` (hot UNION ALL archivo) que tapa a la de
+``main``; las consultas ORM existentes los incluyen sin cambios. Sólo los
+rangos explícitos que tocan meses archivados pagan el costo de descomprimir.
+
+    python -m app.db.archive --retention-months 12 [--dry-run] [--vacuum]
+"""
+import argparse
+import csv
+import gzip
+import hashlib
+import io
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+from fastapi import Depends, Request
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.db.database import engine as default_engine, get_db
+from app.db.locks import file_lock, lock_path_for
+from app.models.archive import ArchivePartitionSQL
+
+try:
+    import zstandard
+except ImportError:  # opcional: sin él se archiva con gzip
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS = ["id", "fecha_hora", "area", "turno", "protocolo_etapa", "item", "cumple", "observaciones", "usuario", "metadatos"]
+NULLABLES = {"observaciones", "usuario", "metadatos"}
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+PERIODOS_DIAS = {"7d": 7, "30d": 30, "90d": 90}
+
+
+def month_bounds(mes: str) -> Tuple[datetime, datetime]:
+    inicio = datetime.strptime(mes, "%Y-%m")
+    fin = (inicio + timedelta(days=32)).replace(day=1)
+    return inicio, fin
+
+
+def retention_cutoff(retention_months: int, now: Optional[datetime] = None) -> datetime:
+    """Primer día del mes más antiguo que se conserva en la base"""
+    now = now or datetime.utcnow()
+    total = now.year * 12 + (now.month - 1) - retention_months
+    return datetime(total // 12, total % 12 + 1, 1)
+
+
+def _archive_path(mes: str) -> Path:
+    ext = "zst" if zstandard is not None else "gz"
+    return Path(settings.archive_dir) / f"checklist_entries_{mes}.csv.{ext}"
+
+
+@contextmanager
+def _open_text(path: Path, mode: str) -> Iterator[io.TextIOBase]:
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"{path.name} requiere el paquete zstandard")
+        with open(path, mode + "b") as raw:
+            if mode == "w":
+                stream = zstandard.ZstdCompressor(level=10).stream_writer(raw)
+            else:
+                stream = zstandard.ZstdDecompressor().stream_reader(raw)
+            with io.TextIOWrapper(stream, encoding="utf-8", newline="") as f:
+                yield f
+    else:
+        with gzip.open(path, mode + "t", encoding="utf-8", newline="", compresslevel=9) as f:
+            yield f
+
+
+def read_archive(path: Path) -> Iterator[tuple]:
+    with _open_text(path, "r") as f:
+        lector = csv.reader(f)
+        next(lector, None)  # encabezado
+        for fila in lector:
+            yield tuple(
+                None if (v == "" and c in NULLABLES) else v
+                for c, v in zip(COLUMNAS, fila)
+            )
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def archivable_months(engine: Engine, retention_months: int, now: Optional[datetime] = None) -> List[str]:
+    """Meses con filas en checklist_facts anteriores a la ventana de retención"""
+    cutoff = retention_cutoff(retention_months, now)
+    with engine.connect() as conn:
+        minimo = conn.execute(text("SELECT MIN(fecha_hora) FROM checklist_facts")).scalar()
+        if minimo is None:
+            return []
+        if isinstance(minimo, str):
+            minimo = datetime.fromisoformat(minimo)
+        meses = []
+        actual = minimo.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        while actual < cutoff:
+            inicio, fin = month_bounds(actual.strftime("%Y-%m"))
+            hay = conn.execute(text(
+                "SELECT 1 FROM checklist_facts WHERE fecha_hora >= :d AND fecha_hora < :h LIMIT 1"
+            ), {"d": inicio.strftime(FORMATO_FECHA), "h": fin.strftime(FORMATO_FECHA)}).first()
+            if hay:
+                meses.append(actual.strftime("%Y-%m"))
+            actual = fin
+    return meses
+
+
+def export_month(engine: Engine, mes: str) -> dict:
+    """
+    Escribe el mes (con nombres legibles) a un CSV comprimido. Si el mes ya
+    estaba archivado (llegaron filas tardías, p. ej. sync offline) el nuevo
+    archivo combina las filas archivadas con las nuevas (id > max_id previo).
+    """
+    inicio, fin = month_bounds(mes)
+    destino = _archive_path(mes)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_name(destino.name + ".tmp")
+
+    with engine.connect() as conn:
+        registro = conn.execute(
+            text("SELECT path, max_id FROM archive_partitions WHERE mes = :mes"), {"mes": mes}
+        ).first()
+    previa, max_id = (registro[0], registro[1] or 0) if registro else (None, 0)
+    anteriores = read_archive(Path(settings.archive_dir) / previa) if previa else iter(())
+
+    filas = 0
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(
+            f"SELECT {', '.join(COLUMNAS)} FROM main.checklist_entries "
+            "WHERE fecha_hora >= ? AND fecha_hora < ? AND id > ? ORDER BY id",
+            (inicio.strftime(FORMATO_FECHA), fin.strftime(FORMATO_FECHA), max_id)
+        )
+        with _open_text(tmp, "w") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(COLUMNAS)
+            for fila in anteriores:
+                escritor.writerow(fila)
+                filas += 1
+            while True:
+                lote = cursor.fetchmany(5000)
+                if not lote:
+                    break
+                escritor.writerows(lote)
+                filas += len(lote)
+                max_id = lote[-1][0]
+        cursor.close()
+    finally:
+        raw.close()
+
+    os.replace(tmp, destino)
+    info = {
+        "mes": mes,
+        "path": destino.name,
+        "filas": filas,
+        "desde": inicio,
+        "hasta": fin,
+        "sha256": _sha256(destino),
+        "bytes": destino.stat().st_size,
+        "max_id": max_id,
+    }
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM archive_partitions WHERE mes = :mes"), {"mes": mes})
+        conn.execute(ArchivePartitionSQL.__table__.insert(), [{**info, "created_at": datetime.utcnow()}])
+    if previa and previa != destino.name:
+        (Path(settings.archive_dir) / previa).unlink(missing_ok=True)
+    return info
+
+
+def purge_month(engine: Engine, mes: str, batch_size: int = 20000, pause_seconds: float = 0.05) -> int:
+    """
+    Borra de checklist_facts las filas exportadas del mes (id <= max_id del
+    archivo) por lotes cortos, cediendo el lock de escritura entre lotes.
+    """
+    inicio, fin = month_bounds(mes)
+    with engine.connect() as conn:
+        max_id = conn.execute(
+            text("SELECT max_id FROM archive_partitions WHERE mes = :mes"), {"mes": mes}
+        ).scalar()
+    params = {"d": inicio.strftime(FORMATO_FECHA), "h": fin.strftime(FORMATO_FECHA), "max_id": max_id or 0, "n": batch_size}
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            borradas = conn.execute(text(
+                "DELETE FROM checklist_facts WHERE id IN ("
+                "SELECT id FROM checklist_facts WHERE fecha_hora >= :d AND fecha_hora < :h AND id <= :max_id LIMIT :n)"
+            ), params).rowcount
+        total += borradas
+        if borradas < batch_size:
+            break
+        time.sleep(pause_seconds)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE archive_partitions SET purgado = :ahora WHERE mes = :mes"),
+                     {"ahora": datetime.utcnow(), "mes": mes})
+    return total
+
+
+def archive_old_months(
+    engine: Engine = default_engine,
+    retention_months: Optional[int] = None,
+    dry_run: bool = False,
+    vacuum: bool = False,
+) -> List[dict]:
+    retention = settings.archive_retention_months if retention_months is None else retention_months
+    if retention <= 0:
+        return []
+    resultados = []
+    with file_lock(lock_path_for(str(engine.url), "archive"), timeout=5):
+        for mes in archivable_months(engine, retention):
+            if dry_run:
+                resultados.append({"mes": mes, "dry_run": True})
+                continue
+            inicio = time.perf_counter()
+            info = export_month(engine, mes)
+            # Verificar el archivo antes de borrar nada de la base
+            if sum(1 for _ in read_archive(Path(settings.archive_dir) / info["path"])) != info["filas"]:
+                raise RuntimeError(f"Archivo de {mes} inconsistente; no se purga")
+            info["purgadas"] = purge_month(engine, mes, batch_size=settings.archive_batch_size)
+            info["duration_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+            logger.info("mes archivado", extra={k: v for k, v in info.items() if k not in ("desde", "hasta")})
+            resultados.append(info)
+        if vacuum and resultados and not dry_run and engine.dialect.name == "sqlite":
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.exec_driver_sql("VACUUM")
+    return resultados
+
+
+def overlapping_partitions(db: Session, desde: Optional[datetime], hasta: Optional[datetime]) -> List[ArchivePartitionSQL]:
+    query = db.query(ArchivePartitionSQL)
+    if desde is not None:
+        query = query.filter(ArchivePartitionSQL.hasta > desde)
+    if hasta is not None:
+        query = query.filter(ArchivePartitionSQL.desde <= hasta)
+    return query.order_by(ArchivePartitionSQL.mes).all()
+
+
+@contextmanager
+def include_archived(db: Session, desde: Optional[datetime], hasta: Optional[datetime]):
+    """Hacer visibles en checklist_entries los meses archivados del rango, sólo en esta sesión"""
+    particiones = overlapping_partitions(db, desde, hasta)
+    if not particiones:
+        yield db
+        return
+    # Conexión DBAPI de la sesión: los objetos TEMP viven en ella hasta que se borran
+    raw = db.connection().connection
+    cursor = raw.cursor()
+    try:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS checklist_archive ("
+            "id INTEGER, fecha_hora DATETIME, area VARCHAR, turno VARCHAR, protocolo_etapa VARCHAR, "
+            "item VARCHAR, cumple BOOLEAN, observaciones VARCHAR, usuario VARCHAR, metadatos JSON)"
+        )
+        sql = f"INSERT INTO temp.checklist_archive VALUES ({', '.join('?' * len(COLUMNAS))})"
+        for particion in particiones:
+            cursor.executemany(sql, read_archive(Path(settings.archive_dir) / particion.path))
+        cursor.execute(
+            "CREATE TEMP VIEW IF NOT EXISTS checklist_entries AS "
+            "SELECT * FROM main.checklist_entries UNION ALL SELECT * FROM temp.checklist_archive"
+        )
+        raw.commit()
+        yield db
+    finally:
+        cursor.execute("DROP VIEW IF EXISTS temp.checklist_entries")
+        cursor.execute("DROP TABLE IF EXISTS temp.checklist_archive")
+        raw.commit()
+        cursor.close()
+
+
+def _fecha(valor: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def archive_scope(default_periodo: Optional[str] = None):
+    """
+    Dependencia que entrega la sesión con los meses archivados del rango de
+    la petición (desde/hasta, o periodo=7d/30d/90d relativo a hoy). Sin rango
+    ni periodo sólo se consulta la ventana caliente: el archivo se pide con
+    desde/hasta explícitos.
+
+    En la firma del endpoint va después de ``conditional()``: FastAPI resuelve
+    las dependencias en orden, así un 304 no descomprime ningún mes.
+    """
+    def dependency(request: Request, db: Session = Depends(get_db)):
+        params = request.query_params
+        desde, hasta = _fecha(params.get("desde")), _fecha(params.get("hasta"))
+        periodo = params.get("periodo") or default_periodo
+        if desde is None and hasta is None and not periodo:
+            yield db
+            return
+        if desde is None and periodo:
+            desde = datetime.now() - timedelta(days=PERIODOS_DIAS.get(periodo, 7))
+        with include_archived(db, desde, hasta):
+            yield db
+
+    return dependency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivar meses fríos de checklist en archivos comprimidos")
+    parser.add_argument("--retention-months", type=int, default=None,
+                        help="Meses que se conservan en la base (por defecto ARCHIVE_RETENTION_MONTHS)")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--vacuum", action="store_true", help="Compactar el archivo SQLite al terminar")
+    args = parser.parse_args()
+
+    resultados = archive_old_months(retention_months=args.retention_months, dry_run=args.dry_run, vacuum=args.vacuum)
+    if not resultados:
+        print("Nada que archivar")
+    for r in resultados:
+        if r.get("dry_run"):
+            print(f"  {r['mes']}  (se archivaría)")
+        else:
+            print(f"  {r['mes']}  {r['filas']:>9,} filas  {r['bytes'] / 1024:>9,.0f} KB  {r['path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Migración/bootstrap de la base de datos, separado del arranque de la app.
+
+    python -m app.db.bootstrap           # aplica migraciones pendientes, WAL y admin por defecto
+    python -m app.db.bootstrap --check   # sólo verifica la versión (código 1 si no coincide)
+    python -m app.db.bootstrap --status  # migraciones aplicadas y pendientes
+
+Se ejecuta una vez por despliegue antes de lanzar gunicorn, protegido por
+un lock de archivo para que dos procesos nunca migren a la vez. Los workers
+sólo verifican que la versión del esquema coincida con SCHEMA_VERSION, de
+modo que pueden arrancar N en paralelo sin carreras en create_all ni en la
+creación del admin.
+"""
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import func, inspect, text
+from sqlalchemy.engine import Engine
+from app.config import settings
+from app.db.database import engine as default_engine, SessionLocal
+from app.db.locks import file_lock, lock_path_for
+from app.db.migrations import MigrationContext, discover, latest_version
+from app.models.user import User
+from app.models.schema_version import SchemaVersionSQL
+
+logger = logging.getLogger(__name__)
+
+# Versión esperada por este código: la última migración de app/db/migrations
+SCHEMA_VERSION = latest_version()
+
+# Hash precomputado de "Admin123!" (bcrypt $2b$12)
+DEFAULT_ADMIN_HASH = "$2b$12$stqmrbQjNtvsb.HqdDcnbeYPo853D3o.N.Lti6dwyQ2YSDn5pKqmS"
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def current_version(engine: Engine) -> int:
+    if not inspect(engine).has_table(SchemaVersionSQL.__tablename__):
+        return 0
+    with engine.connect() as conn:
+        return conn.execute(
+            text(f"SELECT COALESCE(MAX(version), 0) FROM {SchemaVersionSQL.__tablename__}")
+        ).scalar_one()
+
+
+def enable_wal(engine: Engine) -> Optional[str]:
+    """WAL es persistente en el archivo: lectores concurrentes con un escritor entre workers"""
+    if engine.dialect.name != "sqlite":
+        return None
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA journal_mode=WAL").scalar()
+
+
+def ensure_default_admin(session_factory=SessionLocal) -> bool:
+    """Crear admin / Admin123! si no hay ningún usuario (arranque limpio)"""
+    db = session_factory()
+    try:
+        if db.query(func.count(User.id)).scalar():
+            return False
+        db.add(User(
+            username="admin",
+            email="admin@medcheck.com",
+            hashed_password=DEFAULT_ADMIN_HASH,
+            full_name="Administrador del Sistema",
+            is_active=True,
+            is_admin=True,
+        ))
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+def migrate(engine: Engine = default_engine, session_factory=SessionLocal, lock_timeout: float = 120.0) -> dict:
+    lock = lock_path_for(str(engine.url), "migrate")
+    with file_lock(lock, timeout=lock_timeout):
+        antes = current_version(engine)
+        if antes > SCHEMA_VERSION:
+            raise SchemaVersionError(
+                f"La base está en la versión {antes} y este código espera {SCHEMA_VERSION}: despliegue más nuevo ya migró"
+            )
+        journal_mode = enable_wal(engine)
+        # La tabla de versiones existe antes de la primera migración
+        SchemaVersionSQL.__table__.create(bind=engine, checkfirst=True)
+        ctx = MigrationContext(engine)
+        aplicadas = []
+        for migracion in discover():
+            if migracion.version <= antes:
+                continue
+            inicio = time.perf_counter()
+            migracion.upgrade(ctx)
+            # Se registra cada una: si la siguiente falla, no se repite ésta
+            db = session_factory()
+            try:
+                db.add(SchemaVersionSQL(
+                    version=migracion.version, descripcion=migracion.description, applied_at=datetime.utcnow()
+                ))
+                db.commit()
+            finally:
+                db.close()
+            aplicadas.append(migracion.version)
+            logger.info("migración", extra={
+                "version": migracion.version, "descripcion": migracion.description,
+                "duration_ms": round((time.perf_counter() - inicio) * 1000, 1)
+            })
+        admin_creado = ensure_default_admin(session_factory)
+    resultado = {
+        "from_version": antes,
+        "to_version": SCHEMA_VERSION,
+        "applied": aplicadas,
+        "journal_mode": journal_mode,
+        "admin_created": admin_creado,
+    }
+    logger.info("migración aplicada", extra=resultado)
+    return resultado
+
+
+def check_schema(engine: Engine = default_engine):
+    """Verificación barata para el arranque de cada worker"""
+    version = current_version(engine)
+    if version != SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"Esquema en versión {version}, se esperaba {SCHEMA_VERSION}. "
+            "Ejecute `python -m app.db.bootstrap` antes de iniciar la app"
+        )
+    return version
+
+
+def ensure_schema(engine: Engine = default_engine) -> int:
+    """
+    Arranque: verificar la versión; si no coincide y AUTO_MIGRATE está activo
+    (desarrollo local) migrar bajo el lock, si no, fallar sin tocar la base.
+    """
+    try:
+        return check_schema(engine)
+    except SchemaVersionError:
+        if not settings.auto_migrate:
+            raise
+    return migrate(engine)["to_version"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migración/bootstrap de la base de datos de MedCheck")
+    parser.add_argument("--check", action="store_true", help="Sólo verificar la versión del esquema")
+    parser.add_argument("--status", action="store_true", help="Listar migraciones aplicadas y pendientes")
+    parser.add_argument("--lock-timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    try:
+        if args.check:
+            print(f"Esquema en versión {check_schema()}")
+            return
+        if args.status:
+            actual = current_version(default_engine)
+            for migracion in discover():
+                estado = "aplicada " if migracion.version <= actual else "pendiente"
+                print(f"  {migracion.version:04d}  {estado}  {migracion.description}")
+            return
+        resultado = migrate(lock_timeout=args.lock_timeout)
+    except (SchemaVersionError, TimeoutError) as e:
+        print(f"[bootstrap] {e}", file=sys.stderr)
+        sys.exit(1)
+    print(
+        f"Esquema {resultado['from_version']} -> {resultado['to_version']}"
+        f" (aplicadas: {resultado['applied'] or 'ninguna'})"
+        f" (journal_mode={resultado['journal_mode']}, admin creado: {resultado['admin_created']})"
+    )
+
+
+if __name__ == "__main__":
+    main()
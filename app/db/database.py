@@ -1,13 +1,40 @@
-from sqlalchemy import create_engine
-from sqlalchemy.exc import OperationalError
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from app.models.user import Base
 # Importar modelos para registrarlos en la metadata (no borrar)
-from app.models.checklist_entry import ChecklistEntrySQL  # noqa: F401
+from app.models.checklist_entry import ChecklistEntrySQL, ChecklistFactSQL, ChecklistSubmissionSQL  # noqa: F401
+from app.models.dimensions import DimAreaSQL, DimTurnoSQL, DimEtapaSQL, DimItemSQL, DimUsuarioSQL  # noqa: F401
+from app.models.alert_config import AlertConfigSQL, AlertHistorySQL, AlertWatermarkSQL, AlertSnapshotSQL  # noqa: F401
+from app.models.schema_version import SchemaVersionSQL  # noqa: F401
+from app.models.archive import ArchivePartitionSQL  # noqa: F401
+from app.models.anomaly import ChecklistDailySQL, AnomalySQL  # noqa: F401
+from app.models.voice import VoiceBudgetSQL  # noqa: F401
 from app.config import settings
+from app.db.query_metrics import instrument_engine
+from app.db.slow_query_log import SlowQueryLog, instrument_slow_queries
 
 # Crear base engine SQLite
 engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
+instrument_engine(engine)
+
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        # Varios workers escribiendo: esperar el lock en vez de fallar con "database is locked".
+        # journal_mode=WAL lo fija el bootstrap (persiste en el archivo); con WAL basta synchronous=NORMAL
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+# Consultas por encima del umbral, con su plan de ejecución
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.slow_query_ms,
+    max_records=settings.slow_query_buffer_size
+)
+instrument_slow_queries(engine, slow_query_log)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Dependencia para obtener la sesión de DB
@@ -21,22 +48,8 @@ def get_db():
 # Crear tablas
 def create_tables():
     """
-    Crea las tablas si no existen.
-    En despliegues con múltiples workers puede ocurrir una condición de carrera
-    durante create_all(); si otro worker ya creó la tabla, ignoramos el error
-    "table already exists" para no tumbar el servicio.
+    Crea/actualiza el esquema aplicando las migraciones pendientes bajo lock
+    (ver app/db/bootstrap.py). Se conserva para los scripts que la usan.
     """
-    try:
-        # checkfirst=True es el valor por defecto, pero dejamos claro el intento
-        Base.metadata.create_all(bind=engine, checkfirst=True)
-    except OperationalError as e:
-        msg = str(e).lower()
-        if "already exists" in msg or "exists" in msg:
-            # Otro worker ganó la carrera; continuar normalmente
-            print("[DB] Tablas ya existen (race condition resuelta). Continuando…")
-        else:
-            # Registrar y continuar para no bloquear el arranque
-            print(f"[DB][warn] Error en create_all: {e}")
-    except Exception as e:
-        # Cualquier otro error no-critico tampoco debería tumbar la app en arranque
-        print(f"[DB][warn] Excepción inesperada en create_all: {e}")
\ No newline at end of file
+    from app.db.bootstrap import migrate
+    migrate()
@@ -0,0 +1,96 @@
+"""
+Caché en proceso de las tablas de dimensión (nombre <-> id).
+
+Las dimensiones sólo crecen (nunca se renombra ni borra un id), así que la
+caché no necesita invalidación: un worker que no conoce un nombre lo inserta
+con INSERT OR IGNORE (idempotente entre workers gracias al UNIQUE) y lee el
+id resultante. Las altas usan su propia conexión y se confirman aparte, por
+eso hay que resolver los ids antes de escribir en la sesión del request.
+"""
+import threading
+from typing import Dict, Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from app.db.database import engine
+from app.models.dimensions import DimAreaSQL, DimTurnoSQL, DimEtapaSQL, DimItemSQL, DimUsuarioSQL
+
+DIMENSIONS = {
+    "area": DimAreaSQL,
+    "turno": DimTurnoSQL,
+    "etapa": DimEtapaSQL,
+    "item": DimItemSQL,
+    "usuario": DimUsuarioSQL,
+}
+
+
+class DimensionCache:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._ids: Dict[str, Dict[str, int]] = {d: {} for d in DIMENSIONS}
+        self._names: Dict[str, Dict[int, str]] = {d: {} for d in DIMENSIONS}
+        self._lock = threading.Lock()
+
+    def _remember(self, dimension: str, filas: Iterable):
+        with self._lock:
+            for id_, nombre in filas:
+                self._ids[dimension][nombre] = id_
+                self._names[dimension][id_] = nombre
+
+    def ids(self, dimension: str, nombres: Iterable[str]) -> Dict[str, int]:
+        """nombre -> id, creando en una sola transacción los que falten"""
+        conocidos = self._ids[dimension]
+        faltantes = {n for n in nombres if n not in conocidos}
+        if faltantes:
+            tabla = DIMENSIONS[dimension].__table__
+            with self.engine.begin() as conn:
+                if self.engine.dialect.name == "sqlite":
+                    conn.execute(
+                        sqlite_insert(tabla).on_conflict_do_nothing(index_elements=["nombre"]),
+                        [{"nombre": n} for n in faltantes]
+                    )
+                else:
+                    existentes = set(conn.execute(select(tabla.c.nombre).where(tabla.c.nombre.in_(faltantes))).scalars())
+                    if faltantes - existentes:
+                        conn.execute(tabla.insert(), [{"nombre": n} for n in faltantes - existentes])
+                filas = conn.execute(select(tabla.c.id, tabla.c.nombre).where(tabla.c.nombre.in_(faltantes))).all()
+            self._remember(dimension, filas)
+        return {n: conocidos[n] for n in nombres}
+
+    def id(self, dimension: str, nombre: Optional[str]) -> Optional[int]:
+        if nombre is None:
+            return None
+        return self.ids(dimension, [nombre])[nombre]
+
+    def lookup(self, dimension: str, nombre: str) -> Optional[int]:
+        """id de un nombre existente, sin darlo de alta (filtros de consulta)"""
+        if nombre not in self._ids[dimension]:
+            tabla = DIMENSIONS[dimension].__table__
+            with self.engine.connect() as conn:
+                self._remember(dimension, conn.execute(
+                    select(tabla.c.id, tabla.c.nombre).where(tabla.c.nombre == nombre)
+                ).all())
+        return self._ids[dimension].get(nombre)
+
+    def name(self, dimension: str, id_: int) -> str:
+        nombre = self._names[dimension].get(id_)
+        if nombre is None:
+            # Id creado por otro worker: recargar la dimensión completa (son pocas filas)
+            self.load(dimension)
+            nombre = self._names[dimension][id_]
+        return nombre
+
+    def load(self, dimension: Optional[str] = None):
+        for d in [dimension] if dimension else DIMENSIONS:
+            tabla = DIMENSIONS[d].__table__
+            with self.engine.connect() as conn:
+                self._remember(d, conn.execute(select(tabla.c.id, tabla.c.nombre)).all())
+
+    def clear(self):
+        with self._lock:
+            for d in DIMENSIONS:
+                self._ids[d].clear()
+                self._names[d].clear()
+
+
+dimension_cache = DimensionCache(engine)
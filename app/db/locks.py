@@ -0,0 +1,81 @@
+"""
+Locks de archivo entre procesos (workers de gunicorn en el mismo host).
+
+El sistema operativo libera el lock si el proceso muere, así que no quedan
+locks huérfanos tras un crash. En POSIX usa fcntl.flock y en Windows
+msvcrt.locking (desarrollo local).
+"""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def lock_path_for(database_url: str, nombre: str) -> Path:
+    """Archivo de lock junto a la base SQLite (o en el tmp del sistema para otros motores)"""
+    if database_url.startswith("sqlite:///") and ":memory:" not in database_url:
+        db_file = Path(database_url[len("sqlite:///"):])
+        return db_file.with_name(f"{db_file.name}.{nombre}.lock")
+    return Path(tempfile.gettempdir()) / f"medcheck.{nombre}.lock"
+
+
+class FileLock:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                self._fd = fd
+                os.ftruncate(fd, 0)
+                os.write(fd, str(os.getpid()).encode())
+                return True
+            except OSError:
+                if not blocking or (limite is not None and time.monotonic() >= limite):
+                    os.close(fd)
+                    return False
+                time.sleep(0.1)
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+
+@contextmanager
+def file_lock(path: Path, timeout: Optional[float] = None):
+    lock = FileLock(path)
+    if not lock.acquire(blocking=True, timeout=timeout):
+        raise TimeoutError(f"No se obtuvo el lock {path} en {timeout} s")
+    try:
+        yield lock
+    finally:
+        lock.release()
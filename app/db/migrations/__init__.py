@@ -0,0 +1,158 @@
+"""
+Migraciones numeradas del esquema (sólo hacia adelante).
+
+Cada módulo ``mNNNN_descripcion.py`` de este paquete define::
+
+    VERSION = 2
+    DESCRIPTION = "índice (area, fecha_hora) en checklist_entries"
+
+    def upgrade(ctx: MigrationContext):
+        ctx.create_index("ix_checklist_entries_area_fecha_hora", "checklist_entries", ["area", "fecha_hora"])
+
+``python -m app.db.bootstrap`` aplica en orden las pendientes bajo el lock
+de migración y registra cada una en ``schema_version`` al terminarla, así
+que una migración interrumpida se reintenta sola en el siguiente despliegue.
+Las operaciones de MigrationContext son idempotentes (IF NOT EXISTS,
+columnas ya presentes) y los backfills avanzan por lotes de ids con una
+pausa entre lotes para no bloquear las escrituras de la app.
+"""
+import importlib
+import logging
+import pkgutil
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[["MigrationContext"], None]
+    module: str
+
+
+class MigrationContext:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+
+    def execute(self, sql: str, params: Optional[dict] = None):
+        with self.engine.begin() as conn:
+            return conn.execute(text(sql), params or {})
+
+    def has_table(self, table: str) -> bool:
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        return any(c["name"] == column for c in inspect(self.engine).get_columns(table))
+
+    def add_column(self, table: str, column: str, ddl: str):
+        """ALTER TABLE ADD COLUMN (en SQLite sólo toca el esquema, no reescribe filas)"""
+        if not self.has_column(table, column):
+            self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+    def create_index(self, name: str, table: str, columns: Sequence[str], unique: bool = False, where: Optional[str] = None):
+        """
+        Índice idempotente. En PostgreSQL se construye CONCURRENTLY (sin
+        bloquear escrituras); SQLite no tiene construcción en línea, así que
+        cada índice va en su propia transacción corta y se registra su duración.
+        """
+        inicio = time.perf_counter()
+        cols = ", ".join(columns)
+        tipo = "UNIQUE INDEX" if unique else "INDEX"
+        filtro = f" WHERE {where}" if where else ""
+        if self.dialect == "postgresql":
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.exec_driver_sql(f"CREATE {tipo} CONCURRENTLY IF NOT EXISTS {name} ON {table} ({cols}){filtro}")
+        else:
+            self.execute(f"CREATE {tipo} IF NOT EXISTS {name} ON {table} ({cols}){filtro}")
+        logger.info("índice creado", extra={"index": name, "duration_ms": round((time.perf_counter() - inicio) * 1000, 1)})
+
+    def drop_index(self, name: str):
+        self.execute(f"DROP INDEX IF EXISTS {name}")
+
+    def in_batches(
+        self,
+        table: str,
+        sql: str,
+        start: Optional[int] = None,
+        batch_size: int = 5000,
+        pause_seconds: float = 0.05,
+        key: str = "id",
+    ) -> int:
+        """
+        Ejecuta ``sql`` (con parámetros :inicio y :fin) sobre rangos de
+        ``key`` de ``table``: cada lote es una transacción corta y entre lotes
+        se cede el lock de escritura a la app. Devuelve las filas afectadas.
+        """
+        with self.engine.connect() as conn:
+            minimo, maximo = conn.execute(text(f"SELECT MIN({key}), MAX({key}) FROM {table}")).one()
+        if minimo is None:
+            return 0
+        inicio = max(minimo, start) if start is not None else minimo
+        total = 0
+        while inicio <= maximo:
+            fin = inicio + batch_size
+            with self.engine.begin() as conn:
+                total += max(conn.execute(text(sql), {"inicio": inicio, "fin": fin}).rowcount, 0)
+            logger.debug("lote", extra={"table": table, "hasta_id": fin, "filas": total})
+            inicio = fin
+            if pause_seconds:
+                time.sleep(pause_seconds)
+        return total
+
+    def backfill(
+        self,
+        table: str,
+        set_clause: str,
+        where: str,
+        batch_size: int = 5000,
+        pause_seconds: float = 0.05,
+        key: str = "id",
+    ) -> int:
+        """
+        UPDATE por lotes (ver in_batches). ``where`` debe excluir las filas ya
+        migradas (p. ej. ``nueva_col IS NULL``) para que un backfill
+        interrumpido continúe donde quedó.
+        """
+        total = self.in_batches(
+            table,
+            f"UPDATE {table} SET {set_clause} WHERE {key} >= :inicio AND {key} < :fin AND ({where})",
+            batch_size=batch_size, pause_seconds=pause_seconds, key=key
+        )
+        logger.info("backfill completo", extra={"table": table, "filas": total})
+        return total
+
+    def vacuum(self):
+        """Devolver al sistema las páginas liberadas (SQLite; fuera de transacción)"""
+        if self.dialect != "sqlite":
+            return
+        inicio = time.perf_counter()
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
+        logger.info("vacuum", extra={"duration_ms": round((time.perf_counter() - inicio) * 1000, 1)})
+
+
+def discover() -> List[Migration]:
+    """Migraciones del paquete ordenadas por versión (sin huecos ni duplicados)"""
+    migraciones = []
+    for info in pkgutil.iter_modules(__path__):
+        if not info.name.startswith("m") or not info.name[1:5].isdigit():
+            continue
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        migraciones.append(Migration(module.VERSION, module.DESCRIPTION, module.upgrade, info.name))
+    migraciones.sort(key=lambda m: m.version)
+    esperadas = list(range(1, len(migraciones) + 1))
+    if [m.version for m in migraciones] != esperadas:
+        raise RuntimeError(f"Versiones de migración inválidas: {[m.module for m in migraciones]}")
+    return migraciones
+
+
+def latest_version() -> int:
+    migraciones = discover()
+    return migraciones[-1].version if migraciones else 0
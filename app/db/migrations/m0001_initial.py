@@ -0,0 +1,10 @@
+"""Esquema inicial: todas las tablas e índices declarados en los modelos"""
+from app.models.user import Base
+
+VERSION = 1
+DESCRIPTION = "esquema inicial"
+
+
+def upgrade(ctx):
+    # Idempotente: en bases anteriores al sistema de migraciones sólo crea lo que falte
+    Base.metadata.create_all(bind=ctx.engine, checkfirst=True)
@@ -0,0 +1,11 @@
+"""Índice compuesto para los reportes filtrados por área y rango de fechas"""
+
+VERSION = 2
+DESCRIPTION = "índice (area, fecha_hora) en checklist_entries"
+
+
+def upgrade(ctx):
+    ctx.create_index("ix_checklist_entries_area_fecha_hora", "checklist_entries", ["area", "fecha_hora"])
+    if ctx.dialect == "sqlite":
+        # Estadísticas para que el planner elija el índice compuesto
+        ctx.execute("ANALYZE checklist_entries")
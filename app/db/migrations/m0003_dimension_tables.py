@@ -0,0 +1,123 @@
+"""
+Codificación por diccionario de checklist_entries.
+
+area, turno, protocolo_etapa, item y usuario pasan a tablas dim_* con ids
+enteros; los registros se copian por lotes a checklist_facts (sólo enteros,
+fecha y bool) y checklist_entries se reemplaza por una vista con los mismos
+nombres de columna, de modo que las consultas de lectura no cambian. Un
+trigger INSTEAD OF INSERT mantiene compatibles los INSERT directos a la vista.
+"""
+from sqlalchemy import text
+from app.models.checklist_entry import ChecklistFactSQL
+from app.models.dimensions import DimAreaSQL, DimTurnoSQL, DimEtapaSQL, DimItemSQL, DimUsuarioSQL
+
+VERSION = 3
+DESCRIPTION = "dimensiones enteras (dim_*) + checklist_facts; checklist_entries pasa a vista"
+
+COLUMNAS_DIM = [
+    ("dim_area", "area"),
+    ("dim_turno", "turno"),
+    ("dim_etapa", "protocolo_etapa"),
+    ("dim_item", "item"),
+    ("dim_usuario", "usuario"),
+]
+
+COPIA = """
+INSERT INTO checklist_facts
+    (id, fecha_hora, area_id, turno_id, etapa_id, item_id, cumple, observaciones, usuario_id, metadatos)
+SELECT e.id, e.fecha_hora, a.id, t.id, s.id, i.id, e.cumple, e.observaciones, u.id, e.metadatos
+FROM checklist_entries e
+JOIN dim_area a ON a.nombre = e.area
+JOIN dim_turno t ON t.nombre = e.turno
+JOIN dim_etapa s ON s.nombre = e.protocolo_etapa
+JOIN dim_item i ON i.nombre = e.item
+LEFT JOIN dim_usuario u ON u.nombre = e.usuario
+WHERE e.id >= :inicio AND e.id < :fin
+"""
+
+VISTA = """
+CREATE VIEW checklist_entries AS
+SELECT f.id AS id, f.fecha_hora AS fecha_hora, a.nombre AS area, t.nombre AS turno,
+       s.nombre AS protocolo_etapa, i.nombre AS item, f.cumple AS cumple,
+       f.observaciones AS observaciones, u.nombre AS usuario, f.metadatos AS metadatos
+FROM checklist_facts f
+JOIN dim_area a ON a.id = f.area_id
+JOIN dim_turno t ON t.id = f.turno_id
+JOIN dim_etapa s ON s.id = f.etapa_id
+JOIN dim_item i ON i.id = f.item_id
+LEFT JOIN dim_usuario u ON u.id = f.usuario_id
+"""
+
+TRIGGER = """
+CREATE TRIGGER checklist_entries_insert INSTEAD OF INSERT ON checklist_entries
+BEGIN
+    INSERT OR IGNORE INTO dim_area (nombre) VALUES (NEW.area);
+    INSERT OR IGNORE INTO dim_turno (nombre) VALUES (NEW.turno);
+    INSERT OR IGNORE INTO dim_etapa (nombre) VALUES (NEW.protocolo_etapa);
+    INSERT OR IGNORE INTO dim_item (nombre) VALUES (NEW.item);
+    INSERT OR IGNORE INTO dim_usuario (nombre) SELECT NEW.usuario WHERE NEW.usuario IS NOT NULL;
+    INSERT INTO checklist_facts
+        (id, fecha_hora, area_id, turno_id, etapa_id, item_id, cumple, observaciones, usuario_id, metadatos)
+    VALUES (
+        NEW.id,
+        COALESCE(NEW.fecha_hora, CURRENT_TIMESTAMP),
+        (SELECT id FROM dim_area WHERE nombre = NEW.area),
+        (SELECT id FROM dim_turno WHERE nombre = NEW.turno),
+        (SELECT id FROM dim_etapa WHERE nombre = NEW.protocolo_etapa),
+        (SELECT id FROM dim_item WHERE nombre = NEW.item),
+        COALESCE(NEW.cumple, 0),
+        NEW.observaciones,
+        (SELECT id FROM dim_usuario WHERE nombre = NEW.usuario),
+        NEW.metadatos
+    );
+END
+"""
+
+
+def _es_tabla(ctx) -> bool:
+    with ctx.engine.connect() as conn:
+        tipo = conn.execute(text(
+            "SELECT type FROM sqlite_master WHERE name = 'checklist_entries'"
+        )).scalar()
+    return tipo == "table"
+
+
+def upgrade(ctx):
+    if ctx.dialect != "sqlite":
+        raise RuntimeError("La migración 0003 (vista + trigger) sólo está implementada para SQLite")
+
+    tablas = [m.__table__ for m in (DimAreaSQL, DimTurnoSQL, DimEtapaSQL, DimItemSQL, DimUsuarioSQL, ChecklistFactSQL)]
+    for tabla in tablas:
+        tabla.create(bind=ctx.engine, checkfirst=True)
+
+    if not _es_tabla(ctx):
+        return  # ya convertida
+
+    # Diccionarios: DISTINCT resuelto por los índices de cada columna
+    for dim, columna in COLUMNAS_DIM:
+        ctx.execute(
+            f"INSERT OR IGNORE INTO {dim} (nombre) "
+            f"SELECT DISTINCT {columna} FROM checklist_entries WHERE {columna} IS NOT NULL"
+        )
+
+    # Copia por lotes, reanudable desde el último id ya copiado
+    with ctx.engine.connect() as conn:
+        ultimo = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM checklist_facts")).scalar()
+    ctx.in_batches("checklist_entries", COPIA, start=ultimo + 1, batch_size=50_000, pause_seconds=0.01)
+
+    # Recuperar lo escrito durante la copia y cambiar tabla por vista de forma atómica
+    with ctx.engine.begin() as conn:
+        ultimo = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM checklist_facts")).scalar()
+        for dim, columna in COLUMNAS_DIM:
+            conn.execute(text(
+                f"INSERT OR IGNORE INTO {dim} (nombre) "
+                f"SELECT DISTINCT {columna} FROM checklist_entries WHERE id > :ultimo AND {columna} IS NOT NULL"
+            ), {"ultimo": ultimo})
+        conn.execute(text(COPIA), {"inicio": ultimo + 1, "fin": 2 ** 62})
+        conn.execute(text("DROP TABLE checklist_entries"))
+        conn.execute(text(VISTA))
+        conn.execute(text(TRIGGER))
+
+    ctx.execute("ANALYZE")
+    # Reescribir el archivo sin las páginas de la tabla anterior
+    ctx.vacuum()
@@ -0,0 +1,9 @@
+"""Catálogo de meses archivados en archivos comprimidos"""
+from app.models.archive import ArchivePartitionSQL
+
+VERSION = 4
+DESCRIPTION = "archive_partitions (archivo mensual de checklist_facts)"
+
+
+def upgrade(ctx):
+    ArchivePartitionSQL.__table__.create(bind=ctx.engine, checkfirst=True)
@@ -0,0 +1,11 @@
+"""Rollup diario por serie y tabla de anomalías detectadas"""
+from app.models.anomaly import AnomalySQL, ChecklistDailySQL
+
+VERSION = 5
+DESCRIPTION = "checklist_daily (rollup) + anomalies"
+
+
+def upgrade(ctx):
+    # El rollup se llena de forma incremental en la primera pasada del motor de anomalías
+    ChecklistDailySQL.__table__.create(bind=ctx.engine, checkfirst=True)
+    AnomalySQL.__table__.create(bind=ctx.engine, checkfirst=True)
@@ -0,0 +1,9 @@
+"""Instantánea persistida de las alertas activas (compartida entre workers)"""
+from app.models.alert_config import AlertSnapshotSQL
+
+VERSION = 6
+DESCRIPTION = "alert_snapshots (alertas activas del evaluador líder)"
+
+
+def upgrade(ctx):
+    AlertSnapshotSQL.__table__.create(bind=ctx.engine, checkfirst=True)
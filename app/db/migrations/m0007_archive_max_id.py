@@ -0,0 +1,8 @@
+"""Último id exportado por mes archivado (la purga borra sólo lo exportado)"""
+
+VERSION = 7
+DESCRIPTION = "archive_partitions.max_id"
+
+
+def upgrade(ctx):
+    ctx.add_column("archive_partitions", "max_id", "INTEGER")
@@ -0,0 +1,9 @@
+"""Presupuesto diario de caracteres del precalentado de voz, persistido"""
+from app.models.voice import VoiceBudgetSQL
+
+VERSION = 8
+DESCRIPTION = "voice_budget (caracteres sintetizados por día)"
+
+
+def upgrade(ctx):
+    VoiceBudgetSQL.__table__.create(bind=ctx.engine, checkfirst=True)
@@ -0,0 +1,46 @@
+"""
+Hooks de SQLAlchemy para las métricas de consultas: histograma por
+operación, contadores por petición (current_db_stats, que abre
+MetricsMiddleware) y traza de sentencias del profiler (current_sql_trace).
+"""
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.metrics import DB_QUERY_DURATION, current_db_stats, current_sql_trace
+
+
+def instrument_engine(engine: Engine):
+    """Contar y cronometrar cada sentencia ejecutada por el engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start_time")
+        if not starts:
+            return
+        duracion = time.perf_counter() - starts.pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_DURATION.observe(duracion, operation=operation)
+        stats = current_db_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.duration += duracion
+        trace = current_sql_trace.get()
+        if trace is not None:
+            trace.append({
+                "statement": statement,
+                "duration_ms": round(duracion * 1000, 3),
+                "rowcount": cursor.rowcount,
+                "executemany": executemany,
+                "thread": threading.get_ident()
+            })
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
@@ -0,0 +1,191 @@
+"""
+Registro de consultas lentas con captura de EXPLAIN QUERY PLAN.
+
+Cada sentencia que supera el umbral se guarda (SQL normalizado, forma de
+los parámetros, duración, filas, ruta que la originó) en un buffer circular.
+El plan se obtiene una única vez por sentencia normalizada. Los agregados
+por sentencia son una LRU acotada (max_statements), igual que los planes.
+"""
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.logging_config import request_context
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+# VALUES (...), (...), ... de largo variable (INSERT multi-fila)
+_ROW_LIST = re.compile(r"(\(\?(?:\.\.\.)?\))(?:\s*,\s*\(\?(?:\.\.\.)?\))+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Sustituye literales por ? y colapsa listas IN para agrupar sentencias equivalentes"""
+    sql = _STRING.sub("?", statement)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?...)", sql)
+    sql = _ROW_LIST.sub(r"\1, ...", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def params_shape(parameters, executemany: bool) -> dict:
+    """Forma de los parámetros sin sus valores (pueden contener datos sensibles)"""
+    if executemany:
+        filas = list(parameters or [])
+        primera = filas[0] if filas else ()
+        return {"batch": len(filas), "types": _types(primera)}
+    return {"batch": 1, "types": _types(parameters)}
+
+
+def _types(parameters):
+    if isinstance(parameters, dict):
+        return {k: type(v).__name__ for k, v in parameters.items()}
+    return [type(v).__name__ for v in (parameters or ())]
+
+
+class SlowQueryLog:
+    """Buffer circular de consultas lentas y planes por sentencia"""
+
+    def __init__(self, threshold_ms: float = 100.0, max_records: int = 200, max_plans: int = 500, max_statements: int = 500):
+        self.threshold = threshold_ms / 1000.0
+        self.records = deque(maxlen=max_records)
+        self.max_plans = max_plans
+        self.max_statements = max_statements
+        self._plans: "OrderedDict[str, list]" = OrderedDict()
+        self._stats: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def plan_for(self, normalized: str) -> Optional[list]:
+        return self._plans.get(normalized)
+
+    def has_plan(self, normalized: str) -> bool:
+        return normalized in self._plans
+
+    def store_plan(self, normalized: str, plan: list):
+        with self._lock:
+            self._plans[normalized] = plan
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+
+    def add(self, record: dict):
+        with self._lock:
+            self.records.append(record)
+            stats = self._stats.setdefault(record["sql"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": set()})
+            self._stats.move_to_end(record["sql"])
+            while len(self._stats) > self.max_statements:
+                self._stats.popitem(last=False)
+            stats["count"] += 1
+            stats["total_ms"] += record["duration_ms"]
+            stats["max_ms"] = max(stats["max_ms"], record["duration_ms"])
+            if record["route"]:
+                stats["routes"].add(record["route"])
+
+    def recent(self, limit: int = 50) -> list:
+        with self._lock:
+            items = list(self.records)
+        return [
+            {**r, "plan": self._plans.get(r["sql"])}
+            for r in reversed(items[-limit:])
+        ]
+
+    def statements(self) -> list:
+        """Agregado por sentencia normalizada, de mayor a menor tiempo total"""
+        with self._lock:
+            items = [(sql, dict(s, routes=sorted(s["routes"]))) for sql, s in self._stats.items()]
+        resultado = []
+        for sql, s in items:
+            plan = self._plans.get(sql) or []
+            resultado.append({
+                "sql": sql,
+                "count": s["count"],
+                "total_ms": round(s["total_ms"], 3),
+                "avg_ms": round(s["total_ms"] / s["count"], 3),
+                "max_ms": round(s["max_ms"], 3),
+                "routes": s["routes"],
+                "full_scan": any(p.get("detail", "").startswith("SCAN") for p in plan),
+                "plan": plan
+            })
+        resultado.sort(key=lambda x: x["total_ms"], reverse=True)
+        return resultado
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+            self._stats.clear()
+
+
+def _explain(conn, statement: str, parameters) -> list:
+    """EXPLAIN QUERY PLAN sobre un cursor DBAPI aparte (no dispara eventos del engine)"""
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+        return [
+            {"id": row[0], "parent": row[1], "detail": row[3]}
+            for row in cursor.fetchall()
+        ]
+    finally:
+        cursor.close()
+
+
+def _current_route() -> Optional[str]:
+    ctx = request_context.get()
+    if ctx is None:
+        return None
+    route = ctx.get("route")
+    return route() if callable(route) else route
+
+
+def instrument_slow_queries(engine: Engine, log: SlowQueryLog):
+    """Registrar en `log` cada sentencia que supere el umbral"""
+    explain_supported = engine.dialect.name == "sqlite"
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("slow_query_start")
+        if not starts:
+            return
+        duracion = time.perf_counter() - starts.pop()
+        if duracion < log.threshold:
+            return
+
+        normalized = normalize_sql(statement)
+        es_select = statement.lstrip()[:6].upper() in ("SELECT", "WITH")
+        if explain_supported and es_select and not executemany and not log.has_plan(normalized):
+            try:
+                log.store_plan(normalized, _explain(conn, statement, parameters))
+            except Exception as e:
+                log.store_plan(normalized, [{"error": str(e)}])
+
+        rowcount = cursor.rowcount
+        record = {
+            "at": datetime.utcnow().isoformat(),
+            "sql": normalized,
+            "params": params_shape(parameters, executemany),
+            "duration_ms": round(duracion * 1000, 3),
+            # SQLite no informa filas de un SELECT hasta consumir el cursor
+            "rowcount": rowcount if rowcount is not None and rowcount >= 0 else None,
+            "route": _current_route()
+        }
+        log.add(record)
+        logger.warning(
+            "consulta lenta",
+            extra={"sql": normalized[:200], "duration_ms": record["duration_ms"]}
+        )
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("slow_query_start"):
+            conn.info["slow_query_start"].pop()
@@ -1,6 +1,7 @@
 import os
 from snowflake.connector import connect
 from dotenv import load_dotenv
+from app.metrics import external_call
 
 # Cargar variables de entorno
 load_dotenv()
@@ -10,14 +11,15 @@ def get_snowflake_connection():
     Crear conexión a Snowflake usando variables de entorno
     """
     try:
-        conn = connect(
-            user=os.getenv('SNOWFLAKE_USER'),
-            password=os.getenv('SNOWFLAKE_PASSWORD'),
-            account=os.getenv('SNOWFLAKE_ACCOUNT'),
-            warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
-            database=os.getenv('SNOWFLAKE_DATABASE'),
-            schema=os.getenv('SNOWFLAKE_SCHEMA')
-        )
+        with external_call("snowflake"):
+            conn = connect(
+                user=os.getenv('SNOWFLAKE_USER'),
+                password=os.getenv('SNOWFLAKE_PASSWORD'),
+                account=os.getenv('SNOWFLAKE_ACCOUNT'),
+                warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
+                database=os.getenv('SNOWFLAKE_DATABASE'),
+                schema=os.getenv('SNOWFLAKE_SCHEMA')
+            )
         return conn
     except Exception as e:
         print(f"Error conectando a Snowflake: {e}")
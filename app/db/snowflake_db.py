@@ -1,35 +1,55 @@
-import snowflake.connector
-from typing import Generator
+from typing import Generator, TYPE_CHECKING
 import os
 from dotenv import load_dotenv
+from app.metrics import external_call
+
+if TYPE_CHECKING:
+    import snowflake.connector
 
 # Cargar variables de entorno
 load_dotenv()
 
-def get_snowflake_connection() -> snowflake.connector.SnowflakeConnection:
+def get_snowflake_connection() -> "snowflake.connector.SnowflakeConnection":
     """
     Crear una conexión a Snowflake usando las credenciales del .env
     """
+    # Import diferido: el conector tarda ~100 ms en cargar y sólo se usa si hay Snowflake
+    import snowflake.connector
+
     try:
-        conn = snowflake.connector.connect(
-            user=os.getenv('SNOWFLAKE_USER'),
-            password=os.getenv('SNOWFLAKE_PASSWORD'),
-            account=os.getenv('SNOWFLAKE_ACCOUNT'),
-            warehouse=os.getenv('SNOWFLAKE_WAREHOUSE', 'COMPUTE_WH'),
-            database=os.getenv('SNOWFLAKE_DATABASE', 'MEDCHECK_DB'),
-            schema=os.getenv('SNOWFLAKE_SCHEMA', 'PUBLIC')
-        )
+        with external_call("snowflake"):
+            conn = snowflake.connector.connect(
+                user=os.getenv('SNOWFLAKE_USER'),
+                password=os.getenv('SNOWFLAKE_PASSWORD'),
+                account=os.getenv('SNOWFLAKE_ACCOUNT'),
+                warehouse=os.getenv('SNOWFLAKE_WAREHOUSE', 'COMPUTE_WH'),
+                database=os.getenv('SNOWFLAKE_DATABASE', 'MEDCHECK_DB'),
+                schema=os.getenv('SNOWFLAKE_SCHEMA', 'PUBLIC')
+            )
         return conn
     except Exception as e:
         print(f"Error conectando a Snowflake: {e}")
         raise e
 
+class _TimedCursor:
+    """Cursor de Snowflake que registra la latencia de cada execute()"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        with external_call("snowflake"):
+            return self._cursor.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
 def get_snowflake_cursor() -> Generator:
     """
     Generador para manejar la conexión y cursor de Snowflake
     """
     conn = get_snowflake_connection()
-    cursor = conn.cursor()
+    cursor = _TimedCursor(conn.cursor())
     yield cursor
     
     if cursor:
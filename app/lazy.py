@@ -0,0 +1,48 @@
+"""
+Construcción diferida de servicios con dependencias pesadas.
+
+``LazyService("app.services.voice_service:VoiceService")`` no importa el
+módulo ni construye la instancia hasta el primer acceso a un atributo, de
+modo que importar ``app.main`` no arrastra requests, openpyxl, reportlab ni
+la lectura de ``.env`` de VoiceSettings. Ver benchmarks/importtime.py.
+"""
+import importlib
+import threading
+from typing import Any, Callable, Union
+
+
+def import_string(path: str) -> Any:
+    """'paquete.modulo:Nombre' -> objeto"""
+    module_name, _, attr = path.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attr) if attr else module
+
+
+class LazyService:
+    """Proxy que importa y construye el servicio en el primer uso (thread-safe)"""
+
+    def __init__(self, factory: Union[str, Callable[[], Any]]):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    factory = self._factory
+                    if isinstance(factory, str):
+                        factory = import_string(factory)
+                    self._instance = factory()
+        return self._instance
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+    def __repr__(self) -> str:
+        estado = repr(self._instance) if self.loaded else "sin construir"
+        return f"<LazyService {self._factory!r}: {estado}>"
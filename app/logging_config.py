@@ -0,0 +1,181 @@
+"""
+Logging estructurado y no bloqueante.
+
+Los módulos siguen usando ``logging.getLogger(__name__)``; ``setup_logging``
+instala en el logger raíz un QueueHandler (el hilo de la petición sólo
+encola el registro) y un QueueListener que formatea en JSON y escribe en
+stdout desde un thread aparte. Niveles por módulo vía ``LOG_LEVELS``
+("app.auth=DEBUG,app.services.voice_service=WARNING") y muestreo de eventos
+DEBUG repetitivos. Cada registro incluye automáticamente los campos de la
+petición en curso (ruta, usuario, duración hasta el momento).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+# Contexto de la petición en curso; el middleware lo crea y los dependencias
+# de autenticación añaden el usuario (mismo dict, visible también en el thread pool)
+request_context: ContextVar[Optional[dict]] = ContextVar("request_context", default=None)
+
+# Atributos estándar de LogRecord: todo lo demás se considera campo de `extra`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def bind_request_context(**fields):
+    """Añadir campos (p. ej. user) al contexto de la petición en curso"""
+    ctx = request_context.get()
+    if ctx is not None:
+        ctx.update(fields)
+
+
+class RequestContextFilter(logging.Filter):
+    """Copia al registro los campos de la petición en curso"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        ctx = request_context.get()
+        if ctx is not None:
+            for key, value in ctx.items():
+                if key == "start":
+                    continue
+                if callable(value):
+                    value = value()
+                setattr(record, key, value)
+            if "start" in ctx:
+                record.elapsed_ms = round((time.perf_counter() - ctx["start"]) * 1000, 3)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar como máximo ``burst`` registros por (logger, mensaje) cada
+    ``period`` segundos para niveles <= ``max_level``; el siguiente registro
+    emitido indica cuántos se descartaron.
+    """
+
+    def __init__(self, burst: int = 10, period: float = 60.0, max_level: int = logging.DEBUG):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self.max_level = max_level
+        self._windows: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or self.burst <= 0:
+            return True
+        key = (record.name, str(record.msg))
+        ahora = time.monotonic()
+        with self._lock:
+            ventana = self._windows.get(key)
+            if ventana is None or ahora - ventana[0] >= self.period:
+                suprimidos = ventana[2] if ventana else 0
+                self._windows[key] = [ahora, 1, 0]
+                if suprimidos:
+                    record.sampled_out = suprimidos
+                return True
+            if ventana[1] < self.burst:
+                ventana[1] += 1
+                return True
+            ventana[2] += 1
+            return False
+
+
+class JSONFormatter(logging.Formatter):
+    """Un objeto JSON por línea"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legible para desarrollo local, con los campos extra al final"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        base = super().format(record)
+        extra = " ".join(
+            f"{k}={v}" for k, v in record.__dict__.items()
+            if k not in _RESERVED and not k.startswith("_")
+        )
+        return f"{base} {extra}" if extra else base
+
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que resuelve el contexto antes de encolar (en el thread de la petición)"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)
+        # El listener formatea en otro thread: pasar a texto lo que no sea serializable
+        for key, value in list(record.__dict__.items()):
+            if key not in _RESERVED and not isinstance(value, (str, int, float, bool, type(None))):
+                setattr(record, key, str(value))
+        return record
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for parte in (spec or "").split(","):
+        if "=" in parte:
+            nombre, nivel = parte.split("=", 1)
+            levels[nombre.strip()] = nivel.strip().upper()
+    return levels
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json", levels: str = "",
+                  sample_burst: int = 10, sample_period: float = 60.0):
+    """Configurar el logger raíz (idempotente)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter())
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    handler = _ContextQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(SamplingFilter(burst=sample_burst, period=sample_period))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    for nombre, nivel in _parse_levels(levels).items():
+        logging.getLogger(nombre).setLevel(nivel)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Vaciar la cola y detener el thread de escritura"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,13 +1,34 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, PlainTextResponse
 from fastapi.exceptions import HTTPException
-from app.db.database import create_tables, SessionLocal
-from app.routers import auth_simple, checklist, reports
+from app.db.bootstrap import ensure_schema
+from app.routers import auth_simple, checklist, reports, profiling, slow_queries
 from app.routers import alerts_sqlite as alerts
 from app.config import settings
+from app.logging_config import setup_logging
+from app.scheduler import acquire_scheduler_lock, setup_scheduler, shutdown_scheduler
+from app.metrics import registry
+from app.services.http_cache import NotModified, not_modified_response
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.request_context import RequestContextMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.static_assets import static_mount
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Logging estructurado asíncrono (antes de crear la app)
+setup_logging(
+    level=settings.log_level,
+    fmt=settings.log_format,
+    levels=settings.log_levels,
+    sample_burst=settings.log_sample_burst,
+    sample_period=settings.log_sample_period_seconds
+)
 
 # Crear la aplicación
 app = FastAPI(
@@ -30,6 +51,11 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         content={"detail": exc.detail}
     )
 
+# 304 Not Modified desde las dependencias de caché condicional
+@app.exception_handler(NotModified)
+async def not_modified_handler(request: Request, exc: NotModified):
+    return not_modified_response(exc)
+
 # Configuración de CORS
 app.add_middleware(
     CORSMiddleware,
@@ -39,17 +65,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión gzip/brotli de respuestas dinámicas de texto
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size)
+
+# Perfilado bajo demanda (sólo se activa con X-Profile / ?profile=1 de un admin)
+app.add_middleware(ProfilingMiddleware)
+
+# Contexto de logging por petición (ruta, usuario, duración)
+app.add_middleware(RequestContextMiddleware)
+
+# Métricas por ruta (se añade al final para envolver a todos los demás middlewares)
+app.add_middleware(MetricsMiddleware)
+
 # Configuración de templates
 templates = Jinja2Templates(directory="templates")
 
-# Archivos estáticos
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Archivos estáticos (precomprimidos .gz/.br y URLs con hash de contenido)
+app.router.routes.append(static_mount("/static", "static", precompress=settings.static_precompress))
 
 # Incluir routers
 app.include_router(auth_simple.router)
 app.include_router(checklist.router, prefix="/checklist", tags=["checklist"])
 app.include_router(reports.router, prefix="/reports", tags=["reports"])
 app.include_router(alerts.router, prefix="/alerts", tags=["alerts"])
+app.include_router(profiling.router, prefix="/debug/profiles", tags=["debug"])
+app.include_router(slow_queries.router, prefix="/debug/slow-queries", tags=["debug"])
 
 # Ruta principal
 @app.get("/", response_class=HTMLResponse)
@@ -70,41 +110,47 @@ async def login_page(request: Request):
 # Inicialización de la base de datos
 @app.on_event("startup")
 async def startup_event():
-    # Crear tablas
-    create_tables()
+    inicio = time.perf_counter()
+    # El esquema lo crea `python -m app.db.bootstrap`; aquí sólo se verifica la versión
+    # (o se migra bajo lock si AUTO_MIGRATE está activo, p. ej. en desarrollo)
+    ensure_schema()
+    fases = {"schema": time.perf_counter() - inicio}
 
-    # Asegurar un usuario admin por defecto en un arranque limpio (si no hay usuarios)
+    # Evaluación incremental de alertas en segundo plano: con varios workers
+    # sólo el que obtiene el lock ejecuta los jobs (si no, se duplicarían)
     try:
-        from app.models.user import User
-        db = SessionLocal()
-        users_count = db.query(User).count()
-        if users_count == 0:
-            # Hash precomputado de "Admin123!" (bcrypt $2b$12)
-            hashed_password = "$2b$12$stqmrbQjNtvsb.HqdDcnbeYPo853D3o.N.Lti6dwyQ2YSDn5pKqmS"
-            admin = User(
-                username="admin",
-                email="admin@medcheck.com",
-                hashed_password=hashed_password,
-                full_name="Administrador del Sistema",
-                is_active=True,
-                is_admin=True,
-            )
-            db.add(admin)
-            db.commit()
-            print("👑 Usuario admin creado automáticamente (admin / Admin123!)")
-        db.close()
-    except Exception as e:
-        # No bloquear el arranque por este paso; solo loguear
-        print(f"[startup][ensure_admin][warn] {e}")
+        if acquire_scheduler_lock(app):
+            setup_scheduler(app, voice_warmer=reports.voice_warmer)
+    except Exception:
+        logger.exception("scheduler setup failed")
+    fases["scheduler"] = time.perf_counter() - inicio - sum(fases.values())
+    logger.info(
+        "arranque",
+        extra={"phases_ms": {k: round(v * 1000, 1) for k, v in fases.items()}, "total_ms": round(sum(fases.values()) * 1000, 1)}
+    )
 
     print(f"✅ {settings.app_name} iniciado correctamente")
     print(f"📊 Base de datos: {settings.database_url}")
     print(f"🌍 Entorno: {settings.environment}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_scheduler(app)
+    if reports.voice_service.loaded:
+        await reports.voice_service.aclose()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "app": settings.app_name}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Métricas en formato de texto de Prometheus"""
+    if settings.metrics_token:
+        if request.headers.get("authorization", "") != f"Bearer {settings.metrics_token}":
+            raise HTTPException(status_code=401, detail="Not authenticated")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # Endpoint temporal para crear usuario admin (elimina el existente si hay problemas)
 @app.get("/setup-admin")
 async def setup_admin(request: Request, force: bool = False, format: str = "json"):
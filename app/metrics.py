@@ -0,0 +1,212 @@
+"""
+Registro de métricas en proceso con salida en formato de texto de Prometheus.
+
+Implementación mínima (contadores, gauges e histogramas con etiquetas) para
+no añadir dependencias; el endpoint /metrics la expone.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [conteos por bucket..., suma, total]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            if idx < len(self.buckets):
+                data[idx] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, **labels)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, data in sorted(self._values.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, data):
+                acumulado += conteo
+                le = _format_labels(self.labelnames, key, f'le="{limite}"')
+                lines.append(f"{self.name}_bucket{le} {acumulado}")
+            le = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {data[-1]}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {data[-2]}")
+            lines.append(f"{self.name}_count{labels} {data[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, fn):
+        """Función llamada antes de cada render (p. ej. para actualizar gauges)"""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception:
+                logger.warning("error en collector de métricas", extra={"collector": getattr(fn, "__qualname__", repr(fn))}, exc_info=True)
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "medcheck_http_request_duration_seconds", "Latencia de peticiones HTTP por ruta",
+    ("method", "route", "status")
+))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "medcheck_http_requests_in_flight", "Peticiones HTTP en curso"
+))
+DB_QUERIES_PER_REQUEST = registry.register(Histogram(
+    "medcheck_db_queries_per_request", "Consultas SQL por petición",
+    ("route",), buckets=(0, 1, 2, 5, 10, 20, 50, 100, 500)
+))
+DB_TIME_PER_REQUEST = registry.register(Histogram(
+    "medcheck_db_time_per_request_seconds", "Tiempo total en SQL por petición", ("route",)
+))
+DB_QUERY_DURATION = registry.register(Histogram(
+    "medcheck_db_query_duration_seconds", "Duración de cada sentencia SQL", ("operation",)
+))
+CACHE_REQUESTS = registry.register(Counter(
+    "medcheck_cache_requests_total", "Accesos a cachés internas", ("cache", "result")
+))
+EXPORT_DURATION = registry.register(Histogram(
+    "medcheck_export_duration_seconds", "Duración de exportaciones", ("format",)
+))
+EXTERNAL_CALL_DURATION = registry.register(Histogram(
+    "medcheck_external_call_duration_seconds", "Latencia de servicios externos",
+    ("service", "outcome")
+))
+
+
+class RequestDBStats:
+    __slots__ = ("queries", "duration")
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+
+# Estadísticas SQL de la petición en curso (propagado a threads del pool por anyio)
+current_db_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("current_db_stats", default=None)
+
+# Traza de sentencias SQL (sólo activa cuando se perfila una petición)
+current_sql_trace: ContextVar[Optional[list]] = ContextVar("current_sql_trace", default=None)
+
+
+@contextmanager
+def external_call(service: str):
+    """Medir una llamada a un servicio externo (snowflake, elevenlabs, smtp)"""
+    inicio = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        EXTERNAL_CALL_DURATION.observe(time.perf_counter() - inicio, service=service, outcome=outcome)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
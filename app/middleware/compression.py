@@ -0,0 +1,142 @@
+"""
+Compresión gzip/brotli de respuestas dinámicas negociada por Accept-Encoding.
+
+Sólo comprime tipos de texto (HTML, JSON, CSV, JS...) por encima de un
+tamaño mínimo; respeta respuestas ya codificadas (estáticos precomprimidos)
+y nunca toca Server-Sent Events. Las respuestas en streaming se comprimen
+por chunks con flush para no retener datos.
+"""
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él sólo se ofrece gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml",
+    "application/manifest+json", "image/svg+xml",
+)
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = (content_type or "").lower()
+    if content_type.startswith("text/event-stream"):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Elegir br o gzip según Accept-Encoding (respetando q=0)"""
+    aceptadas = {}
+    for parte in (accept_encoding or "").lower().split(","):
+        nombre, _, params = parte.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if nombre:
+            aceptadas[nombre] = q
+    if brotli is not None and aceptadas.get("br", 0) > 0:
+        return "br"
+    if aceptadas.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31: formato gzip (cabecera + CRC)
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._br.process(data)
+            return out + (self._br.finish() if final else self._br.flush())
+        out = self._gz.compress(data)
+        return out + self._gz.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 500, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope.get("headers", ()):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = dict((k.lower(), v) for k, v in start_message.get("headers", []))
+                status = start_message["status"]
+                if (
+                    b"content-encoding" in headers
+                    or status in (204, 206, 304)
+                    or not is_compressible(headers.get(b"content-type", b"").decode("latin-1"))
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                data = compressor.compress(body, final=not more_body)
+                nuevos = [
+                    (k, v) for k, v in start_message.get("headers", [])
+                    if k.lower() not in (b"content-length", b"vary")
+                ]
+                vary = headers.get(b"vary")
+                nuevos.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+                nuevos.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    nuevos.append((b"content-length", str(len(data)).encode()))
+                await send({**start_message, "headers": nuevos})
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, final=not more_body),
+                "more_body": more_body
+            })
+
+        await self.app(scope, receive, send_wrapper)
+        # Respuestas sin cuerpo (p. ej. HEAD) que nunca enviaron body
+        if start_message is not None and compressor is None and not passthrough:
+            await send(start_message)
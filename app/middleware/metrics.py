@@ -0,0 +1,70 @@
+"""
+Middleware ASGI de métricas. Los hooks de SQLAlchemy que alimentan las
+estadísticas por petición están en app/db/query_metrics.py.
+"""
+import time
+from starlette.routing import Mount
+from app.metrics import (
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+    DB_QUERIES_PER_REQUEST,
+    DB_TIME_PER_REQUEST,
+    RequestDBStats,
+    current_db_stats,
+)
+
+
+def route_template(scope) -> str:
+    """Plantilla de ruta (/reports/summary, /static/{path}) para no explotar la cardinalidad"""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        # Aplicaciones montadas (StaticFiles) sólo actualizan root_path
+        root_path = scope.get("root_path", "")
+        return f"{root_path}/{{path}}" if root_path else "unmatched"
+    if isinstance(route, Mount):
+        return path.rstrip("/") + "/{path}"
+    # Algunas versiones de FastAPI dejan en scope la ruta relativa al router
+    # incluido: recuperar el prefijo (literal) desde la ruta real
+    actual = scope.get("path", "").rstrip("/").split("/")
+    plantilla = path.rstrip("/").split("/")
+    if len(actual) > len(plantilla) and ":path}" not in path:
+        return "/".join(actual[:len(actual) - len(plantilla) + 1]) + path
+    return path
+
+
+class MetricsMiddleware:
+    """Latencia por ruta, peticiones en curso y consultas SQL por petición"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = RequestDBStats()
+        token = current_db_stats.set(stats)
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        inicio = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duracion = time.perf_counter() - inicio
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            current_db_stats.reset(token)
+            route = route_template(scope)
+            HTTP_REQUEST_DURATION.observe(
+                duracion, method=scope.get("method", ""), route=route, status=str(status_code)
+            )
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, route=route)
+            DB_TIME_PER_REQUEST.observe(stats.duration, route=route)
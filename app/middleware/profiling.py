@@ -0,0 +1,181 @@
+"""
+Perfilado bajo demanda de una petición (sólo administradores).
+
+Se activa con la cabecera ``X-Profile: 1`` o el parámetro ``?profile=1``.
+Mientras dura la petición un thread muestrea las pilas de llamadas con
+``sys._current_frames()``; el resultado se guarda en formato "collapsed
+stacks" (compatible con flamegraph.pl / speedscope) junto con las
+sentencias SQL y sus tiempos. Sin la cabecera el coste es una comprobación
+de cabeceras por petición.
+
+Sólo se conservan las muestras de los hilos que atendieron la petición: el
+del event loop y los del threadpool que ejecutaron su SQL. El event loop es
+compartido, así que otras peticiones concurrentes pueden aparecer en él.
+"""
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Optional
+from urllib.parse import parse_qs
+from fastapi import HTTPException
+from starlette.requests import Request
+from app.config import settings
+from app.db.database import SessionLocal
+from app.auth.users import get_current_user, get_current_active_user, get_current_admin_user
+from app.metrics import current_sql_trace
+
+MAX_STACK_DEPTH = 128
+
+
+class StackSampler(threading.Thread):
+    """Muestrea periódicamente las pilas de los threads del proceso, separadas por thread"""
+
+    def __init__(self, interval: float):
+        super().__init__(name="medcheck-profiler", daemon=True)
+        self.interval = interval
+        self.samples: Counter = Counter()  # (thread, pila) -> muestras
+        self.total = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            nombres = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                stack.append(nombres.get(tid, str(tid)))
+                self.samples[(tid, ";".join(reversed(stack)))] += 1
+            self.total += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self, threads: Optional[set] = None) -> str:
+        """Pilas agregadas; con ``threads`` sólo las de esos threads"""
+        total: Counter = Counter()
+        for (tid, stack), count in self.samples.items():
+            if threads is None or tid in threads:
+                total[stack] += count
+        return "\n".join(f"{stack} {count}" for stack, count in total.most_common())
+
+
+class ProfileStore:
+    """Últimos perfiles capturados, en memoria"""
+
+    def __init__(self, max_profiles: int = 20):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: dict):
+        with self._lock:
+            self._profiles[profile["id"]] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> list:
+        return [
+            {k: v for k, v in p.items() if k not in ("folded", "sql")}
+            for p in reversed(list(self._profiles.values()))
+        ]
+
+
+profile_store = ProfileStore()
+
+
+def _profiling_requested(scope) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == b"x-profile":
+            return value not in (b"", b"0", b"false")
+    query = scope.get("query_string", b"")
+    if b"profile=" in query:
+        valor = parse_qs(query.decode("latin-1")).get("profile", [""])[0]
+        return valor not in ("", "0", "false")
+    return False
+
+
+async def _is_admin(scope) -> bool:
+    """Reutiliza la cadena de dependencias de app.auth.users"""
+    request = Request(scope)
+    auth = request.headers.get("authorization", "")
+    bearer = auth[7:] if auth.lower().startswith("bearer ") else None
+    db = SessionLocal()
+    try:
+        user = await get_current_user(request, db, token=bearer, access_token=request.cookies.get("access_token"))
+        await get_current_admin_user(await get_current_active_user(user))
+        return True
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
+
+class ProfilingMiddleware:
+    """Perfila la petición si lo solicita un administrador"""
+
+    def __init__(self, app):
+        self.app = app
+        # Un único perfil simultáneo para acotar el overhead
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not await _is_admin(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sql = []
+        loop_thread = threading.get_ident()
+        token = current_sql_trace.set(sql)
+        sampler = StackSampler(settings.profiling_interval_ms / 1000.0)
+        inicio = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            duracion = time.perf_counter() - inicio
+            current_sql_trace.reset(token)
+            self._busy.release()
+            profile_store.add({
+                "id": profile_id,
+                "created_at": datetime.utcnow().isoformat(),
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "query_string": scope.get("query_string", b"").decode("latin-1"),
+                "status": status_code,
+                "duration_ms": round(duracion * 1000, 3),
+                "samples": sampler.total,
+                "interval_ms": settings.profiling_interval_ms,
+                "sql_count": len(sql),
+                "sql_time_ms": round(sum(q["duration_ms"] for q in sql), 3),
+                "sql": sql,
+                "folded": sampler.collapsed({loop_thread} | {q["thread"] for q in sql})
+            })
@@ -0,0 +1,50 @@
+"""
+Middleware que abre el contexto de logging de cada petición y emite una
+línea de acceso estructurada al terminar.
+"""
+import logging
+import time
+from app.logging_config import request_context
+from app.middleware.metrics import route_template
+
+access_logger = logging.getLogger("medcheck.access")
+
+
+class RequestContextMiddleware:
+    """Ruta, usuario y duración disponibles para cualquier log de la petición"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        # La plantilla de ruta sólo se conoce tras el enrutado: se resuelve al loguear
+        ctx = {
+            "start": time.perf_counter(),
+            "method": scope.get("method"),
+            "route": lambda: route_template(scope),
+        }
+        token = request_context.set(ctx)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if access_logger.isEnabledFor(logging.INFO):
+                access_logger.info(
+                    "request",
+                    extra={
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - ctx["start"]) * 1000, 3)
+                    }
+                )
+            request_context.reset(token)
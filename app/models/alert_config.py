@@ -0,0 +1,59 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, JSON, ForeignKey, Index
+from datetime import datetime
+from app.models.user import Base
+
+
+class AlertConfigSQL(Base):
+    """Configuración de alertas por área (area NULL = configuración global)"""
+    __tablename__ = "alert_configs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    area = Column(String, nullable=True)
+    umbral_critico = Column(Float, default=70.0, nullable=False)
+    umbral_advertencia = Column(Float, default=85.0, nullable=False)
+    emails_adicionales = Column(JSON, nullable=True)
+    notificar_supervisores = Column(Boolean, default=True, nullable=False)
+    intervalo_horas = Column(Integer, default=24, nullable=False)
+    activo = Column(Boolean, default=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_alert_configs_area_activo", "area", "activo"),
+    )
+
+
+class AlertHistorySQL(Base):
+    """Historial de alertas generadas por el evaluador"""
+    __tablename__ = "alert_history"
+
+    id = Column(Integer, primary_key=True, index=True)
+    config_id = Column(Integer, ForeignKey("alert_configs.id"), nullable=True)
+    area = Column(String, nullable=False)
+    tipo = Column(String, nullable=False)  # critica/alta/advertencia
+    mensaje = Column(String, nullable=True)
+    cumplimiento = Column(Float, nullable=True)
+    emails_notificados = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_alert_history_area_created_at", "area", "created_at"),
+    )
+
+
+class AlertWatermarkSQL(Base):
+    """Último id de checklist_entries procesado por un evaluador incremental"""
+    __tablename__ = "alert_watermarks"
+
+    nombre = Column(String, primary_key=True)
+    ultimo_id = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class AlertSnapshotSQL(Base):
+    """Alertas activas del último tick del evaluador (las leen los workers que no lo ejecutan)"""
+    __tablename__ = "alert_snapshots"
+
+    nombre = Column(String, primary_key=True)
+    alertas = Column(JSON, nullable=False, default=list)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Index, UniqueConstraint
+from datetime import datetime
+from app.models.user import Base
+
+
+class ChecklistDailySQL(Base):
+    """Rollup diario por (área, turno, etapa, item), mantenido por marca de agua de checklist_facts"""
+    __tablename__ = "checklist_daily"
+
+    dia = Column(Date, primary_key=True)
+    area_id = Column(Integer, primary_key=True)
+    turno_id = Column(Integer, primary_key=True)
+    etapa_id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    total = Column(Integer, default=0, nullable=False)
+    cumple = Column(Integer, default=0, nullable=False)
+
+
+class AnomalySQL(Base):
+    """Anomalía detectada en una serie diaria (ver app/services/anomaly_engine.py)"""
+    __tablename__ = "anomalies"
+
+    id = Column(Integer, primary_key=True)
+    dia = Column(Date, nullable=False)
+    area_id = Column(Integer, nullable=False)
+    turno_id = Column(Integer, nullable=False)
+    etapa_id = Column(Integer, nullable=False)
+    item_id = Column(Integer, nullable=False)
+    metodo = Column(String(16), nullable=False)  # ewma / cusum / binomial
+    score = Column(Float, nullable=False)
+    valor = Column(Float, nullable=False)  # % de cumplimiento del día
+    esperado = Column(Float, nullable=False)  # % de la línea base
+    total = Column(Integer, nullable=False)
+    severidad = Column(String(8), nullable=False)  # alta / media
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("dia", "area_id", "turno_id", "etapa_id", "item_id", "metodo", name="uq_anomalies_serie_dia_metodo"),
+        Index("ix_anomalies_dia", "dia"),
+        Index("ix_anomalies_area_dia", "area_id", "dia"),
+    )
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from app.models.user import Base
+
+
+class ArchivePartitionSQL(Base):
+    """Mes de checklist_facts movido a un archivo comprimido (ver app/db/archive.py)"""
+    __tablename__ = "archive_partitions"
+
+    mes = Column(String(7), primary_key=True)  # YYYY-MM
+    path = Column(String, nullable=False)  # relativo a settings.archive_dir
+    filas = Column(Integer, nullable=False)
+    desde = Column(DateTime, nullable=False)  # [desde, hasta)
+    hasta = Column(DateTime, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    bytes = Column(Integer, nullable=False)
+    max_id = Column(Integer, nullable=True)  # último id exportado: la purga no pasa de él
+    purgado = Column(DateTime, nullable=True)  # filas ya borradas de la base
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,9 +1,15 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Index, ForeignKey
 from datetime import datetime
 from app.models.user import Base
 
 
 class ChecklistEntrySQL(Base):
+    """
+    Lectura de registros con los nombres legibles. Desde la migración 0003
+    ``checklist_entries`` es una vista sobre checklist_facts + dim_*; las
+    escrituras van a ChecklistFactSQL. La definición de tabla se conserva
+    porque la migración 0001 la crea en bases nuevas antes de convertirla.
+    """
     __tablename__ = "checklist_entries"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -16,3 +22,74 @@ class ChecklistEntrySQL(Base):
     observaciones = Column(String, nullable=True)
     usuario = Column(String, index=True, nullable=True)
     metadatos = Column(JSON, nullable=True)
+
+    __table_args__ = (
+        # Bases existentes: lo crea la migración 0002
+        Index("ix_checklist_entries_area_fecha_hora", "area", "fecha_hora"),
+    )
+
+
+class ChecklistFactSQL(Base):
+    """
+    Tabla de hechos: un registro por ítem verificado con las dimensiones
+    codificadas como enteros (dim_area, dim_turno, dim_etapa, dim_item,
+    dim_usuario). Los nombres se resuelven con la caché de dimensiones.
+    """
+    __tablename__ = "checklist_facts"
+
+    id = Column(Integer, primary_key=True)
+    fecha_hora = Column(DateTime, default=datetime.utcnow, nullable=False)
+    area_id = Column(Integer, ForeignKey("dim_area.id"), nullable=False)
+    turno_id = Column(Integer, ForeignKey("dim_turno.id"), nullable=False)
+    etapa_id = Column(Integer, ForeignKey("dim_etapa.id"), nullable=False)
+    item_id = Column(Integer, ForeignKey("dim_item.id"), nullable=False)
+    cumple = Column(Boolean, default=False, nullable=False)
+    observaciones = Column(String, nullable=True)
+    usuario_id = Column(Integer, ForeignKey("dim_usuario.id"), nullable=True)
+    metadatos = Column(JSON, nullable=True)
+
+    __table_args__ = (
+        Index("ix_checklist_facts_fecha_hora", "fecha_hora"),
+        # area_id solo: último id por área (ETag) en orden de rowid
+        Index("ix_checklist_facts_area_id", "area_id"),
+        Index("ix_checklist_facts_area_fecha_hora", "area_id", "fecha_hora"),
+        Index("ix_checklist_facts_usuario_id", "usuario_id"),
+    )
+
+    def _nombre(self, dimension: str, valor):
+        from app.db.dimensions import dimension_cache
+        return dimension_cache.name(dimension, valor) if valor is not None else None
+
+    # Mismos atributos que ChecklistEntrySQL para el código que sólo lee
+    @property
+    def area(self) -> str:
+        return self._nombre("area", self.area_id)
+
+    @property
+    def turno(self) -> str:
+        return self._nombre("turno", self.turno_id)
+
+    @property
+    def protocolo_etapa(self) -> str:
+        return self._nombre("etapa", self.etapa_id)
+
+    @property
+    def item(self) -> str:
+        return self._nombre("item", self.item_id)
+
+    @property
+    def usuario(self):
+        return self._nombre("usuario", self.usuario_id)
+
+
+class ChecklistSubmissionSQL(Base):
+    """Envío del formulario identificado por el UUID generado en el cliente (idempotencia del sync offline)"""
+    __tablename__ = "checklist_submissions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    client_id = Column(String(36), unique=True, nullable=False, index=True)
+    usuario = Column(String, nullable=True)
+    area = Column(String, nullable=False)
+    entry_count = Column(Integer, default=0, nullable=False)
+    captured_at = Column(DateTime, nullable=True)  # hora de captura en el dispositivo
+    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, String
+from app.models.user import Base
+
+
+class DimAreaSQL(Base):
+    """Diccionario de áreas (checklist_facts.area_id)"""
+    __tablename__ = "dim_area"
+
+    id = Column(Integer, primary_key=True)
+    nombre = Column(String, unique=True, nullable=False)
+
+
+class DimTurnoSQL(Base):
+    """Diccionario de turnos (checklist_facts.turno_id)"""
+    __tablename__ = "dim_turno"
+
+    id = Column(Integer, primary_key=True)
+    nombre = Column(String, unique=True, nullable=False)
+
+
+class DimEtapaSQL(Base):
+    """Diccionario de etapas del protocolo (checklist_facts.etapa_id)"""
+    __tablename__ = "dim_etapa"
+
+    id = Column(Integer, primary_key=True)
+    nombre = Column(String, unique=True, nullable=False)
+
+
+class DimItemSQL(Base):
+    """Diccionario de ítems verificados (checklist_facts.item_id)"""
+    __tablename__ = "dim_item"
+
+    id = Column(Integer, primary_key=True)
+    nombre = Column(String, unique=True, nullable=False)
+
+
+class DimUsuarioSQL(Base):
+    """Diccionario de usuarios que registran (checklist_facts.usuario_id)"""
+    __tablename__ = "dim_usuario"
+
+    id = Column(Integer, primary_key=True)
+    nombre = Column(String, unique=True, nullable=False)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from app.models.user import Base
+
+
+class SchemaVersionSQL(Base):
+    """Versión del esquema aplicada por `python -m app.db.bootstrap`"""
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    descripcion = Column(String, nullable=True)
+    applied_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List, Literal
+from uuid import UUID
 from datetime import datetime
 
 class ChecklistEntryBase(BaseModel):
@@ -26,4 +27,55 @@ class ChecklistForm(BaseModel):
     area: str
     turno: str
     items: Dict[str, Dict[str, bool]]
-    observaciones: Optional[str] = None
\ No newline at end of file
+    observaciones: Optional[str] = None
+
+class ChecklistSubmission(ChecklistForm):
+    """Formulario capturado (posiblemente sin conexión) con su clave de idempotencia"""
+    client_id: UUID
+    captured_at: Optional[datetime] = None
+    # Usuario que lo capturó: la cola del dispositivo puede tener envíos de otra sesión
+    author: str = Field(..., min_length=1)
+
+class ChecklistSyncRequest(BaseModel):
+    # Cada envío se valida por separado (ChecklistSubmission): uno inválido no rechaza el lote
+    submissions: List[Any] = Field(..., min_length=1, max_length=200)
+
+class ChecklistSyncResult(BaseModel):
+    client_id: Optional[str] = None
+    status: Literal["created", "duplicate", "invalid", "author_mismatch"]
+    count: int = 0
+    detail: Optional[str] = None
+
+class ChecklistSyncResponse(BaseModel):
+    created: int
+    duplicates: int
+    invalid: int = 0
+    results: List[ChecklistSyncResult]
+
+QueryDimension = Literal["area", "turno", "protocolo_etapa", "item", "usuario"]
+QueryMeasure = Literal["total", "cumple", "no_cumple", "porcentaje", "usuarios"]
+
+class ReportQueryFilters(BaseModel):
+    """Valores exactos (una lista equivale a IN) y rango [desde, hasta]"""
+    area: Optional[List[str]] = None
+    turno: Optional[List[str]] = None
+    protocolo_etapa: Optional[List[str]] = None
+    item: Optional[List[str]] = None
+    usuario: Optional[List[str]] = None
+    cumple: Optional[bool] = None
+    desde: Optional[datetime] = None
+    hasta: Optional[datetime] = None
+
+class ReportQuery(BaseModel):
+    dimensions: List[QueryDimension] = Field(default_factory=list, max_length=5)
+    measures: List[QueryMeasure] = Field(..., min_length=1)
+    filters: ReportQueryFilters = Field(default_factory=ReportQueryFilters)
+    time_grain: Optional[Literal["hour", "day", "week", "month"]] = None
+    order_by: Optional[str] = None
+    descending: bool = False
+    limit: int = Field(1000, ge=1, le=10000)
+
+class ReportQueryResponse(BaseModel):
+    columns: List[str]
+    rows: List[Dict[str, Any]]
+    cached: bool = False
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, Date, DateTime
+from datetime import datetime
+from app.models.user import Base
+
+
+class VoiceBudgetSQL(Base):
+    """Caracteres sintetizados por día por el precalentado de voz (sobrevive a reinicios)"""
+    __tablename__ = "voice_budget"
+
+    dia = Column(Date, primary_key=True)
+    caracteres = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -9,7 +9,9 @@ from sqlalchemy.orm import Session
 from app.auth.users import get_current_active_user
 from app.models.user import User
 from app.db.database import get_db
+from app.models.alerts import AlertConfig
 from app.services.alert_service_sqlite import AlertService
+from app.services.alert_monitor import alert_monitor
 
 templates = Jinja2Templates(directory="templates")
 router = APIRouter()
@@ -28,7 +30,7 @@ async def get_critical_alerts(
     if not current_user.is_admin and area is None:
         area = getattr(current_user, 'area', None)
         
-    alerts = alert_service.get_critical_alerts(db, area)
+    alerts = alert_monitor.get_alerts(db, area)
     return {"alerts": alerts}
 
 @router.get("/config", response_class=HTMLResponse)
@@ -50,7 +52,7 @@ async def get_alert_config_page(
     config = alert_service.get_config(db)
     
     # Obtener alertas recientes para mostrar
-    alertas_recientes = alert_service.get_critical_alerts(db, None)
+    alertas_recientes = alert_monitor.get_alerts(db)
     
     return templates.TemplateResponse(
         "alert_config.html",
@@ -58,7 +60,7 @@ async def get_alert_config_page(
             "request": request,
             "current_user": current_user,
             "config": config,
-            "alert_logs": [],  # TODO: Implementar log de alertas
+            "alert_logs": alert_service.get_history(db, limit=10),
             "alerts": alertas_recientes[:10]  # Últimas 10 alertas
         }
     )
@@ -66,7 +68,8 @@ async def get_alert_config_page(
 @router.get("/configs")
 async def get_alert_configs(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    area: Optional[str] = None
 ):
     """
     Obtener configuración de alertas (API)
@@ -77,12 +80,12 @@ async def get_alert_configs(
             detail="Solo administradores pueden ver configuraciones"
         )
     
-    config = alert_service.get_config(db)
+    config = alert_service.get_config(db, area)
     return config
 
 @router.post("/configs")
 async def save_alert_config(
-    config: dict,
+    config: AlertConfig,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -95,7 +98,7 @@ async def save_alert_config(
             detail="Solo administradores pueden modificar configuraciones"
         )
     
-    saved_config = alert_service.save_config(db, config)
+    saved_config = alert_service.save_config(db, config.model_dump(exclude_unset=True))
     return saved_config
 
 @router.post("/test")
@@ -13,11 +13,10 @@ from app.auth.users import (
     get_user_by_email
 )
 from app.models.user import User
+from app.logging_config import bind_request_context
 import logging
 
-# Configurar logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -49,20 +48,20 @@ async def login(
     db: Session = Depends(get_db)
 ):
     try:
-        logger.info(f"[LOGIN] Intentando autenticar usuario: {username}")
-        logger.info(f"[LOGIN] Password length: {len(password)}")
+        logger.debug("login: intento", extra={"username": username})
 
         # No truncamos aquí: la lógica de verificación maneja bcrypt vs PBKDF2 correctamente
         user = authenticate_user(db, username, password)
         if not user:
-            logger.warning(f"[LOGIN] Fallo de autenticación para: {username}")
+            logger.warning("login: credenciales inválidas", extra={"username": username})
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Usuario o contraseña incorrectos",
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        logger.info(f"[LOGIN] Usuario autenticado exitosamente: {user.username}")
+        bind_request_context(user=user.username)
+        logger.info("login: usuario autenticado")
         access_token = create_access_token(data={"sub": user.username})
         
         # Guardar el token en una cookie HTTP-only
@@ -74,14 +73,11 @@ async def login(
             samesite="lax"  # Protección CSRF
         )
         
-        logger.info(f"[LOGIN] Token creado y cookie configurada para: {user.username}")
         return {"access_token": access_token, "token_type": "bearer"}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"[LOGIN ERROR] Error inesperado: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("login: error inesperado")
         # Si la librería bcrypt lanzó un error por longitud, retornar 401 estándar
         if "longer than 72 bytes" in str(e):
             raise HTTPException(
@@ -3,19 +3,20 @@ from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse, StreamingResponse
 from typing import List, Optional
 from datetime import datetime
-from app.models.schemas import ChecklistEntry, ChecklistForm
+from app.models.schemas import ChecklistEntry, ChecklistForm, ChecklistSyncRequest, ChecklistSyncResponse
 from app.services.snowflake_service import SnowflakeService
-from app.services.checklist_sqlite_service import create_entries_from_form, get_recent_entries
-from app.services.export_service import ExportService
+from app.services.checklist_sqlite_service import create_entries_from_form, get_recent_entries, parse_submissions, sync_submissions
 from app.db.database import get_db
 from sqlalchemy.orm import Session
 from app.auth.users import get_current_active_user
 from app.models.user import User
+from app.metrics import EXPORT_DURATION
+from app.lazy import LazyService
 import io
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
-export_service = ExportService()
+export_service = LazyService("app.services.export_service:ExportService")
 
 @router.get("/new", response_class=HTMLResponse)
 async def new_checklist_form(
@@ -48,6 +49,27 @@ async def create_checklist_entry(
         "usuario": current_user.username
     }
 
+@router.post("/sync", response_model=ChecklistSyncResponse)
+async def sync_checklist_entries(
+    batch: ChecklistSyncRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Sincronizar en un solo request los envíos guardados sin conexión (cola IndexedDB).
+    Idempotente por client_id: reenviar un lote ya recibido no duplica registros.
+    Los envíos inválidos se informan con status "invalid" y el resto se guarda.
+    """
+    validos, invalidos = parse_submissions(batch.submissions)
+    resultados = sync_submissions(db, validos, username=current_user.username) if validos else []
+    resultados += invalidos
+    return {
+        "created": sum(1 for r in resultados if r["status"] == "created"),
+        "duplicates": sum(1 for r in resultados if r["status"] == "duplicate"),
+        "invalid": len(invalidos),
+        "results": resultados
+    }
+
 @router.get("/history", response_class=HTMLResponse)
 async def get_checklist_history(
     request: Request,
@@ -111,7 +133,8 @@ async def export_to_excel(
     
     # Generar Excel
     try:
-        excel_bytes = export_service.export_to_excel(entries)
+        with EXPORT_DURATION.time(format="excel"):
+            excel_bytes = export_service.export_to_excel(entries)
         
         # Crear nombre de archivo con timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -151,7 +174,8 @@ async def export_to_csv(
         entries = [e for e in entries if e.fecha_hora <= hasta]
     
     # Generar CSV
-    csv_content = export_service.export_to_csv(entries)
+    with EXPORT_DURATION.time(format="csv"):
+        csv_content = export_service.export_to_csv(entries)
     
     # Crear nombre de archivo con timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
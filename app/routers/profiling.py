@@ -0,0 +1,35 @@
+"""
+Consulta de perfiles capturados con X-Profile (sólo administradores)
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.auth.users import get_current_admin_user
+from app.models.user import User
+from app.middleware.profiling import profile_store
+
+router = APIRouter()
+
+
+def _get_profile(profile_id: str) -> dict:
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return profile
+
+
+@router.get("")
+async def list_profiles(current_user: User = Depends(get_current_admin_user)):
+    """Últimos perfiles capturados (sin pilas ni SQL)"""
+    return profile_store.list()
+
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str, current_user: User = Depends(get_current_admin_user)):
+    """Perfil completo: metadatos, sentencias SQL con tiempos y pilas colapsadas"""
+    return _get_profile(profile_id)
+
+
+@router.get("/{profile_id}/folded", response_class=PlainTextResponse)
+async def get_profile_folded(profile_id: str, current_user: User = Depends(get_current_admin_user)):
+    """Pilas en formato collapsed (flamegraph.pl, speedscope, inferno)"""
+    return PlainTextResponse(_get_profile(profile_id)["folded"])
@@ -1,26 +1,45 @@
-from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
 import os
-from typing import Optional
+from typing import Literal, Optional
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse, StreamingResponse
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from app.services.snowflake_service import SnowflakeService
 from app.services.reporting_service import ReportingService
-from app.services.export_service import ExportService
-from app.services.voice_service import VoiceService
+from app.services.voice_warmer import build_voice_summary
 from app.auth.users import get_current_active_user
 from app.models.user import User
 from app.db.database import get_db
+from app.db.archive import archive_scope
 from sqlalchemy.orm import Session
 from app.services.checklist_sqlite_service import get_recent_entries
 from app.models.checklist_entry import ChecklistEntrySQL
 from sqlalchemy import func
+from app.metrics import EXPORT_DURATION
+from app.services.event_bus import entries_bus
+from app.services.http_cache import conditional
+from app.services.report_query import run_query
+from app.services.trends import compliance_trends
+from app.services.anomaly_engine import anomaly_engine
+from app.scheduler import detect_anomalies_job
+from app.services.item_ranking import top_failing_items
+from app.models.schemas import ReportQuery, ReportQueryResponse
+from app.config import settings
+from app.lazy import LazyService
 import io
+import json
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
-export_service = ExportService()
-voice_service = VoiceService()
+# Se construyen en el primer uso (VoiceService lee .env e importa requests/httpx)
+export_service = LazyService("app.services.export_service:ExportService")
+voice_service = LazyService("app.services.voice_service:VoiceService")
+voice_warmer = LazyService(lambda: _voice_warmer_factory())
+
+
+def _voice_warmer_factory():
+    from app.services.voice_warmer import VoiceWarmer
+    return VoiceWarmer(voice_service.get())
 
 @router.get("/dashboard", response_class=HTMLResponse)
 async def get_dashboard(
@@ -28,7 +47,8 @@ async def get_dashboard(
     area: Optional[str] = None,
     periodo: Optional[str] = "7d",
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    cache_headers: dict = Depends(conditional(relative_window=True, per_user=True)),
+    db: Session = Depends(archive_scope("7d"))
 ):
     """
     Dashboard principal de reportes (requiere login)
@@ -88,7 +108,7 @@ async def get_dashboard(
     voice_key = os.getenv("ELEVENLABS_API_KEY") or voice_service.settings.elevenlabs_api_key
     voice_enabled = bool(voice_key)
 
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "reports_dashboard.html",
         {
             "request": request,
@@ -102,10 +122,53 @@ async def get_dashboard(
             "voice_enabled": voice_enabled
         }
     )
+    response.headers.update(cache_headers)
+    return response
+
+@router.get("/stream")
+async def stream_dashboard_updates(
+    request: Request,
+    area: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Server-Sent Events con los incrementos por área/etapa de cada envío nuevo
+    (el dashboard actualiza sus gráficos sin recargar la página)
+    """
+    filtro = (lambda event: event.get("area") == area) if area else None
+    sub = entries_bus.subscribe(filtro)
+    last_event_id = request.headers.get("last-event-id")
+
+    async def eventos():
+        try:
+            yield "retry: 5000\n\n"
+            # Si el cliente se reconecta tras perder eventos, que recalcule todo
+            if last_event_id and last_event_id.isdigit() and int(last_event_id) < entries_bus.last_id:
+                yield "event: resync\ndata: {}\n\n"
+            while True:
+                event = await sub.get(timeout=settings.sse_heartbeat_seconds)
+                if event is None:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if event["type"] == "resync":
+                    yield "event: resync\ndata: {}\n\n"
+                    break
+                yield f"id: {event['id']}\nevent: delta\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            entries_bus.unsubscribe(sub)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/summary")
 async def get_summary(
-    db: Session = Depends(get_db),
+    _cache: dict = Depends(conditional()),
+    db: Session = Depends(archive_scope()),
     area: Optional[str] = None,
     desde: Optional[datetime] = None,
     hasta: Optional[datetime] = None
@@ -172,82 +235,63 @@ async def get_summary(
         "por_etapa": por_etapa
     }
 
+@router.post("/query", response_model=ReportQueryResponse)
+async def query_report(
+    query: ReportQuery,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Consulta agregada genérica: dimensiones y medidas de una lista blanca,
+    filtros exactos y grano temporal opcional, en un solo GROUP BY
+    """
+    try:
+        return run_query(db, query)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
 @router.get("/anomalies")
-async def get_anomalies(db: Session = Depends(get_db)):
+async def get_anomalies(
+    db: Session = Depends(get_db),
+    area: Optional[str] = None,
+    desde: Optional[date] = None,
+    metodo: Optional[Literal["ewma", "cusum", "binomial"]] = None,
+    severidad: Optional[Literal["alta", "media"]] = None,
+    limit: int = Query(200, ge=1, le=1000)
+):
     """
-    Detectar anomalías en el cumplimiento (patrones inusuales)
+    Anomalías detectadas (EWMA, CUSUM, prueba binomial) por el motor programado
     """
-    # Obtener datos de los últimos 30 días
-    desde = datetime.now() - timedelta(days=30)
-    entries = db.query(ChecklistEntrySQL).filter(
-        ChecklistEntrySQL.fecha_hora >= desde
-    ).all()
-    
-    anomalies = []
-    
-    # Detectar áreas con cumplimiento < 50%
-    area_stats = {}
-    for entry in entries:
-        if entry.area not in area_stats:
-            area_stats[entry.area] = {"total": 0, "cumple": 0}
-        area_stats[entry.area]["total"] += 1
-        if entry.cumple:
-            area_stats[entry.area]["cumple"] += 1
-    
-    for area, stats in area_stats.items():
-        cumplimiento = (stats["cumple"] / stats["total"] * 100) if stats["total"] > 0 else 0
-        if cumplimiento < 50:
-            anomalies.append({
-                "tipo": "cumplimiento_critico",
-                "area": area,
-                "descripcion": f"Cumplimiento crítico en {area}: {cumplimiento:.1f}%",
-                "severidad": "alta",
-                "valor": cumplimiento
-            })
-        elif cumplimiento < 70:
-            anomalies.append({
-                "tipo": "cumplimiento_bajo",
-                "area": area,
-                "descripcion": f"Cumplimiento bajo en {area}: {cumplimiento:.1f}%",
-                "severidad": "media",
-                "valor": cumplimiento
-            })
-    
-    return {"anomalies": anomalies}
+    stale = anomaly_engine.is_stale(db)
+    if stale:
+        anomaly_engine.refresh_in_background(detect_anomalies_job)
+    return {
+        "anomalies": anomaly_engine.get_anomalies(db, area, desde, metodo, severidad, limit),
+        "stale": stale,
+    }
 
 @router.get("/critical-items")
 async def get_critical_items(
     db: Session = Depends(get_db),
     area: Optional[str] = None,
     desde: Optional[datetime] = None,
-    hasta: Optional[datetime] = None
+    hasta: Optional[datetime] = None,
+    periodo: Optional[Literal["7d", "30d", "90d"]] = None,
+    k: int = Query(10, ge=1, le=100)
 ):
     """
-    Obtener items críticos (registros que no cumplen)
+    Items con más fallas, ordenados por la cota inferior de Wilson de su tasa de falla
     """
-    query = db.query(ChecklistEntrySQL).filter(ChecklistEntrySQL.cumple == False)
-    
-    if area:
-        query = query.filter(ChecklistEntrySQL.area == area)
-    if desde:
-        query = query.filter(ChecklistEntrySQL.fecha_hora >= desde)
-    if hasta:
-        query = query.filter(ChecklistEntrySQL.fecha_hora <= hasta)
-    
-    critical_entries = query.order_by(ChecklistEntrySQL.fecha_hora.desc()).limit(100).all()
-    
-    return [{
-        "id": entry.id,
-        "fecha_hora": entry.fecha_hora.isoformat(),
-        "area": entry.area,
-        "turno": entry.turno,
-        "protocolo_etapa": entry.protocolo_etapa,
-        "observaciones": entry.observaciones
-    } for entry in critical_entries]
+    # Ventanas relativas alineadas a días completos (reutilizan la caché durante el día)
+    if desde is None and periodo:
+        hoy = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        desde = hoy - timedelta(days=int(periodo[:-1]))
+    return top_failing_items(db, area, desde, hasta, k)
 
 @router.get("/turnos-comparison")
 async def get_turnos_comparison(
-    db: Session = Depends(get_db),
+    _cache: dict = Depends(conditional(relative_window=True)),
+    db: Session = Depends(archive_scope("7d")),
     area: Optional[str] = None,
     periodo: Optional[str] = "7d"
 ):
@@ -303,59 +347,38 @@ async def voice_status():
 
 @router.get("/compliance-trends")
 async def get_compliance_trends(
-    db: Session = Depends(get_db),
+    _cache: dict = Depends(conditional(relative_window=True)),
+    db: Session = Depends(archive_scope("30d")),
     area: Optional[str] = None,
     periodo: Optional[str] = "30d",
-    agrupacion: Optional[str] = "day"
+    agrupacion: Literal["hour", "day", "week", "month"] = "day",
+    serie: Optional[Literal["area", "turno"]] = None,
+    tz: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None
 ):
     """
-    Obtener tendencias de cumplimiento en el tiempo
+    Obtener tendencias de cumplimiento en el tiempo (arreglos paralelos por cubeta)
     """
-    # Calcular rango de fechas
-    hasta = datetime.now()
-    if periodo == "7d":
-        desde = hasta - timedelta(days=7)
-    elif periodo == "30d":
-        desde = hasta - timedelta(days=30)
-    elif periodo == "90d":
-        desde = hasta - timedelta(days=90)
-    else:
-        desde = hasta - timedelta(days=30)
-    
-    query = db.query(ChecklistEntrySQL).filter(
-        ChecklistEntrySQL.fecha_hora >= desde
-    )
-    
-    if area:
-        query = query.filter(ChecklistEntrySQL.area == area)
-    
-    entries = query.order_by(ChecklistEntrySQL.fecha_hora).all()
-    
-    # Agrupar por día
-    tendencias = {}
-    for entry in entries:
-        fecha_key = entry.fecha_hora.strftime("%Y-%m-%d")
-        if fecha_key not in tendencias:
-            tendencias[fecha_key] = {"total": 0, "cumple": 0}
-        tendencias[fecha_key]["total"] += 1
-        if entry.cumple:
-            tendencias[fecha_key]["cumple"] += 1
-    
-    # Convertir a lista ordenada con porcentajes
-    resultado = []
-    for fecha, stats in sorted(tendencias.items()):
-        resultado.append({
-            "fecha": fecha,
-            "total": stats["total"],
-            "cumple": stats["cumple"],
-            "porcentaje": (stats["cumple"] / stats["total"] * 100) if stats["total"] > 0 else 0
-        })
-    
-    return resultado
+    # Rango explícito o relativo al periodo (fecha_hora está en UTC)
+    if hasta is None:
+        hasta = datetime.utcnow()
+    if desde is None:
+        if periodo == "7d":
+            desde = hasta - timedelta(days=7)
+        elif periodo == "90d":
+            desde = hasta - timedelta(days=90)
+        else:
+            desde = hasta - timedelta(days=30)
+
+    try:
+        return compliance_trends(db, desde, hasta, agrupacion=agrupacion, area=area, serie=serie, tz=tz)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 @router.get("/export/pdf")
 async def export_report_to_pdf(
-    db: Session = Depends(get_db),
+    db: Session = Depends(archive_scope()),
     current_user: User = Depends(get_current_active_user),
     area: Optional[str] = None,
     desde: Optional[datetime] = None,
@@ -401,7 +424,8 @@ async def export_report_to_pdf(
     
         # Generar PDF
         try:
-            pdf_bytes = export_service.export_report_to_pdf(summary)
+            with EXPORT_DURATION.time(format="pdf"):
+                pdf_bytes = export_service.export_report_to_pdf(summary)
         
             # Crear nombre de archivo con timestamp
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -428,50 +452,7 @@ async def get_recommendations(
     """
     Obtener recomendaciones inteligentes basadas en el cumplimiento
     """
-    # Calcular rango de fechas
-    hasta = datetime.now()
-    if periodo == "7d":
-        desde = hasta - timedelta(days=7)
-    elif periodo == "30d":
-        desde = hasta - timedelta(days=30)
-    elif periodo == "90d":
-        desde = hasta - timedelta(days=90)
-    else:
-        desde = hasta - timedelta(days=7)
-    
-    # Consultar datos
-    query = db.query(ChecklistEntrySQL).filter(
-        ChecklistEntrySQL.fecha_hora >= desde
-    )
-    
-    if area:
-        query = query.filter(ChecklistEntrySQL.area == area)
-    
-    entries = query.all()
-    
-    # Calcular resumen
-    total_items = len(entries)
-    items_cumplidos = len([e for e in entries if e.cumple])
-    porcentaje_cumplimiento = round((items_cumplidos / total_items * 100) if total_items > 0 else 0, 1)
-    
-    # Agrupar por etapa
-    cumplimiento_por_etapa = {}
-    for etapa in ["prescripción", "preparación", "administración"]:
-        items_etapa = [e for e in entries if e.protocolo_etapa == etapa]
-        cumplidos_etapa = len([e for e in items_etapa if e.cumple])
-        total_etapa = len(items_etapa)
-        cumplimiento_por_etapa[etapa] = {
-            "total": total_etapa,
-            "cumplidos": cumplidos_etapa,
-            "porcentaje": round((cumplidos_etapa / total_etapa * 100) if total_etapa > 0 else 0, 1)
-        }
-    
-    summary = {
-        "total_items": total_items,
-        "items_cumplidos": items_cumplidos,
-        "porcentaje_cumplimiento": porcentaje_cumplimiento,
-        "cumplimiento_por_etapa": cumplimiento_por_etapa
-    }
+    summary = build_voice_summary(db, area, periodo)
     
     # Generar recomendaciones
     recomendaciones = voice_service.get_recommendations(summary)
@@ -488,57 +469,15 @@ async def get_voice_summary(
     """
     Generar audio del resumen de reportes usando ElevenLabs
     """
-    # Calcular rango de fechas
-    hasta = datetime.now()
-    if periodo == "7d":
-        desde = hasta - timedelta(days=7)
-    elif periodo == "30d":
-        desde = hasta - timedelta(days=30)
-    elif periodo == "90d":
-        desde = hasta - timedelta(days=90)
-    else:
-        desde = hasta - timedelta(days=7)
+    # Mismo cálculo que usa el precalentado, para que la narrativa coincida con la caché
+    summary = build_voice_summary(db, area, periodo)
     
-    # Consultar datos
-    query = db.query(ChecklistEntrySQL).filter(
-        ChecklistEntrySQL.fecha_hora >= desde
-    )
+    # Generar audio en streaming: el cliente empieza a reproducir con el primer chunk
+    audio_stream = await voice_service.stream_report_speech(summary)
     
-    if area:
-        query = query.filter(ChecklistEntrySQL.area == area)
-    
-    entries = query.all()
-    
-    # Calcular resumen
-    total_items = len(entries)
-    items_cumplidos = len([e for e in entries if e.cumple])
-    porcentaje_cumplimiento = round((items_cumplidos / total_items * 100) if total_items > 0 else 0, 1)
-    
-    # Agrupar por etapa
-    cumplimiento_por_etapa = {}
-    for etapa in ["prescripción", "preparación", "administración"]:
-        items_etapa = [e for e in entries if e.protocolo_etapa == etapa]
-        cumplidos_etapa = len([e for e in items_etapa if e.cumple])
-        total_etapa = len(items_etapa)
-        cumplimiento_por_etapa[etapa] = {
-            "total": total_etapa,
-            "cumplidos": cumplidos_etapa,
-            "porcentaje": round((cumplidos_etapa / total_etapa * 100) if total_etapa > 0 else 0, 1)
-        }
-    
-    summary = {
-        "total_items": total_items,
-        "items_cumplidos": items_cumplidos,
-        "porcentaje_cumplimiento": porcentaje_cumplimiento,
-        "cumplimiento_por_etapa": cumplimiento_por_etapa
-    }
-    
-    # Generar audio
-    audio_bytes = voice_service.generate_report_speech(summary)
-    
-    if audio_bytes:
+    if audio_stream is not None:
         return StreamingResponse(
-            io.BytesIO(audio_bytes),
+            audio_stream,
             media_type="audio/mpeg",
             headers={"Content-Disposition": "attachment; filename=reporte_voz.mp3"}
         )
@@ -549,4 +488,4 @@ async def get_voice_summary(
                 "Servicio de voz no disponible. Verifica ELEVENLABS_API_KEY en .env "
                 "y que tu clave tenga el permiso 'text_to_speech' habilitado en ElevenLabs."
             )
-        )
\ No newline at end of file
+        )
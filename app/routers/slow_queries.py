@@ -0,0 +1,33 @@
+"""
+Consulta del registro de consultas lentas (sólo administradores)
+"""
+from fastapi import APIRouter, Depends, Query
+from app.auth.users import get_current_admin_user
+from app.models.user import User
+from app.db.database import slow_query_log
+
+router = APIRouter()
+
+
+@router.get("")
+async def list_slow_queries(
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Últimas consultas que superaron el umbral, con su plan"""
+    return {
+        "threshold_ms": slow_query_log.threshold * 1000,
+        "records": slow_query_log.recent(limit)
+    }
+
+
+@router.get("/statements")
+async def slow_query_statements(current_user: User = Depends(get_current_admin_user)):
+    """Agregado por sentencia normalizada (ordenado por tiempo total)"""
+    return slow_query_log.statements()
+
+
+@router.delete("")
+async def clear_slow_queries(current_user: User = Depends(get_current_admin_user)):
+    slow_query_log.clear()
+    return {"status": "ok"}
@@ -1,18 +1,138 @@
+import logging
 from fastapi import FastAPI
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from app.services.alert_service import AlertService
+from app.config import settings
+from app.db.database import SessionLocal
+from app.db.locks import FileLock, lock_path_for
+from app.services.alert_monitor import alert_monitor
+
+logger = logging.getLogger(__name__)
+
+
+def evaluate_alerts_job():
+    """
+    Tick del evaluador incremental de alertas (SQLite).
+    Se ejecuta en el thread pool del scheduler para no bloquear el event loop.
+    """
+    db = SessionLocal()
+    try:
+        alertas = alert_monitor.tick(db)
+        if alertas:
+            logger.info("alertas activas", extra={"alerts": len(alertas)})
+    except Exception:
+        db.rollback()
+        logger.exception("error evaluando alertas")
+    finally:
+        db.close()
+
+
+def detect_anomalies_job():
+    """Rollup diario incremental y detección de anomalías (thread pool del scheduler)"""
+    from app.services.anomaly_engine import anomaly_engine
+    db = SessionLocal()
+    try:
+        detectadas = anomaly_engine.tick(db)
+        if detectadas:
+            logger.info("anomalías detectadas", extra={"anomalies": detectadas})
+    except Exception:
+        db.rollback()
+        logger.exception("error detectando anomalías")
+    finally:
+        db.close()
+
+
+def archive_job():
+    """Archivar los meses fuera de la ventana de retención (thread pool del scheduler)"""
+    from app.db.archive import archive_old_months
+    try:
+        archivados = archive_old_months()
+        if archivados:
+            logger.info("meses archivados", extra={"months": len(archivados)})
+    except Exception:
+        logger.exception("error archivando meses")
+
+
+def acquire_scheduler_lock(app: FastAPI) -> bool:
+    """Elección de líder entre workers: el lock se mantiene mientras viva el proceso"""
+    lock = FileLock(lock_path_for(settings.database_url, "scheduler"))
+    if not lock.acquire(blocking=False):
+        return False
+    app.state.scheduler_lock = lock
+    return True
+
+
+async def warm_voice_job(voice_warmer):
+    """Recibe el LazyService: el VoiceService se construye en la primera ejecución, no al arrancar"""
+    await voice_warmer.warm()
+
+
+def setup_scheduler(app: FastAPI, voice_warmer=None):
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-def setup_scheduler(app: FastAPI):
     scheduler = AsyncIOScheduler()
-    alert_service = AlertService()
-    
-    # Programar procesamiento de alertas cada hora
+
+    # Evaluación incremental de alertas sobre SQLite
+    scheduler.add_job(
+        evaluate_alerts_job,
+        'interval',
+        seconds=settings.alert_eval_interval_seconds,
+        id='evaluate_alerts',
+        max_instances=1,
+        coalesce=True
+    )
+
+    # Rollup diario + motor de anomalías
     scheduler.add_job(
-        alert_service.process_alerts,
+        detect_anomalies_job,
         'interval',
-        hours=1,
-        id='process_alerts'
+        minutes=settings.anomaly_interval_minutes,
+        id='detect_anomalies',
+        max_instances=1,
+        coalesce=True
     )
-    
+
+    # Precalentado de resúmenes de voz (sólo sintetiza si la narrativa cambió)
+    if voice_warmer is not None:
+        scheduler.add_job(
+            warm_voice_job,
+            'interval',
+            args=[voice_warmer],
+            minutes=settings.voice_warm_interval_minutes,
+            id='warm_voice_summaries',
+            max_instances=1,
+            coalesce=True
+        )
+
+    # Archivo diario de meses fríos (sólo si hay ventana de retención)
+    if settings.archive_retention_months > 0:
+        scheduler.add_job(
+            archive_job,
+            'cron',
+            hour=3,
+            id='archive_cold_months',
+            max_instances=1,
+            coalesce=True
+        )
+
+    # Programar procesamiento de alertas de Snowflake cada hora (sólo si está configurado)
+    if settings.snowflake_account:
+        from app.services.alert_service import AlertService
+        alert_service = AlertService()
+        scheduler.add_job(
+            alert_service.process_alerts,
+            'interval',
+            hours=1,
+            id='process_alerts'
+        )
+
     scheduler.start()
-    app.state.scheduler = scheduler  # Guardar referencia al scheduler
\ No newline at end of file
+    app.state.scheduler = scheduler  # Guardar referencia al scheduler
+    return scheduler
+
+
+def shutdown_scheduler(app: FastAPI):
+    scheduler = getattr(app.state, "scheduler", None)
+    if scheduler is not None:
+        scheduler.shutdown(wait=False)
+    lock = getattr(app.state, "scheduler_lock", None)
+    if lock is not None:
+        lock.release()
@@ -0,0 +1,247 @@
+"""
+Evaluación incremental de alertas para SQLite.
+
+Mantiene en memoria contadores por (área, etapa) en buckets horarios y sólo
+lee de checklist_entries las filas con id mayor que la última marca de agua
+procesada. La marca de agua se persiste en alert_watermarks para poder
+reconstruir la ventana tras un reinicio.
+
+Sólo el worker líder (el que tiene el scheduler) ejecuta tick(). Las alertas
+activas se guardan en alert_snapshots en la misma transacción que la marca
+de agua; los demás workers las leen de ahí y nunca evalúan, así que el
+historial no se duplica por worker.
+"""
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from app.models.checklist_entry import ChecklistEntrySQL
+from app.models.alert_config import AlertSnapshotSQL, AlertWatermarkSQL
+from app.services.alert_service_sqlite import AlertService, severidad
+
+BUCKET_FORMAT = "%Y-%m-%d %H:00:00"
+
+
+def _bucket():
+    return func.strftime(BUCKET_FORMAT, ChecklistEntrySQL.fecha_hora)
+
+
+def _hora(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+class _Ventana:
+    """Ventana deslizante de buckets horarios con totales acumulados"""
+
+    __slots__ = ("horas", "buckets", "total", "cumple", "ultima_revision")
+
+    def __init__(self, horas: int):
+        self.horas = horas
+        self.buckets = deque()  # [hora, total, cumple] ordenados por hora
+        self.total = 0
+        self.cumple = 0
+        self.ultima_revision: Optional[datetime] = None
+
+    def agregar(self, hora: datetime, total: int, cumple: int, ultima: Optional[datetime]):
+        # Caso habitual: la fila cae en el bucket más reciente o en uno nuevo
+        if not self.buckets or self.buckets[-1][0] < hora:
+            self.buckets.append([hora, total, cumple])
+        else:
+            for bucket in reversed(self.buckets):
+                if bucket[0] == hora:
+                    bucket[1] += total
+                    bucket[2] += cumple
+                    break
+                if bucket[0] < hora:
+                    # Fila atrasada (p. ej. sincronización tardía): insertar en orden
+                    idx = self.buckets.index(bucket) + 1
+                    self.buckets.insert(idx, [hora, total, cumple])
+                    break
+            else:
+                self.buckets.appendleft([hora, total, cumple])
+        self.total += total
+        self.cumple += cumple
+        if ultima and (self.ultima_revision is None or ultima > self.ultima_revision):
+            self.ultima_revision = ultima
+
+    def expirar(self, ahora: datetime):
+        limite = _hora(ahora - timedelta(hours=self.horas))
+        while self.buckets and self.buckets[0][0] < limite:
+            _, total, cumple = self.buckets.popleft()
+            self.total -= total
+            self.cumple -= cumple
+
+
+class IncrementalAlertEvaluator:
+    """Evaluador de alertas cuyo coste es proporcional a los datos nuevos"""
+
+    def __init__(self, alert_service: Optional[AlertService] = None, nombre: str = "alertas_sqlite"):
+        self.alert_service = alert_service or AlertService()
+        self.nombre = nombre
+        self._lock = threading.Lock()
+        self._ventanas: Dict[Tuple[str, str], _Ventana] = {}
+        self._horas_por_area: Optional[Dict[Optional[str], int]] = None
+        self._watermark: Optional[int] = None
+        self._activas: Dict[Tuple[str, str], str] = {}
+        self._snapshot: List[dict] = []
+        self._ultimo_tick: Optional[datetime] = None
+
+    # --- Marca de agua ---------------------------------------------------
+
+    def _load_watermark(self, db: Session) -> Optional[int]:
+        row = db.query(AlertWatermarkSQL).filter(AlertWatermarkSQL.nombre == self.nombre).first()
+        return row.ultimo_id if row else None
+
+    def _load_snapshot(self, db: Session) -> List[dict]:
+        row = db.query(AlertSnapshotSQL).filter(AlertSnapshotSQL.nombre == self.nombre).first()
+        return row.alertas if row else []
+
+    def _save_snapshot(self, db: Session, alertas: List[dict]):
+        row = db.query(AlertSnapshotSQL).filter(AlertSnapshotSQL.nombre == self.nombre).first()
+        if row is None:
+            row = AlertSnapshotSQL(nombre=self.nombre)
+            db.add(row)
+        row.alertas = [
+            {k: v.isoformat() if isinstance(v, datetime) else v for k, v in a.items()}
+            for a in alertas
+        ]
+        row.updated_at = datetime.utcnow()
+
+    def _save_watermark(self, db: Session):
+        row = db.query(AlertWatermarkSQL).filter(AlertWatermarkSQL.nombre == self.nombre).first()
+        if row is None:
+            row = AlertWatermarkSQL(nombre=self.nombre)
+            db.add(row)
+        row.ultimo_id = self._watermark or 0
+        db.commit()
+
+    # --- Contadores ------------------------------------------------------
+
+    def _horas_para(self, area: str) -> Optional[int]:
+        horas = self._horas_por_area.get(area)
+        return horas if horas is not None else self._horas_por_area.get(None)
+
+    def _aplicar(self, rows):
+        """Sumar filas agrupadas (area, etapa, hora, total, cumple, max_id, ultima)"""
+        max_id = self._watermark or 0
+        for area, etapa, hora, total, cumple, fila_max_id, ultima in rows:
+            if fila_max_id and fila_max_id > max_id:
+                max_id = fila_max_id
+            horas = self._horas_para(area)
+            if horas is None:
+                continue
+            ventana = self._ventanas.get((area, etapa))
+            if ventana is None:
+                ventana = self._ventanas[(area, etapa)] = _Ventana(horas)
+            ventana.agregar(datetime.strptime(hora, BUCKET_FORMAT), total, cumple or 0, ultima)
+        self._watermark = max_id
+
+    def _query_agrupada(self, db: Session, *filtros):
+        bucket = _bucket()
+        return (
+            db.query(
+                ChecklistEntrySQL.area,
+                ChecklistEntrySQL.protocolo_etapa,
+                bucket,
+                func.count(ChecklistEntrySQL.id),
+                func.sum(case((ChecklistEntrySQL.cumple == True, 1), else_=0)),
+                func.max(ChecklistEntrySQL.id),
+                func.max(ChecklistEntrySQL.fecha_hora)
+            )
+            .filter(*filtros)
+            .group_by(ChecklistEntrySQL.area, ChecklistEntrySQL.protocolo_etapa, bucket)
+            .all()
+        )
+
+    def _seed(self, db: Session, ahora: datetime):
+        """
+        Reconstruir la ventana en frío (arranque o cambio de ventanas)
+        con una única consulta agrupada hasta la marca de agua persistida.
+        """
+        self._ventanas = {}
+        # Estado previo persistido: tras un reinicio no se vuelven a registrar alertas ya activas
+        self._activas = {(a["area"], a["protocolo_etapa"]): a["severidad"] for a in self._load_snapshot(db)}
+        persisted = self._load_watermark(db)
+        if persisted is None:
+            persisted = db.query(func.max(ChecklistEntrySQL.id)).scalar() or 0
+
+        max_horas = max(self._horas_por_area.values()) if self._horas_por_area else 0
+        desde = _hora(ahora - timedelta(hours=max_horas))
+        rows = self._query_agrupada(
+            db, ChecklistEntrySQL.id <= persisted, ChecklistEntrySQL.fecha_hora >= desde
+        )
+        self._watermark = 0
+        self._aplicar(rows)
+        self._watermark = persisted
+
+    def _ingerir(self, db: Session):
+        self._aplicar(self._query_agrupada(db, ChecklistEntrySQL.id > self._watermark))
+
+    # --- Evaluación ------------------------------------------------------
+
+    def tick(self, db: Session) -> List[dict]:
+        """
+        Procesar filas nuevas, evaluar umbrales y registrar transiciones
+        de estado en alert_history
+        """
+        with self._lock:
+            configs = self.alert_service.get_active_configs(db)
+            horas_por_area = {area: c["intervalo_horas"] for area, c in configs.items()}
+            ahora = datetime.utcnow()
+
+            if self._watermark is None or horas_por_area != self._horas_por_area:
+                self._horas_por_area = horas_por_area
+                self._seed(db, ahora)
+            self._ingerir(db)
+
+            alertas = []
+            for (area, etapa), ventana in self._ventanas.items():
+                ventana.expirar(ahora)
+                config = configs.get(area) or configs.get(None)
+                if config is None or ventana.total == 0:
+                    continue
+                cumplimiento = ventana.cumple / ventana.total * 100
+                nivel = severidad(cumplimiento, config)
+                if nivel is not None:
+                    alertas.append({
+                        "area": area,
+                        "protocolo_etapa": etapa,
+                        "total": ventana.total,
+                        "cumple": ventana.cumple,
+                        "ultima_revision": ventana.ultima_revision,
+                        "cumplimiento": cumplimiento,
+                        "severidad": nivel,
+                        "config_id": config["id"]
+                    })
+
+            # Registrar sólo alertas nuevas o que cambian de severidad
+            activas = {(a["area"], a["protocolo_etapa"]): a["severidad"] for a in alertas}
+            nuevas = [
+                a for a in alertas
+                if self._activas.get((a["area"], a["protocolo_etapa"])) != a["severidad"]
+            ]
+            self._activas = activas
+            if nuevas:
+                self.alert_service.record_history(db, nuevas)
+
+            alertas.sort(key=lambda x: x["cumplimiento"])
+            self._save_snapshot(db, alertas)
+            self._save_watermark(db)
+            self._snapshot = alertas
+            self._ultimo_tick = ahora
+            return alertas
+
+    def get_alerts(self, db: Session, area: Optional[str] = None) -> List[dict]:
+        """
+        Alertas actuales: instantánea en memoria en el worker que evalúa, o la
+        persistida por él en los demás (nunca se evalúa en línea)
+        """
+        alertas = self._snapshot if self._ultimo_tick is not None else self._load_snapshot(db)
+        if area:
+            alertas = [a for a in alertas if a["area"] == area]
+        return alertas
+
+
+alert_monitor = IncrementalAlertEvaluator()
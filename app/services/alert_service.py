@@ -1,11 +1,9 @@
 from typing import List, Optional
 from datetime import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import os
 from app.db.snowflake import get_snowflake_connection
 from app.models.auth import User
+from app.services.notification_service import NotificationDispatcher
 
 class AlertService:
     def __init__(self):
@@ -13,6 +11,7 @@ class AlertService:
         self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
         self.smtp_username = os.getenv("SMTP_USERNAME")
         self.smtp_password = os.getenv("SMTP_PASSWORD")
+        self.dispatcher = NotificationDispatcher.from_env()
         
     async def get_critical_alerts(self, area: Optional[str] = None) -> List[dict]:
         """
@@ -61,35 +60,18 @@ class AlertService:
         finally:
             cursor.close()
 
-    async def send_email_alert(self, recipient: str, subject: str, body: str):
+    async def send_email_alert(self, recipient: str, subject: str, body: str, dedup_key: Optional[str] = None):
         """
-        Enviar alerta por email
+        Enviar alerta por email (conexión SMTP reutilizada del pool)
         """
-        if not all([self.smtp_username, self.smtp_password]):
-            raise ValueError("SMTP credentials not configured")
-            
-        msg = MIMEMultipart()
-        msg["From"] = self.smtp_username
-        msg["To"] = recipient
-        msg["Subject"] = subject
-        
-        msg.attach(MIMEText(body, "html"))
-        
-        try:
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
-                return True
-        except Exception as e:
-            print(f"Error sending email: {e}")
-            return False
+        return await self.dispatcher.send(recipient, subject, body, dedup_key)
 
     async def process_alerts(self):
         """
         Procesar y enviar alertas según los criterios definidos
         """
         alerts = await self.get_critical_alerts()
+        mensajes = []
         
         for alert in alerts:
             if alert["emails_supervisores"]:
@@ -105,6 +87,11 @@ class AlertService:
                 <p><a href="https://medcheck.app/reports/dashboard?area={alert['area']}">Ver Dashboard</a></p>
                 """
                 
-                # Enviar a cada supervisor
+                # Una alerta por supervisor; se deduplica por área/etapa durante el enfriamiento
+                dedup_key = f"{alert['area']}|{alert['protocolo_etapa']}"
                 for email in alert["emails_supervisores"].split(","):
-                    await self.send_email_alert(email.strip(), subject, body)
\ No newline at end of file
+                    if email.strip():
+                        mensajes.append((email.strip(), subject, body, dedup_key))
+        
+        # Enviar en lote con concurrencia acotada sobre el pool de conexiones
+        return await self.dispatcher.send_batch(mensajes)
\ No newline at end of file
@@ -1,80 +1,232 @@
 """
 Servicio de alertas simplificado para SQLite
 """
-from typing import List, Optional
+from typing import List, Optional, Dict
 from datetime import datetime, timedelta
+from sqlalchemy import func, case
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.models.checklist_entry import ChecklistEntrySQL
+from app.models.alert_config import AlertConfigSQL, AlertHistorySQL
 from app.models.user import User
 
+# Valores por defecto cuando no existe configuración global persistida
+DEFAULT_CONFIG = {
+    "umbral_critico": 70.0,
+    "umbral_advertencia": 85.0,
+    "emails_adicionales": [],
+    "notificar_supervisores": True,
+    "intervalo_horas": 24,
+    "activo": True
+}
+
+CONFIG_FIELDS = tuple(DEFAULT_CONFIG.keys())
+
+
+def _config_to_dict(config: AlertConfigSQL) -> dict:
+    return {
+        "id": config.id,
+        "area": config.area,
+        "umbral_critico": config.umbral_critico,
+        "umbral_advertencia": config.umbral_advertencia,
+        "emails_adicionales": config.emails_adicionales or [],
+        "notificar_supervisores": config.notificar_supervisores,
+        "intervalo_horas": config.intervalo_horas,
+        "activo": config.activo,
+        "created_at": config.created_at,
+        "updated_at": config.updated_at
+    }
+
+
+def severidad(cumplimiento: float, config: dict) -> Optional[str]:
+    """Severidad según los umbrales de la configuración (None si no hay alerta)"""
+    if cumplimiento < config["umbral_critico"]:
+        return "critica" if cumplimiento < settings.alert_critica_below else "alta"
+    if cumplimiento < config["umbral_advertencia"]:
+        return "advertencia"
+    return None
+
+
 class AlertService:
     """Servicio simplificado de alertas para SQLite"""
-    
-    def get_critical_alerts(self, db: Session, area: Optional[str] = None) -> List[dict]:
+
+    def get_active_configs(self, db: Session) -> Dict[Optional[str], dict]:
         """
-        Obtener alertas críticas basadas en umbrales de cumplimiento
+        Cargar todas las configuraciones activas en una sola consulta.
+        La clave None corresponde a la configuración global; si no existe
+        ninguna fila global se usan los valores por defecto.
         """
-        # Obtener registros de las últimas 24 horas
-        desde = datetime.now() - timedelta(hours=24)
-        
-        query = db.query(ChecklistEntrySQL).filter(
-            ChecklistEntrySQL.fecha_hora >= desde
+        configs = {
+            c.area: _config_to_dict(c)
+            for c in db.query(AlertConfigSQL).filter(AlertConfigSQL.activo == True).all()
+        }
+        if None not in configs:
+            global_row = db.query(AlertConfigSQL.id).filter(AlertConfigSQL.area.is_(None)).first()
+            # Sin fila global: comportamiento por defecto (todas las áreas activas)
+            if global_row is None:
+                configs[None] = {"id": None, "area": None, **DEFAULT_CONFIG}
+        return configs
+
+    def evaluate_alerts(
+        self,
+        db: Session,
+        area: Optional[str] = None,
+        configs: Optional[Dict[Optional[str], dict]] = None,
+        registrar: bool = False
+    ) -> List[dict]:
+        """
+        Evaluar todas las áreas con una única consulta agrupada.
+
+        Cada área usa su propia configuración activa (o la global si no tiene);
+        la ventana de cada área se resuelve en SQL con un CASE sobre el área,
+        de modo que el coste no depende del número de configuraciones.
+        """
+        if configs is None:
+            configs = self.get_active_configs(db)
+        if not configs:
+            return []
+
+        ahora = datetime.utcnow()
+        global_config = configs.get(None)
+        area_configs = {k: v for k, v in configs.items() if k is not None}
+
+        cutoffs = {
+            k: ahora - timedelta(hours=v["intervalo_horas"])
+            for k, v in area_configs.items()
+        }
+        global_cutoff = ahora - timedelta(hours=global_config["intervalo_horas"]) if global_config else None
+        min_cutoff = min(list(cutoffs.values()) + ([global_cutoff] if global_cutoff else []))
+
+        if cutoffs:
+            cutoff_expr = case(cutoffs, value=ChecklistEntrySQL.area, else_=global_cutoff or ahora)
+        else:
+            cutoff_expr = global_cutoff
+
+        cumple_sum = func.sum(case((ChecklistEntrySQL.cumple == True, 1), else_=0))
+        query = db.query(
+            ChecklistEntrySQL.area,
+            ChecklistEntrySQL.protocolo_etapa,
+            func.count(ChecklistEntrySQL.id),
+            cumple_sum,
+            func.max(ChecklistEntrySQL.fecha_hora)
+        ).filter(
+            # Filtro sargable sobre el índice de fecha_hora + ventana exacta por área
+            ChecklistEntrySQL.fecha_hora >= min_cutoff,
+            ChecklistEntrySQL.fecha_hora >= cutoff_expr
         )
-        
+
         if area:
             query = query.filter(ChecklistEntrySQL.area == area)
-        
-        entries = query.all()
-        
-        # Agrupar por área y etapa
-        agrupado = {}
-        for entry in entries:
-            key = f"{entry.area}|{entry.protocolo_etapa}"
-            if key not in agrupado:
-                agrupado[key] = {
-                    "area": entry.area,
-                    "protocolo_etapa": entry.protocolo_etapa,
-                    "total": 0,
-                    "cumple": 0,
-                    "ultima_revision": entry.fecha_hora
-                }
-            
-            agrupado[key]["total"] += 1
-            if entry.cumple:
-                agrupado[key]["cumple"] += 1
-            
-            if entry.fecha_hora > agrupado[key]["ultima_revision"]:
-                agrupado[key]["ultima_revision"] = entry.fecha_hora
-        
-        # Filtrar alertas críticas (cumplimiento < 70%)
+        if global_config is None:
+            # Sin configuración global sólo se evalúan las áreas configuradas
+            query = query.filter(ChecklistEntrySQL.area.in_(list(area_configs.keys())))
+
+        rows = query.group_by(ChecklistEntrySQL.area, ChecklistEntrySQL.protocolo_etapa).all()
+
         alertas = []
-        for stats in agrupado.values():
-            cumplimiento = (stats["cumple"] / stats["total"] * 100) if stats["total"] > 0 else 0
-            if cumplimiento < 70:
+        for area_row, etapa, total, cumple, ultima_revision in rows:
+            config = area_configs.get(area_row, global_config)
+            cumplimiento = (cumple / total * 100) if total > 0 else 0
+            nivel = severidad(cumplimiento, config)
+            if nivel is not None:
                 alertas.append({
-                    **stats,
+                    "area": area_row,
+                    "protocolo_etapa": etapa,
+                    "total": total,
+                    "cumple": cumple,
+                    "ultima_revision": ultima_revision,
                     "cumplimiento": cumplimiento,
-                    "severidad": "critica" if cumplimiento < 50 else "alta"
+                    "severidad": nivel,
+                    "config_id": config["id"]
                 })
-        
-        return sorted(alertas, key=lambda x: x["cumplimiento"])
-    
-    def get_config(self, db: Session) -> dict:
+
+        alertas.sort(key=lambda x: x["cumplimiento"])
+
+        if registrar and alertas:
+            self.record_history(db, alertas)
+
+        return alertas
+
+    def get_critical_alerts(self, db: Session, area: Optional[str] = None) -> List[dict]:
+        """
+        Obtener alertas críticas basadas en umbrales de cumplimiento
+        """
+        return self.evaluate_alerts(db, area=area)
+
+    def record_history(self, db: Session, alertas: List[dict], emails: Optional[List[str]] = None):
+        """
+        Registrar alertas evaluadas en alert_history
+        """
+        for alerta in alertas:
+            db.add(AlertHistorySQL(
+                config_id=alerta.get("config_id"),
+                area=alerta["area"],
+                tipo=alerta["severidad"],
+                mensaje=(
+                    f"Cumplimiento de {alerta['cumplimiento']:.1f}% en "
+                    f"{alerta['area']} - {alerta['protocolo_etapa']}"
+                ),
+                cumplimiento=alerta["cumplimiento"],
+                emails_notificados=emails or []
+            ))
+        db.commit()
+
+    def get_history(self, db: Session, limit: int = 20) -> List[dict]:
+        """
+        Obtener historial reciente de alertas
+        """
+        rows = (
+            db.query(AlertHistorySQL)
+            .order_by(AlertHistorySQL.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+        return [{
+            "id": h.id,
+            "fecha_hora": h.created_at,
+            "tipo": h.tipo,
+            "area": h.area,
+            "mensaje": h.mensaje,
+            "cumplimiento": h.cumplimiento,
+            "emails_notificados": h.emails_notificados or [],
+            "enviado": bool(h.emails_notificados)
+        } for h in rows]
+
+    def get_config(self, db: Session, area: Optional[str] = None) -> dict:
         """
         Obtener configuración de alertas
         """
-        # Configuración por defecto
-        return {
-            "umbral_critico": 70.0,
-            "umbral_advertencia": 85.0,
-            "intervalo_horas": 24,
-            "activo": True
-        }
-    
+        config = (
+            db.query(AlertConfigSQL)
+            .filter(AlertConfigSQL.area == area if area else AlertConfigSQL.area.is_(None))
+            .first()
+        )
+        if config is None:
+            # Configuración por defecto
+            return {"area": area, **DEFAULT_CONFIG}
+        return _config_to_dict(config)
+
     def save_config(self, db: Session, config: dict) -> dict:
         """
-        Guardar configuración de alertas
+        Guardar configuración de alertas (una fila por área)
         """
-        # Por ahora retornamos la config que recibimos
-        # TODO: Implementar persistencia en SQLite
-        return config
+        area = config.get("area") or None
+        existing = (
+            db.query(AlertConfigSQL)
+            .filter(AlertConfigSQL.area == area if area else AlertConfigSQL.area.is_(None))
+            .first()
+        )
+        if existing is None:
+            existing = AlertConfigSQL(area=area)
+            db.add(existing)
+
+        for field in CONFIG_FIELDS:
+            if field in config and config[field] is not None:
+                value = config[field]
+                if field == "emails_adicionales":
+                    value = [str(e) for e in value]
+                setattr(existing, field, value)
+
+        db.commit()
+        db.refresh(existing)
+        return _config_to_dict(existing)
@@ -0,0 +1,282 @@
+"""
+Detección estadística de anomalías sobre series diarias de cumplimiento.
+
+1. Rollup: checklist_daily acumula (total, cumple) por día y serie
+   (área, turno, etapa, item) leyendo sólo las filas de checklist_facts con
+   id mayor que la marca de agua "rollup_diario" (alert_watermarks). Las
+   filas tardías caen en su día con un upsert, y el rollup sobrevive al
+   archivo de meses fríos.
+2. Detección: por serie, una línea base p0 (días anteriores a la ventana
+   evaluada, con corrección de Laplace (X+1)/(N+2)) y sobre los últimos
+   ``anomaly_eval_days`` días:
+   - EWMA de la proporción con varianza exacta para n variable
+   - CUSUM inferior de la proporción estandarizada
+   - prueba binomial unilateral: z con corrección de continuidad, o la
+     cola binomial exacta cuando n·p0·(1-p0) es chico
+   Sólo se buscan caídas de cumplimiento.
+3. Persistencia: las anomalías de las series reevaluadas se sincronizan con
+   la tabla anomalies; /reports/anomalies es una lectura por índice que
+   nunca calcula en línea: si el scheduler lleva dos intervalos sin
+   completar un tick responde ``stale`` y lanza uno en segundo plano.
+
+Cada tick reevalúa sólo las series que recibieron datos nuevos; una vez al
+día (la ventana se desplaza) se reevalúan todas.
+"""
+import asyncio
+import math
+import threading
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.db.dimensions import dimension_cache
+from app.db.locks import FileLock, lock_path_for
+from app.models.alert_config import AlertWatermarkSQL
+from app.models.anomaly import AnomalySQL, ChecklistDailySQL
+from app.models.checklist_entry import ChecklistFactSQL
+
+F = ChecklistFactSQL
+D = ChecklistDailySQL
+
+SERIE = ("area_id", "turno_id", "etapa_id", "item_id")
+ROLLUP_BATCH = 100_000
+MIN_BASELINE_TOTAL = 30
+_normal = NormalDist()
+
+Serie = Tuple[int, int, int, int]
+
+
+def binomial_cdf(x: int, n: int, p: float) -> float:
+    """P(X <= x) exacta, en escala logarítmica para no desbordar con n grande"""
+    log_p, log_q = math.log(p), math.log(1 - p)
+    return min(1.0, sum(
+        math.exp(math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1) + k * log_p + (n - k) * log_q)
+        for k in range(x + 1)
+    ))
+
+
+def binomial_z(x: int, n: int, p0: float) -> float:
+    """z de la cola inferior: exacta si la aproximación normal no es fiable"""
+    varianza = n * p0 * (1 - p0)
+    if varianza < 9:
+        return _normal.inv_cdf(min(max(binomial_cdf(x, n, p0), 1e-12), 1 - 1e-12))
+    return (x + 0.5 - n * p0) / math.sqrt(varianza)
+
+
+def detect_series(dias: List[Tuple[date, int, int]], inicio_eval: date) -> List[dict]:
+    """Aplicar los tres métodos a una serie ordenada por día [(dia, total, cumple)]"""
+    base_n = sum(n for d, n, _ in dias if d < inicio_eval)
+    base_x = sum(x for d, _, x in dias if d < inicio_eval)
+    if base_n < MIN_BASELINE_TOTAL:
+        return []
+    p0 = (base_x + 1) / (base_n + 2)
+    var_unit = p0 * (1 - p0)
+
+    lam, limite = settings.anomaly_ewma_lambda, settings.anomaly_ewma_limit
+    k, h = settings.anomaly_cusum_k, settings.anomaly_cusum_h
+    z_umbral = settings.anomaly_z_threshold
+    ewma, varianza, cusum = p0, 0.0, 0.0
+    hallazgos = []
+    for dia, n, x in dias:
+        if dia < inicio_eval or n < settings.anomaly_min_daily_total:
+            continue
+        p = x / n
+        ewma = lam * p + (1 - lam) * ewma
+        varianza = lam ** 2 * var_unit / n + (1 - lam) ** 2 * varianza
+        score_ewma = (ewma - p0) / math.sqrt(varianza)
+        cusum = max(0.0, cusum - (p - p0) / math.sqrt(var_unit / n) - k)
+        score_binomial = binomial_z(x, n, p0)
+
+        base = {"dia": dia, "valor": round(p * 100, 2), "esperado": round(p0 * 100, 2), "total": n}
+        if score_ewma <= -limite:
+            hallazgos.append({**base, "metodo": "ewma", "score": round(score_ewma, 3),
+                              "severidad": "alta" if score_ewma <= -1.5 * limite else "media"})
+        if cusum > h:
+            hallazgos.append({**base, "metodo": "cusum", "score": round(cusum, 3),
+                              "severidad": "alta" if cusum > 2 * h else "media"})
+        if score_binomial <= -z_umbral:
+            hallazgos.append({**base, "metodo": "binomial", "score": round(score_binomial, 3),
+                              "severidad": "alta" if score_binomial <= -1.5 * z_umbral else "media"})
+    return hallazgos
+
+
+class AnomalyEngine:
+    def __init__(self, nombre: str = "rollup_diario"):
+        self.nombre = nombre
+        self._lock = threading.Lock()
+        self._ultimo_completo: Optional[date] = None
+        self._refresco: Optional[asyncio.Task] = None
+
+    def _file_lock(self, db: Session) -> FileLock:
+        return FileLock(lock_path_for(str(db.get_bind().url), "anomalies"))
+
+    # --- Rollup ----------------------------------------------------------
+
+    def _watermark(self, db: Session) -> AlertWatermarkSQL:
+        row = db.query(AlertWatermarkSQL).filter(AlertWatermarkSQL.nombre == self.nombre).first()
+        if row is None:
+            row = AlertWatermarkSQL(nombre=self.nombre, ultimo_id=0)
+            db.add(row)
+        return row
+
+    def update_rollup(self, db: Session) -> Set[Serie]:
+        """Sumar al rollup las filas nuevas por lotes de ids; devuelve las series tocadas"""
+        marca = self._watermark(db)
+        ultimo = db.query(func.max(F.id)).scalar() or 0
+        tabla = D.__table__
+        tocadas: Set[Serie] = set()
+        while marca.ultimo_id < ultimo:
+            hasta = min(marca.ultimo_id + ROLLUP_BATCH, ultimo)
+            filas = (
+                db.query(func.date(F.fecha_hora), F.area_id, F.turno_id, F.etapa_id, F.item_id,
+                         func.count(), func.sum(case((F.cumple == True, 1), else_=0)))  # noqa: E712
+                .filter(F.id > marca.ultimo_id, F.id <= hasta)
+                .group_by(func.date(F.fecha_hora), F.area_id, F.turno_id, F.etapa_id, F.item_id)
+                .all()
+            )
+            if filas:
+                stmt = sqlite_insert(tabla)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["dia", *SERIE],
+                    set_={"total": tabla.c.total + stmt.excluded.total, "cumple": tabla.c.cumple + stmt.excluded.cumple},
+                )
+                db.execute(stmt, [
+                    {"dia": date.fromisoformat(dia), "area_id": a, "turno_id": t, "etapa_id": e, "item_id": i,
+                     "total": total, "cumple": cumple or 0}
+                    for dia, a, t, e, i, total, cumple in filas
+                ])
+                tocadas.update((a, t, e, i) for _, a, t, e, i, _, _ in filas)
+            # Rollup y marca de agua en la misma transacción
+            marca.ultimo_id = hasta
+            db.commit()
+        return tocadas
+
+    # --- Detección -------------------------------------------------------
+
+    def evaluate(self, db: Session, hoy: date, series: Optional[Set[Serie]] = None) -> int:
+        """Reevaluar las series (todas si ``series`` es None) y sincronizar la tabla anomalies"""
+        inicio_eval = hoy - timedelta(days=settings.anomaly_eval_days - 1)
+        inicio_base = inicio_eval - timedelta(days=settings.anomaly_baseline_days)
+        filas = db.execute(
+            select(D.area_id, D.turno_id, D.etapa_id, D.item_id, D.dia, D.total, D.cumple)
+            .where(D.dia >= inicio_base)
+            .order_by(D.area_id, D.turno_id, D.etapa_id, D.item_id, D.dia)
+        ).all()
+
+        nuevas: Dict[tuple, dict] = {}
+        evaluadas: Set[Serie] = set()
+        for clave, grupo in groupby(filas, key=lambda f: tuple(f[:4])):
+            if series is not None and clave not in series:
+                continue
+            evaluadas.add(clave)
+            for hallazgo in detect_series([(f.dia, f.total, f.cumple) for f in grupo], inicio_eval):
+                nuevas[(hallazgo["dia"], *clave, hallazgo["metodo"])] = {**hallazgo, **dict(zip(SERIE, clave))}
+
+        # Sincronizar: borrar las que ya no aplican y actualizar/insertar el resto
+        existentes = db.query(AnomalySQL.id, AnomalySQL.dia, *[getattr(AnomalySQL, c) for c in SERIE], AnomalySQL.metodo).filter(
+            AnomalySQL.dia >= inicio_eval
+        )
+        if series is not None:
+            existentes = existentes.filter(tuple_(*[getattr(AnomalySQL, c) for c in SERIE]).in_(list(evaluadas) or [(-1, -1, -1, -1)]))
+        obsoletas = [fila[0] for fila in existentes if tuple(fila[1:]) not in nuevas]
+        if obsoletas:
+            db.query(AnomalySQL).filter(AnomalySQL.id.in_(obsoletas)).delete(synchronize_session=False)
+        if nuevas:
+            tabla = AnomalySQL.__table__
+            stmt = sqlite_insert(tabla)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["dia", *SERIE, "metodo"],
+                set_={c: stmt.excluded[c] for c in ("score", "valor", "esperado", "total", "severidad")},
+            )
+            ahora = datetime.utcnow()
+            db.execute(stmt, [{**a, "created_at": ahora} for a in nuevas.values()])
+        db.commit()
+        return len(nuevas)
+
+    def tick(self, db: Session) -> Optional[int]:
+        """Rollup incremental + reevaluación; None si otro proceso ya está en ello"""
+        with self._lock:
+            lock = self._file_lock(db)
+            if not lock.acquire(blocking=False):
+                return None
+            try:
+                tocadas = self.update_rollup(db)
+                hoy = datetime.utcnow().date()
+                if self._ultimo_completo != hoy:
+                    detectadas = self.evaluate(db, hoy)
+                    self._ultimo_completo = hoy
+                elif tocadas:
+                    detectadas = self.evaluate(db, hoy, tocadas)
+                else:
+                    detectadas = 0
+                # updated_at marca el último tick completo, haya llegado o no algo nuevo
+                self._watermark(db).updated_at = datetime.utcnow()
+                db.commit()
+                return detectadas
+            finally:
+                lock.release()
+
+    # --- Lectura ---------------------------------------------------------
+
+    def is_stale(self, db: Session) -> bool:
+        """True si ningún proceso completó un tick en los últimos dos intervalos"""
+        marca = db.query(AlertWatermarkSQL.updated_at).filter(AlertWatermarkSQL.nombre == self.nombre).scalar()
+        limite = timedelta(minutes=2 * settings.anomaly_interval_minutes)
+        return marca is None or datetime.utcnow() - marca > limite
+
+    def get_anomalies(
+        self,
+        db: Session,
+        area: Optional[str] = None,
+        desde: Optional[date] = None,
+        metodo: Optional[str] = None,
+        severidad: Optional[str] = None,
+        limit: int = 200,
+    ) -> List[dict]:
+        """Lectura indexada de lo ya persistido; nunca calcula en línea"""
+        desde = desde or datetime.utcnow().date() - timedelta(days=settings.anomaly_eval_days - 1)
+        query = db.query(AnomalySQL).filter(AnomalySQL.dia >= desde)
+        if area:
+            query = query.filter(AnomalySQL.area_id == dimension_cache.lookup("area", area))
+        if metodo:
+            query = query.filter(AnomalySQL.metodo == metodo)
+        if severidad:
+            query = query.filter(AnomalySQL.severidad == severidad)
+        filas = query.order_by(AnomalySQL.dia.desc(), AnomalySQL.severidad, AnomalySQL.score).limit(limit).all()
+
+        resultado = []
+        for a in filas:
+            nombres = {
+                "area": dimension_cache.name("area", a.area_id),
+                "turno": dimension_cache.name("turno", a.turno_id),
+                "protocolo_etapa": dimension_cache.name("etapa", a.etapa_id),
+                "item": dimension_cache.name("item", a.item_id),
+            }
+            resultado.append({
+                "tipo": a.metodo,
+                **nombres,
+                "fecha": a.dia.isoformat(),
+                "descripcion": (
+                    f"{nombres['item']} en {nombres['area']} (turno {nombres['turno']}): "
+                    f"{a.valor:.1f}% vs {a.esperado:.1f}% esperado"
+                ),
+                "severidad": a.severidad,
+                "valor": a.valor,
+                "esperado": a.esperado,
+                "score": a.score,
+                "total": a.total,
+            })
+        return resultado
+
+    def refresh_in_background(self, job: Callable[[], None]) -> None:
+        """Lanzar ``job`` en un hilo sin bloquear el event loop; uno a la vez por proceso"""
+        if self._refresco is not None and not self._refresco.done():
+            return
+        self._refresco = asyncio.get_running_loop().create_task(asyncio.to_thread(job))
+
+
+anomaly_engine = AnomalyEngine()
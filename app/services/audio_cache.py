@@ -0,0 +1,191 @@
+"""
+Caché de audio en disco direccionada por contenido.
+
+Cada clip se guarda como <sha256>.mp3, donde el hash se calcula sobre
+(voice_id, model_id, sha256 del texto). Un índice en memoria mantiene el
+orden LRU y el tamaño total para expulsar los clips menos usados cuando se
+supera el límite configurado. Con varios workers cada uno tiene su índice:
+un clip que no está en el índice se busca en disco (lo pudo escribir otro
+worker) y se incorpora.
+"""
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from app.metrics import record_cache
+
+EXTENSION = ".mp3"
+
+logger = logging.getLogger(__name__)
+
+
+def audio_cache_key(voice_id: str, model_id: str, text: str) -> str:
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{voice_id}\n{model_id}\n{text_hash}".encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Caché LRU acotada por tamaño con índice en memoria"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{EXTENSION}"
+
+    def _load_index(self):
+        """Reconstruir el índice desde disco, ordenado por última modificación"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            files = [p for p in self.directory.iterdir() if p.suffix == EXTENSION]
+        except OSError:
+            logger.warning("no se pudo abrir la caché de audio", extra={"dir": str(self.directory)}, exc_info=True)
+            return
+        for p in sorted(files, key=lambda f: f.stat().st_mtime):
+            size = p.stat().st_size
+            self._index[p.stem] = size
+            self._total += size
+
+    def _adopt(self, key: str) -> bool:
+        """Indexar un clip que está en disco pero no en el índice (escrito por otro worker)"""
+        try:
+            size = self._path(key).stat().st_size
+        except OSError:
+            return False
+        with self._lock:
+            if key not in self._index:
+                self._index[key] = size
+                self._total += size
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index or self._path(key).exists()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            indexado = key in self._index
+            if indexado:
+                self._index.move_to_end(key)
+        if not indexado and not self._adopt(key):
+            with self._lock:
+                self.misses += 1
+            record_cache("voice_audio", False)
+            return None
+        try:
+            path = self._path(key)
+            data = path.read_bytes()
+            # Persistir el orden LRU entre reinicios
+            os.utime(path, None)
+        except OSError:
+            with self._lock:
+                self._total -= self._index.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        record_cache("voice_audio", True)
+        return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        # Nombre temporal único: otro worker puede estar guardando el mismo clip
+        tmp = path.with_name(f"{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning("no se pudo guardar el audio en caché", extra={"key": key}, exc_info=True)
+            tmp.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self._total -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._total += len(data)
+            self._evict()
+
+    def open_writer(self, key: str) -> "CacheWriter":
+        """Escritura incremental (streaming) de un clip; se indexa al confirmar"""
+        return CacheWriter(self, key)
+
+    def _commit(self, key: str, tmp: Path, size: int):
+        if size > self.max_bytes:
+            tmp.unlink(missing_ok=True)
+            return
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._total -= self._index.pop(key, 0)
+            self._index[key] = size
+            self._total += size
+            self._evict()
+
+    def _evict(self):
+        while self._total > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total -= size
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._index),
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class CacheWriter:
+    """Archivo temporal que se vuelca a la caché sólo si el stream termina completo"""
+
+    def __init__(self, cache: AudioCache, key: str):
+        self.cache = cache
+        self.key = key
+        self.size = 0
+        self._tmp = cache.directory / f"{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            self._file = open(self._tmp, "wb")
+        except OSError:
+            logger.warning("no se pudo crear el archivo temporal de audio", extra={"path": str(self._tmp)}, exc_info=True)
+            self._file = None
+
+    def write(self, chunk: bytes):
+        if self._file is None:
+            return
+        self.size += len(chunk)
+        if self.size > self.cache.max_bytes:
+            self.abort()
+            return
+        self._file.write(chunk)
+
+    def commit(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        try:
+            self.cache._commit(self.key, self._tmp, self.size)
+        except OSError:
+            logger.warning("no se pudo guardar el audio en caché", extra={"key": self.key}, exc_info=True)
+            self._tmp.unlink(missing_ok=True)
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._tmp.unlink(missing_ok=True)
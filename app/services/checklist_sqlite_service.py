@@ -1,38 +1,205 @@
-from typing import List
+from typing import Any, List, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timezone
 
-from app.models.schemas import ChecklistForm
-from app.models.checklist_entry import ChecklistEntrySQL
+from app.models.schemas import ChecklistForm, ChecklistSubmission
+from app.models.checklist_entry import ChecklistEntrySQL, ChecklistFactSQL, ChecklistSubmissionSQL
+from app.db.dimensions import dimension_cache
+from app.services.event_bus import entries_bus
 
 
-def create_entries_from_form(db: Session, form: ChecklistForm, username: str | None = None) -> List[ChecklistEntrySQL]:
-    created: List[ChecklistEntrySQL] = []
+def _build_entries(form: ChecklistForm, username: str | None, fecha_hora: datetime, metadatos: dict | None = None) -> List[ChecklistFactSQL]:
     observaciones = form.observaciones or None
-
     # Esperamos estructura: items: { prescripcion: {...}, preparacion: {...}, administracion: {...} }
-    for etapa, items in (form.items or {}).items():
-        for item_key, cumple in (items or {}).items():
-            entry = ChecklistEntrySQL(
-                area=form.area,
-                turno=form.turno,
-                protocolo_etapa=str(etapa),
-                item=str(item_key),
-                cumple=bool(cumple),
-                observaciones=observaciones,
-                usuario=username or "demo",
-                metadatos=None,
-                fecha_hora=datetime.utcnow(),
-            )
-            db.add(entry)
-            created.append(entry)
+    filas = [
+        (str(etapa), str(item_key), bool(cumple))
+        for etapa, items in (form.items or {}).items()
+        for item_key, cumple in (items or {}).items()
+    ]
+    # Ids de dimensión resueltos (y creados si faltan) antes de escribir en la sesión
+    etapas = dimension_cache.ids("etapa", {f[0] for f in filas})
+    items = dimension_cache.ids("item", {f[1] for f in filas})
+    area_id = dimension_cache.id("area", form.area)
+    turno_id = dimension_cache.id("turno", form.turno)
+    usuario_id = dimension_cache.id("usuario", username or "demo")
+    return [
+        ChecklistFactSQL(
+            area_id=area_id,
+            turno_id=turno_id,
+            etapa_id=etapas[etapa],
+            item_id=items[item],
+            cumple=cumple,
+            observaciones=observaciones,
+            usuario_id=usuario_id,
+            metadatos=metadatos,
+            fecha_hora=fecha_hora,
+        )
+        for etapa, item, cumple in filas
+    ]
+
+
+def _insert_facts(db: Session, entries: List[ChecklistFactSQL]) -> None:
+    """
+    Un solo INSERT executemany (Core, como generate_data.py) en vez de uno
+    por fila del ORM. Los objetos no entran a la sesión: reciben el id
+    devuelto por RETURNING y no expiran al hacer commit.
+    """
+    if not entries:
+        return
+    tabla = ChecklistFactSQL.__table__
+    columnas = [c.name for c in tabla.columns if c.name != "id"]
+    ids = db.execute(
+        insert(tabla).returning(tabla.c.id),
+        [{c: getattr(e, c) for c in columnas} for e in entries],
+    ).scalars().all()
+    # RETURNING no garantiza el orden, pero dentro de la transacción SQLite
+    # asigna los rowid crecientes en el orden de los VALUES
+    for e, id_ in zip(entries, sorted(ids)):
+        e.id = id_
+
 
+def create_entries_from_form(db: Session, form: ChecklistForm, username: str | None = None) -> List[ChecklistFactSQL]:
+    created = _build_entries(form, username, datetime.utcnow())
+    _insert_facts(db, created)
+    delta = build_entries_delta(created) if created else None
     db.commit()
-    for e in created:
-        db.refresh(e)
+    if delta:
+        entries_bus.publish(delta)
     return created
 
 
+def _captured_at_utc(captured_at: datetime | None, now: datetime) -> datetime:
+    """Hora de captura del dispositivo en UTC naive (como fecha_hora); nunca en el futuro"""
+    if captured_at is None:
+        return now
+    if captured_at.tzinfo is not None:
+        captured_at = captured_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(captured_at, now)
+
+
+def parse_submissions(raw: List[Any]) -> Tuple[List[ChecklistSubmission], List[dict]]:
+    """Validar cada envío por separado: los inválidos se informan por client_id sin afectar al resto"""
+    validos, invalidos = [], []
+    for item in raw:
+        try:
+            validos.append(ChecklistSubmission.model_validate(item))
+        except ValidationError as e:
+            client_id = item.get("client_id") if isinstance(item, dict) else None
+            detalle = "; ".join(
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" if err["loc"] else err["msg"]
+                for err in e.errors()
+            )
+            invalidos.append({
+                "client_id": str(client_id) if client_id is not None else None,
+                "status": "invalid", "count": 0, "detail": detalle
+            })
+    return validos, invalidos
+
+
+def sync_submissions(db: Session, submissions: List[ChecklistSubmission], username: str | None = None) -> List[dict]:
+    """
+    Inserta envíos capturados sin conexión de forma idempotente.
+
+    El client_id (UUID del dispositivo) tiene índice único: los ya recibidos
+    se resuelven con una sola consulta IN y se informan como "duplicate", de
+    modo que reintentar el mismo lote nunca duplica registros. Los envíos de
+    otro usuario (author distinto) no se guardan ni se reatribuyen: se
+    informan como "author_mismatch" y el dispositivo los conserva.
+    """
+    ids = [str(s.client_id) for s in submissions]
+    existentes = {
+        cid for (cid,) in db.query(ChecklistSubmissionSQL.client_id)
+        .filter(ChecklistSubmissionSQL.client_id.in_(ids))
+    }
+
+    now = datetime.utcnow()
+    resultados = []
+    nuevos = []  # (submission, entries)
+    for sub in submissions:
+        cid = str(sub.client_id)
+        if sub.author != username:
+            resultados.append({"client_id": cid, "status": "author_mismatch", "count": 0})
+            continue
+        if cid in existentes:
+            resultados.append({"client_id": cid, "status": "duplicate", "count": 0})
+            continue
+        existentes.add(cid)  # repetido dentro del mismo lote
+        fecha_hora = _captured_at_utc(sub.captured_at, now)
+        entries = _build_entries(sub, username, fecha_hora, metadatos={"client_id": cid})
+        registro = {
+            "client_id": cid, "usuario": username, "area": sub.area,
+            "entry_count": len(entries), "captured_at": fecha_hora, "received_at": now,
+        }
+        nuevos.append((registro, entries))
+        resultados.append({"client_id": cid, "status": "created", "count": len(entries)})
+
+    try:
+        if nuevos:
+            db.execute(insert(ChecklistSubmissionSQL.__table__), [registro for registro, _ in nuevos])
+        _insert_facts(db, [e for _, entries in nuevos for e in entries])
+        deltas = [build_entries_delta(entries) for _, entries in nuevos if entries]
+        db.commit()
+    except IntegrityError:
+        # Otro request sincronizó alguno de estos envíos a la vez: reintentar uno a uno
+        db.rollback()
+        return _sync_one_by_one(db, resultados, nuevos)
+
+    for delta in deltas:
+        entries_bus.publish(delta)
+    return resultados
+
+
+def _sync_one_by_one(db: Session, resultados: List[dict], nuevos: list) -> List[dict]:
+    por_id = {r["client_id"]: r for r in resultados}
+    for registro, entries in nuevos:
+        try:
+            db.execute(insert(ChecklistSubmissionSQL.__table__), registro)
+            _insert_facts(db, entries)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            por_id[registro["client_id"]].update(status="duplicate", count=0)
+            continue
+        if entries:
+            entries_bus.publish(build_entries_delta(entries))
+    return resultados
+
+
+def build_entries_delta(entries: List[ChecklistFactSQL]) -> dict:
+    """Incrementos de contadores por etapa de un envío (para /reports/stream)"""
+    por_etapa = {}
+    for e in entries:
+        etapa = por_etapa.setdefault(e.protocolo_etapa, {"total": 0, "cumplidos": 0})
+        etapa["total"] += 1
+        etapa["cumplidos"] += 1 if e.cumple else 0
+    primero = entries[0]
+    return {
+        "type": "delta",
+        "id": max(e.id for e in entries),
+        "area": primero.area,
+        "turno": primero.turno,
+        "fecha_hora": primero.fecha_hora.isoformat(),
+        "total": len(entries),
+        "cumplidos": sum(1 for e in entries if e.cumple),
+        "por_etapa": por_etapa,
+        "entries": [
+            {
+                "fecha_hora": e.fecha_hora.strftime("%Y-%m-%d %H:%M"),
+                "area": e.area,
+                "turno": e.turno,
+                "protocolo_etapa": e.protocolo_etapa,
+                "item": e.item,
+                "cumple": e.cumple,
+                "usuario": e.usuario
+            }
+            for e in entries
+        ]
+    }
+
+
 def get_recent_entries(db: Session, limit: int = 100) -> List[ChecklistEntrySQL]:
     return (
         db.query(ChecklistEntrySQL)
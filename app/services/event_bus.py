@@ -0,0 +1,77 @@
+"""
+Pub/sub en proceso para notificar nuevos registros (alimenta /reports/stream).
+
+Cada suscriptor tiene su propia cola acotada en el event loop que lo creó;
+publicar cuesta O(1) por suscriptor y es seguro desde cualquier thread. Un
+suscriptor lento que llena su cola se marca como desbordado y el cliente
+debe resincronizarse. Con varios workers cada proceso sólo ve sus propias
+escrituras.
+"""
+import asyncio
+import threading
+from typing import Callable, Optional
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queue: int, filtro: Optional[Callable[[dict], bool]]):
+        self.loop = loop
+        self.queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=max_queue)
+        self.filtro = filtro
+        self.overflowed = False
+
+    def _put(self, event: dict):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            # Vaciar y dejar sólo la orden de resincronizar
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._subs: set = set()
+        self._lock = threading.Lock()
+        self.last_id = 0
+
+    def subscribe(self, filtro: Optional[Callable[[dict], bool]] = None) -> Subscription:
+        sub = Subscription(asyncio.get_running_loop(), self.max_queue, filtro)
+        with self._lock:
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subs.discard(sub)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subs)
+
+    def publish(self, event: dict):
+        with self._lock:
+            self.last_id = max(self.last_id, event.get("id") or 0)
+            subs = list(self._subs)
+        for sub in subs:
+            if sub.filtro is not None and not sub.filtro(event):
+                continue
+            try:
+                sub.loop.call_soon_threadsafe(sub._put, event)
+            except RuntimeError:
+                # Event loop cerrado: el suscriptor ya no existe
+                self.unsubscribe(sub)
+
+
+# Nuevos registros de checklist (deltas por área/etapa)
+entries_bus = EventBus()
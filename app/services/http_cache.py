@@ -0,0 +1,104 @@
+"""
+Caché HTTP condicional (ETag / 304) para reportes; Last-Modified es
+informativo y no se usa para validar.
+
+El ETag se deriva de una marca de agua barata de los datos (último id de
+checklist_entries, global o por área, resuelto por índice), del estado del
+archivo (purgar un mes cambia los totales sin cambiar el último id) y de la
+ruta con sus parámetros. Si el cliente envía un If-None-Match coincidente, la
+dependencia lanza NotModified antes de que el endpoint agregue nada.
+
+Los endpoints con ventanas relativas (periodo=7d) incluyen además la hora
+actual: la ventana se desplaza aunque no lleguen datos nuevos.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional, Tuple
+from fastapi import Depends, Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.db.database import get_db
+from app.db.dimensions import dimension_cache
+from app.models.archive import ArchivePartitionSQL
+from app.models.checklist_entry import ChecklistFactSQL
+
+CACHE_CONTROL = "private, no-cache"
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str, last_modified: Optional[str] = None):
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+def not_modified_response(exc: NotModified) -> Response:
+    headers = {"ETag": exc.etag, "Cache-Control": CACHE_CONTROL}
+    if exc.last_modified:
+        headers["Last-Modified"] = exc.last_modified
+    return Response(status_code=304, headers=headers)
+
+
+def data_watermark(db: Session, area: Optional[str] = None) -> Tuple[int, Optional[datetime]]:
+    """
+    (último id, fecha_hora más reciente) sobre checklist_facts, ambos por
+    índice (la vista checklist_entries puede incluir el archivo). La fecha es
+    el máximo y no la del último id: los envíos sincronizados llegan con la
+    hora de captura y Last-Modified no debe retroceder.
+    """
+    ids = db.query(func.max(ChecklistFactSQL.id))
+    fechas = db.query(ChecklistFactSQL.fecha_hora)
+    if area:
+        area_id = dimension_cache.lookup("area", area)
+        ids = ids.filter(ChecklistFactSQL.area_id == area_id)
+        fechas = fechas.filter(ChecklistFactSQL.area_id == area_id)
+    ultima_fecha = fechas.order_by(ChecklistFactSQL.fecha_hora.desc()).limit(1).scalar()
+    return ids.scalar() or 0, ultima_fecha
+
+
+def archive_state(db: Session) -> str:
+    """Meses archivados y última purga: cambia cuando se borran filas de la base"""
+    meses, purgado = db.query(func.count(ArchivePartitionSQL.mes), func.max(ArchivePartitionSQL.purgado)).one()
+    return f"{meses}:{purgado.isoformat() if purgado else '-'}"
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaco = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == opaco for t in header.split(","))
+
+
+def conditional(relative_window: bool = False, per_user: bool = False):
+    """
+    Dependencia que calcula el ETag de la petición y responde 304 si coincide.
+    Devuelve las cabeceras de caché para que los endpoints que construyen su
+    propio Response (plantillas) puedan añadirlas.
+    """
+    async def dependency(request: Request, response: Response, db: Session = Depends(get_db)) -> dict:
+        area = request.query_params.get("area") or None
+        ultimo_id, ultima_fecha = data_watermark(db, area)
+
+        partes = [request.url.path, str(sorted(request.query_params.multi_items())), str(ultimo_id), archive_state(db)]
+        if relative_window:
+            partes.append(datetime.now().strftime("%Y%m%d%H"))
+        if per_user:
+            # HTML que depende del usuario (rol, nombre): la cookie identifica la sesión
+            partes.append(request.cookies.get("access_token", "") or request.headers.get("authorization", ""))
+        etag = 'W/"' + hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()[:20] + '"'
+        last_modified = format_datetime(ultima_fecha.replace(tzinfo=timezone.utc), usegmt=True) if ultima_fecha else None
+
+        # Sólo If-None-Match: una fila sincronizada con fecha anterior cambia los
+        # datos sin mover Last-Modified, así que If-Modified-Since daría un 304 falso
+        if _etag_matches(request.headers.get("if-none-match", ""), etag):
+            raise NotModified(etag, last_modified)
+
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if last_modified:
+            headers["Last-Modified"] = last_modified
+        response.headers.update(headers)
+        return headers
+
+    return dependency
@@ -0,0 +1,165 @@
+"""
+Ranking de items con más fallas (GET /reports/critical-items).
+
+Tasa de falla por (área, etapa, item) ordenada por la cota inferior de
+Wilson: un item con 2 fallas de 2 registros no supera a uno con 400 de
+1.000, y no hace falta un mínimo fijo de registros. El top-k sale de un
+heap (heapq.nlargest) sin ordenar todos los items.
+
+Los conteos combinan:
+- checklist_daily (rollup del motor de anomalías) para los días completos
+  de la ventana, hasta su marca de agua;
+- checklist_facts para los días parciales de los extremos y para las filas
+  que el rollup todavía no procesó (id > marca de agua).
+Así una ventana de años lee unas pocas filas por día en lugar de cada
+registro. Los resultados se cachean por ventana y último id. Los meses
+archivados antes de que existiera el rollup no se cuentan.
+"""
+import heapq
+import math
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.db.dimensions import dimension_cache
+from app.models.alert_config import AlertWatermarkSQL
+from app.models.anomaly import ChecklistDailySQL
+from app.models.checklist_entry import ChecklistFactSQL
+from app.services.anomaly_engine import anomaly_engine
+from app.services.report_query import QueryResultCache
+
+F = ChecklistFactSQL
+D = ChecklistDailySQL
+
+Clave = Tuple[int, int, int]
+
+ranking_cache = QueryResultCache(
+    settings.report_query_cache_size, settings.report_query_cache_ttl_seconds, name="item_ranking"
+)
+
+
+def wilson_lower_bound(fallas: int, total: int, z: float = 1.96) -> float:
+    """Cota inferior del intervalo de Wilson para la proporción fallas/total"""
+    if total == 0:
+        return 0.0
+    p = fallas / total
+    z2 = z * z
+    centro = p + z2 / (2 * total)
+    margen = z * math.sqrt(p * (1 - p) / total + z2 / (4 * total * total))
+    return (centro - margen) / (1 + z2 / total)
+
+
+def _sumar(acumulado: Dict[Clave, list], filas):
+    for area_id, etapa_id, item_id, total, fallas, ultima in filas:
+        actual = acumulado.setdefault((area_id, etapa_id, item_id), [0, 0, None])
+        actual[0] += total
+        actual[1] += fallas or 0
+        if isinstance(ultima, date) and not isinstance(ultima, datetime):
+            ultima = datetime.combine(ultima, time())
+        if ultima is not None and (actual[2] is None or ultima > actual[2]):
+            actual[2] = ultima
+
+
+def item_failure_counts(
+    db: Session,
+    desde: Optional[datetime],
+    hasta: Optional[datetime],
+    area_id: Optional[int] = None,
+) -> Dict[Clave, list]:
+    """(área, etapa, item) -> [total, fallas, última revisión] dentro de [desde, hasta]"""
+    marca = db.query(AlertWatermarkSQL.ultimo_id).filter(
+        AlertWatermarkSQL.nombre == anomaly_engine.nombre
+    ).scalar() or 0
+    # Días completos [primer_dia, fin_dias) que puede aportar el rollup
+    primer_dia = None if desde is None else (desde.date() if desde.time() == time() else desde.date() + timedelta(days=1))
+    fin_dias = None if hasta is None else hasta.date()
+
+    def hechos(*filtros):
+        query = db.query(
+            F.area_id, F.etapa_id, F.item_id,
+            func.count(), func.sum(case((F.cumple == False, 1), else_=0)),  # noqa: E712
+            func.max(F.fecha_hora),
+        ).filter(*filtros)
+        if area_id is not None:
+            query = query.filter(F.area_id == area_id)
+        return query.group_by(F.area_id, F.etapa_id, F.item_id).all()
+
+    acumulado: Dict[Clave, list] = {}
+    if desde is not None and hasta is not None and hasta < datetime.combine(primer_dia, time()):
+        # Ventana dentro de un mismo día: no hay días completos
+        _sumar(acumulado, hechos(F.fecha_hora >= desde, F.fecha_hora <= hasta))
+        return acumulado
+
+    rollup = db.query(
+        D.area_id, D.etapa_id, D.item_id, func.sum(D.total), func.sum(D.total - D.cumple), func.max(D.dia)
+    )
+    if primer_dia is not None:
+        rollup = rollup.filter(D.dia >= primer_dia)
+    if fin_dias is not None:
+        rollup = rollup.filter(D.dia < fin_dias)
+    if area_id is not None:
+        rollup = rollup.filter(D.area_id == area_id)
+    if marca:
+        _sumar(acumulado, rollup.group_by(D.area_id, D.etapa_id, D.item_id).all())
+
+    # Filas de los días completos que el rollup aún no incluye
+    nuevas = [F.id > marca]
+    if primer_dia is not None:
+        nuevas.append(F.fecha_hora >= datetime.combine(primer_dia, time()))
+    if fin_dias is not None:
+        nuevas.append(F.fecha_hora < datetime.combine(fin_dias, time()))
+    _sumar(acumulado, hechos(*nuevas))
+
+    # Extremos parciales de la ventana (cualquier id)
+    if desde is not None and desde < datetime.combine(primer_dia, time()):
+        _sumar(acumulado, hechos(F.fecha_hora >= desde, F.fecha_hora < datetime.combine(primer_dia, time())))
+    if hasta is not None:
+        inicio_borde = datetime.combine(fin_dias, time())
+        if desde is not None:
+            inicio_borde = max(inicio_borde, desde)
+        _sumar(acumulado, hechos(F.fecha_hora >= inicio_borde, F.fecha_hora <= hasta))
+    return acumulado
+
+
+def top_failing_items(
+    db: Session,
+    area: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    k: int = 10,
+) -> List[dict]:
+    area_id = None
+    if area:
+        area_id = dimension_cache.lookup("area", area)
+        if area_id is None:
+            return []
+
+    ultimo_id = db.query(func.max(F.id)).scalar() or 0
+    clave = f"{area_id}|{desde}|{hasta}|{k}|{ultimo_id}"
+    resultado = ranking_cache.get(clave)
+    if resultado is not None:
+        return resultado
+
+    conteos = item_failure_counts(db, desde, hasta, area_id)
+    peores = heapq.nlargest(
+        k, ((wilson_lower_bound(v[1], v[0]), c, v) for c, v in conteos.items() if v[0]),
+        key=lambda t: (t[0], t[2][1])
+    )
+    resultado = []
+    for cota, (a, e, i), (total, fallas, ultima) in peores:
+        etapa = dimension_cache.name("etapa", e)
+        resultado.append({
+            "area": dimension_cache.name("area", a),
+            "protocolo_etapa": etapa,
+            "etapa": etapa,
+            "item": dimension_cache.name("item", i),
+            "total": total,
+            "fallas": fallas,
+            "tasa_falla": round(fallas / total * 100, 2),
+            "cumplimiento": round((total - fallas) / total * 100, 2),
+            "wilson_inferior": round(cota * 100, 2),
+            "ultima_revision": ultima.isoformat() if ultima else None,
+        })
+    ranking_cache.put(clave, resultado)
+    return resultado
@@ -0,0 +1,216 @@
+"""
+Despachador asíncrono de notificaciones por email.
+
+Reutiliza un pequeño pool de conexiones SMTP persistentes (STARTTLS y login
+una sola vez por conexión), envía con concurrencia acotada, reintenta con
+backoff exponencial y descarta alertas idénticas enviadas al mismo
+destinatario dentro de una ventana de enfriamiento.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import smtplib
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from app.metrics import external_call
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnectionPool:
+    """Pool de conexiones smtplib reutilizables; la E/S corre en threads"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        size: int = 2,
+        timeout: float = 30.0,
+        idle_check_seconds: float = 60.0
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.timeout = timeout
+        self.idle_check_seconds = idle_check_seconds
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._slots = asyncio.Semaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    @staticmethod
+    def _quit(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    async def acquire(self) -> smtplib.SMTP:
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                server, last_used = self._idle.pop()
+                # Sólo verificar con NOOP conexiones que llevan tiempo ociosas
+                if time.monotonic() - last_used < self.idle_check_seconds:
+                    return server
+                if await asyncio.to_thread(self._is_alive, server):
+                    return server
+                await asyncio.to_thread(self._quit, server)
+            return await asyncio.to_thread(self._connect)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, server: smtplib.SMTP, broken: bool = False):
+        try:
+            if broken:
+                await asyncio.to_thread(self._quit, server)
+            else:
+                self._idle.append((server, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for server, _ in idle:
+            await asyncio.to_thread(self._quit, server)
+
+
+class NotificationDispatcher:
+    """Envío de emails con pool, concurrencia acotada, reintentos y deduplicación"""
+
+    def __init__(
+        self,
+        pool: SMTPConnectionPool,
+        sender: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: int = 3,
+        backoff_seconds: float = 1.0,
+        cooldown_seconds: float = 3600.0
+    ):
+        self.pool = pool
+        self.sender = sender or pool.username or "medcheck@localhost"
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._concurrency = asyncio.Semaphore(max_concurrency or pool.size)
+        self._sent: Dict[Tuple[str, str], float] = {}
+
+    @classmethod
+    def from_env(cls) -> "NotificationDispatcher":
+        username = os.getenv("SMTP_USERNAME")
+        pool = SMTPConnectionPool(
+            host=os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+            port=int(os.getenv("SMTP_PORT", "587")),
+            username=username,
+            password=os.getenv("SMTP_PASSWORD"),
+            starttls=os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes"),
+            size=int(os.getenv("SMTP_POOL_SIZE", "2"))
+        )
+        return cls(
+            pool,
+            sender=os.getenv("SMTP_FROM") or username,
+            max_retries=int(os.getenv("SMTP_MAX_RETRIES", "3")),
+            cooldown_seconds=float(os.getenv("SMTP_COOLDOWN_SECONDS", "3600"))
+        )
+
+    def build_message(self, recipient: str, subject: str, body: str) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg["From"] = self.sender
+        msg["To"] = recipient
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "html"))
+        return msg
+
+    def _dedup_key(self, recipient: str, subject: str, body: str, dedup_key: Optional[str]) -> Tuple[str, str]:
+        contenido = dedup_key or hashlib.sha256(f"{subject}\n{body}".encode("utf-8")).hexdigest()
+        return (recipient.strip().lower(), contenido)
+
+    def _prune(self, ahora: float):
+        expirados = [k for k, t in self._sent.items() if ahora - t >= self.cooldown_seconds]
+        for k in expirados:
+            del self._sent[k]
+
+    async def send(self, recipient: str, subject: str, body: str, dedup_key: Optional[str] = None) -> bool:
+        """
+        Enviar un email. Devuelve True si se envió o si ya se había enviado
+        la misma alerta a ese destinatario dentro del periodo de enfriamiento.
+        """
+        key = self._dedup_key(recipient, subject, body, dedup_key)
+        ahora = time.monotonic()
+        self._prune(ahora)
+        if key in self._sent:
+            return True
+        # Reservar antes de enviar para que envíos concurrentes no se dupliquen
+        self._sent[key] = ahora
+
+        msg = self.build_message(recipient.strip(), subject, body)
+        async with self._concurrency:
+            for intento in range(self.max_retries + 1):
+                server = await self._acquire()
+                if server is not None:
+                    try:
+                        with external_call("smtp"):
+                            await asyncio.to_thread(server.send_message, msg)
+                        await self.pool.release(server)
+                        return True
+                    except smtplib.SMTPRecipientsRefused as e:
+                        # Error permanente del destinatario: la conexión sigue sirviendo
+                        logger.warning("destinatario rechazado", extra={"recipient": recipient, "error": str(e)})
+                        await self.pool.release(server)
+                        break
+                    except (smtplib.SMTPException, OSError) as e:
+                        logger.warning(
+                            "error enviando email",
+                            extra={"recipient": recipient, "attempt": intento + 1, "error": str(e)}
+                        )
+                        await self.pool.release(server, broken=True)
+                if intento < self.max_retries:
+                    await asyncio.sleep(self.backoff_seconds * (2 ** intento))
+
+        self._sent.pop(key, None)
+        return False
+
+    async def _acquire(self) -> Optional[smtplib.SMTP]:
+        try:
+            return await self.pool.acquire()
+        except (smtplib.SMTPException, OSError):
+            logger.exception("error conectando al servidor SMTP", extra={"host": self.pool.host, "port": self.pool.port})
+            return None
+
+    async def send_batch(self, messages: Iterable[Tuple[str, str, str, Optional[str]]]) -> List[bool]:
+        """
+        Enviar un lote de (recipient, subject, body, dedup_key) con
+        concurrencia acotada por el tamaño del pool
+        """
+        return list(await asyncio.gather(*(self.send(*m) for m in messages)))
+
+    async def close(self):
+        await self.pool.close()
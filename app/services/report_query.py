@@ -0,0 +1,164 @@
+"""
+Consultas OLAP genéricas sobre checklist_entries (POST /reports/query).
+
+Una consulta {dimensions, measures, filters, time_grain} se compila a un
+único SELECT ... GROUP BY parametrizado. Sólo se aceptan dimensiones y
+medidas de la lista blanca (DIMENSIONS / MEASURES): los nombres del cliente
+nunca llegan al SQL como texto. Los resultados se guardan en una caché LRU
+con TTL cuya clave es la consulta normalizada más la marca de agua de los
+datos (último id), así que un registro nuevo invalida la caché sin barridos.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import case, distinct, func, literal_column, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from app.config import settings
+from app.db.archive import include_archived
+from app.metrics import record_cache
+from app.models.checklist_entry import ChecklistEntrySQL
+from app.models.schemas import ReportQuery
+from app.services.http_cache import archive_state, data_watermark
+
+E = ChecklistEntrySQL
+
+DIMENSIONS = {
+    "area": E.area,
+    "turno": E.turno,
+    "protocolo_etapa": E.protocolo_etapa,
+    "item": E.item,
+    "usuario": E.usuario,
+}
+
+_cumple = func.sum(case((E.cumple == True, 1), else_=0))  # noqa: E712
+
+MEASURES = {
+    "total": func.count(),
+    "cumple": _cumple,
+    "no_cumple": func.count() - _cumple,
+    "porcentaje": func.round(literal_column("100.0") * _cumple / func.count(), 2),
+    "usuarios": func.count(distinct(E.usuario)),
+}
+
+# Etiqueta de cada cubeta temporal (texto ISO, igual en SQLite y PostgreSQL)
+SQLITE_GRAINS = {"hour": "%Y-%m-%dT%H:00", "day": "%Y-%m-%d", "month": "%Y-%m"}
+POSTGRES_GRAINS = {"hour": 'YYYY-MM-DD"T"HH24:00', "day": "YYYY-MM-DD", "week": "YYYY-MM-DD", "month": "YYYY-MM"}
+
+
+def time_bucket(column, grain: str, dialect: str):
+    """Expresión SQL que trunca ``column`` al grano (semanas ISO, desde el lunes)"""
+    if dialect == "sqlite":
+        if grain == "week":
+            return func.date(column, "weekday 0", "-6 days")
+        return func.strftime(SQLITE_GRAINS[grain], column)
+    return func.to_char(func.date_trunc(grain, column), POSTGRES_GRAINS[grain])
+
+
+def compile_query(query: ReportQuery, dialect: str) -> Tuple[Select, List[str]]:
+    columnas, grupos = [], []
+    if query.time_grain:
+        bucket = time_bucket(E.fecha_hora, query.time_grain, dialect).label("periodo")
+        columnas.append(bucket)
+        grupos.append(bucket)
+    for dimension in dict.fromkeys(query.dimensions):
+        columna = DIMENSIONS[dimension].label(dimension)
+        columnas.append(columna)
+        grupos.append(columna)
+    for medida in dict.fromkeys(query.measures):
+        columnas.append(MEASURES[medida].label(medida))
+
+    nombres = [c.name for c in columnas]
+    stmt = select(*columnas)
+
+    filtros = query.filters
+    for dimension, columna in DIMENSIONS.items():
+        valores = getattr(filtros, dimension)
+        if valores:
+            stmt = stmt.where(columna.in_(valores))
+    if filtros.cumple is not None:
+        stmt = stmt.where(E.cumple == filtros.cumple)
+    if filtros.desde:
+        stmt = stmt.where(E.fecha_hora >= filtros.desde)
+    if filtros.hasta:
+        stmt = stmt.where(E.fecha_hora <= filtros.hasta)
+
+    if grupos:
+        stmt = stmt.group_by(*grupos)
+    if query.order_by:
+        if query.order_by not in nombres:
+            raise ValueError(f"order_by debe ser una de las columnas pedidas: {nombres}")
+        orden = literal_column(query.order_by)
+        stmt = stmt.order_by(orden.desc() if query.descending else orden)
+    elif grupos:
+        stmt = stmt.order_by(*grupos)
+    return stmt.limit(query.limit), nombres
+
+
+def normalize(query: ReportQuery) -> Dict[str, Any]:
+    """Forma canónica: mismo resultado => misma clave (filtros ordenados y sin duplicados)"""
+    datos = query.model_dump(mode="json")
+    datos["dimensions"] = list(dict.fromkeys(datos["dimensions"]))
+    datos["measures"] = list(dict.fromkeys(datos["measures"]))
+    datos["filters"] = {
+        k: sorted(set(v)) if isinstance(v, list) else v
+        for k, v in datos["filters"].items()
+        if v not in (None, [])
+    }
+    return datos
+
+
+class QueryResultCache:
+    """LRU acotada por entradas con expiración por TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, name: str = "report_query"):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entrada = self._entries.get(key)
+            if entrada is None or time.monotonic() - entrada[0] > self.ttl_seconds:
+                self._entries.pop(key, None)
+                record_cache(self.name, False)
+                return None
+            self._entries.move_to_end(key)
+        record_cache(self.name, True)
+        return entrada[1]
+
+    def put(self, key: str, valor: dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), valor)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+query_cache = QueryResultCache(settings.report_query_cache_size, settings.report_query_cache_ttl_seconds)
+
+
+def run_query(db: Session, query: ReportQuery) -> dict:
+    ultimo_id, _ = data_watermark(db)
+    clave = hashlib.sha256(
+        json.dumps([normalize(query), ultimo_id, archive_state(db)], sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    resultado = query_cache.get(clave)
+    if resultado is not None:
+        return {**resultado, "cached": True}
+
+    stmt, columnas = compile_query(query, db.get_bind().dialect.name)
+    with include_archived(db, query.filters.desde, query.filters.hasta):
+        filas = db.execute(stmt).all()
+    resultado = {"columns": columnas, "rows": [dict(zip(columnas, fila)) for fila in filas]}
+    query_cache.put(clave, resultado)
+    return {**resultado, "cached": False}
@@ -152,12 +152,21 @@ class ReportingService:
                     FROM checklist_entries
                     WHERE {where_sql}
                     GROUP BY area, protocolo_etapa, item
-                    HAVING COUNT(*) >= 5  -- Mínimo de registros para considerar
+                ),
+                ranking AS (
+                    -- Cota inferior de Wilson (z = 1.96) de la tasa de falla: penaliza muestras chicas
+                    SELECT *,
+                        (total_registros - registros_cumplidos)::FLOAT / total_registros AS tasa_falla,
+                        (tasa_falla + 1.9208 / total_registros
+                            - 1.96 * SQRT(tasa_falla * (1 - tasa_falla) / total_registros
+                                          + 0.9604 / (total_registros * total_registros)))
+                        / (1 + 3.8416 / total_registros) * 100 AS wilson_inferior
+                    FROM item_stats
                 )
                 SELECT *
-                FROM item_stats
+                FROM ranking
                 WHERE porcentaje_cumplimiento < %s
-                ORDER BY porcentaje_cumplimiento ASC
+                ORDER BY wilson_inferior DESC
                 LIMIT 10
             """, params + [umbral_cumplimiento])
             
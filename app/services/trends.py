@@ -0,0 +1,137 @@
+"""
+Tendencias de cumplimiento por cubetas de tiempo (GET /reports/compliance-trends).
+
+El agrupado se hace en SQL (time_bucket de report_query) y la respuesta son
+arreglos paralelos (labels, total, cumple, data) con las cubetas vacías
+rellenadas, listos para Chart.js.
+
+fecha_hora se guarda en UTC. Con tz=UTC se agrupa directamente al grano
+pedido; con otra zona SQL agrupa por hora UTC y aquí cada hora se pasa a
+la hora local (respetando el horario de verano) y se reagrupa, así que un
+año completo son a lo sumo ~8.800 filas por serie.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.checklist_entry import ChecklistEntrySQL
+from app.services.report_query import DIMENSIONS, time_bucket
+
+E = ChecklistEntrySQL
+
+LABELS = {"hour": "%Y-%m-%dT%H:00", "day": "%Y-%m-%d", "week": "%Y-%m-%d", "month": "%Y-%m"}
+MAX_BUCKETS = 50_000
+
+
+def bucket_start(momento: datetime, grano: str) -> datetime:
+    if grano == "hour":
+        return momento.replace(minute=0, second=0, microsecond=0)
+    dia = momento.replace(hour=0, minute=0, second=0, microsecond=0)
+    if grano == "day":
+        return dia
+    if grano == "week":
+        return dia - timedelta(days=dia.weekday())
+    return dia.replace(day=1)
+
+
+def next_bucket(inicio: datetime, grano: str) -> datetime:
+    if grano == "hour":
+        return inicio + timedelta(hours=1)
+    if grano == "day":
+        return inicio + timedelta(days=1)
+    if grano == "week":
+        return inicio + timedelta(days=7)
+    return (inicio + timedelta(days=32)).replace(day=1)
+
+
+def bucket_labels(desde: datetime, hasta: datetime, grano: str) -> List[str]:
+    """Todas las cubetas entre desde y hasta (inclusive), para rellenar huecos"""
+    labels = []
+    actual = bucket_start(desde, grano)
+    while actual <= hasta:
+        labels.append(actual.strftime(LABELS[grano]))
+        if len(labels) > MAX_BUCKETS:
+            raise ValueError(f"El rango produce más de {MAX_BUCKETS} cubetas; use una agrupación mayor")
+        actual = next_bucket(actual, grano)
+    return labels
+
+
+def resolve_timezone(nombre: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(nombre or settings.report_timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Zona horaria desconocida: {nombre}")
+
+
+def _porcentajes(total: List[int], cumple: List[int]) -> List[Optional[float]]:
+    # Sin registros no hay porcentaje (null en el gráfico, no 0 %)
+    return [round(c / t * 100, 2) if t else None for t, c in zip(total, cumple)]
+
+
+def compliance_trends(
+    db: Session,
+    desde: datetime,
+    hasta: datetime,
+    agrupacion: str = "day",
+    area: Optional[str] = None,
+    serie: Optional[str] = None,
+    tz: Optional[str] = None,
+) -> dict:
+    zona = resolve_timezone(tz)
+    es_utc = zona.key in ("UTC", "Etc/UTC", "GMT", "Etc/GMT")
+    grano_sql = agrupacion if es_utc else "hour"
+
+    def local(momento: datetime) -> datetime:
+        return momento.replace(tzinfo=timezone.utc).astimezone(zona).replace(tzinfo=None)
+
+    labels = bucket_labels(local(desde), local(hasta), agrupacion)
+    posicion = {label: i for i, label in enumerate(labels)}
+
+    bucket = time_bucket(E.fecha_hora, grano_sql, db.get_bind().dialect.name).label("bucket")
+    columnas = [bucket]
+    if serie:
+        columnas.append(DIMENSIONS[serie].label("serie"))
+    stmt = select(
+        *columnas,
+        func.count().label("total"),
+        func.sum(case((E.cumple == True, 1), else_=0)).label("cumple"),  # noqa: E712
+    ).where(E.fecha_hora >= desde, E.fecha_hora <= hasta)
+    if area:
+        stmt = stmt.where(E.area == area)
+    stmt = stmt.group_by(*columnas)
+
+    acumulado: Dict[Optional[str], Dict[str, List[int]]] = {}
+    for fila in db.execute(stmt):
+        if es_utc:
+            label = fila.bucket
+        else:
+            hora = local(datetime.strptime(fila.bucket, LABELS["hour"]))
+            label = bucket_start(hora, agrupacion).strftime(LABELS[agrupacion])
+        i = posicion.get(label)
+        if i is None:
+            continue
+        clave = fila.serie if serie else None
+        if clave not in acumulado:
+            acumulado[clave] = {"total": [0] * len(labels), "cumple": [0] * len(labels)}
+        acumulado[clave]["total"][i] += fila.total
+        acumulado[clave]["cumple"][i] += fila.cumple or 0
+
+    total = [sum(s["total"][i] for s in acumulado.values()) for i in range(len(labels))]
+    cumple = [sum(s["cumple"][i] for s in acumulado.values()) for i in range(len(labels))]
+    resultado = {
+        "agrupacion": agrupacion,
+        "tz": zona.key,
+        "labels": labels,
+        "total": total,
+        "cumple": cumple,
+        "data": _porcentajes(total, cumple),
+    }
+    if serie:
+        resultado["serie"] = serie
+        resultado["series"] = [
+            {"nombre": nombre, "total": s["total"], "cumple": s["cumple"], "data": _porcentajes(s["total"], s["cumple"])}
+            for nombre, s in sorted(acumulado.items())
+        ]
+    return resultado
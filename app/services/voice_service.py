@@ -1,11 +1,18 @@
 """
 Servicio de texto-a-voz usando ElevenLabs API
 """
+import logging
 import os
-from typing import Optional
-import requests
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+import httpx
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict
+import time
+from app.services.audio_cache import AudioCache, audio_cache_key
+from app.metrics import EXTERNAL_CALL_DURATION, external_call
+
+logger = logging.getLogger(__name__)
 
 class VoiceSettings(BaseSettings):
     # Configuración de carga de variables de entorno para evitar errores por claves extra en .env
@@ -13,29 +20,37 @@ class VoiceSettings(BaseSettings):
 
     elevenlabs_api_key: Optional[str] = None
     elevenlabs_voice_id: str = "21m00Tcm4TlvDq8ikWAM"  # Rachel - voz profesional femenina
+    elevenlabs_model_id: str = "eleven_multilingual_v2"
+    # Permite apuntar a un servidor local de pruebas en lugar de la API real
+    elevenlabs_base_url: str = "https://api.elevenlabs.io/v1"
+
+    # Caché de audio en disco (clave: voz, modelo y hash del texto)
+    voice_cache_dir: str = str(Path(__file__).parent.parent.parent / "voice_cache")
+    voice_cache_max_mb: int = 200
 
 class VoiceService:
     """Servicio para generar audio desde texto usando ElevenLabs"""
     
     def __init__(self):
         self.settings = VoiceSettings()
-        self.base_url = "https://api.elevenlabs.io/v1"
+        self.base_url = self.settings.elevenlabs_base_url.rstrip("/")
+        self.cache = AudioCache(
+            self.settings.voice_cache_dir,
+            self.settings.voice_cache_max_mb * 1024 * 1024
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def cache_key(self, texto: str) -> str:
+        return audio_cache_key(self.settings.elevenlabs_voice_id, self.settings.elevenlabs_model_id, texto)
     
-    def generate_report_speech(self, summary: dict) -> Optional[bytes]:
-        """
-        Genera audio narrando el resumen del reporte
-        """
+    def _api_key(self) -> Optional[str]:
         # Leer API key desde env en tiempo de ejecución
-        api_key = os.getenv("ELEVENLABS_API_KEY") or self.settings.elevenlabs_api_key
-        if not api_key:
-            print("[VOICE] No ELEVENLABS_API_KEY configured")
-            return None
-        
-        # Construir texto narrativo del reporte
-        texto = self._build_report_narrative(summary)
-        
-        # Llamar a ElevenLabs API - usar endpoint estándar sin output_format explícito
-        url = f"{self.base_url}/text-to-speech/{self.settings.elevenlabs_voice_id}"
+        return os.getenv("ELEVENLABS_API_KEY") or self.settings.elevenlabs_api_key
+
+    def is_enabled(self) -> bool:
+        return bool(self._api_key())
+
+    def _build_request(self, texto: str, api_key: str) -> Tuple[dict, dict]:
         headers = {
             "Accept": "audio/mpeg",
             "Content-Type": "application/json",
@@ -45,29 +60,146 @@ class VoiceService:
         # Simplificar payload - quitar parámetros opcionales que puedan causar problemas de permisos
         data = {
             "text": texto,
-            "model_id": "eleven_multilingual_v2",
+            "model_id": self.settings.elevenlabs_model_id,
             "voice_settings": {
                 "stability": 0.5,
                 "similarity_boost": 0.75
             }
         }
+        return headers, data
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Cliente compartido: reutiliza conexiones TLS con ElevenLabs entre peticiones
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=10.0))
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def stream_report_speech(self, summary: dict) -> Optional[AsyncIterator[bytes]]:
+        """
+        Genera audio narrando el resumen y lo devuelve como iterador asíncrono
+        de chunks (endpoint /stream de ElevenLabs). Devuelve None si el
+        servicio no está disponible, antes de empezar a responder al cliente.
+        """
+        return await self.stream_text(self._build_report_narrative(summary))
+
+    async def stream_text(self, texto: str) -> Optional[AsyncIterator[bytes]]:
+        """
+        Sintetiza un texto arbitrario en streaming, pasando por la caché de audio
+        """
+        api_key = self._api_key()
+        if not api_key:
+            logger.debug("ELEVENLABS_API_KEY no configurada")
+            return None
+
+        key = self.cache_key(texto)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug("cache hit", extra={"bytes": len(cached)})
+            return self._iter_cached(cached)
+
+        url = f"{self.base_url}/text-to-speech/{self.settings.elevenlabs_voice_id}/stream"
+        headers, data = self._build_request(texto, api_key)
+        client = self._get_client()
+        inicio = time.perf_counter()
+        try:
+            logger.debug("stream ElevenLabs", extra={"chars": len(texto)})
+            request = client.build_request("POST", url, json=data, headers=headers)
+            response = await client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            EXTERNAL_CALL_DURATION.observe(time.perf_counter() - inicio, service="elevenlabs", outcome="error")
+            logger.warning("error llamando a ElevenLabs", extra={"error": str(e)})
+            return None
+        # Tiempo hasta cabeceras (primer byte), que es lo que percibe el usuario
+        EXTERNAL_CALL_DURATION.observe(
+            time.perf_counter() - inicio,
+            service="elevenlabs",
+            outcome="ok" if response.status_code == 200 else "error"
+        )
+
+        if response.status_code != 200:
+            body = await response.aread()
+            await response.aclose()
+            logger.warning(
+                "respuesta de error de ElevenLabs",
+                extra={"status": response.status_code, "body": body[:500].decode("utf-8", "replace")}
+            )
+            return None
+
+        return self._relay(response, key)
+
+    @staticmethod
+    async def _iter_cached(data: bytes, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+
+    async def _relay(self, response: httpx.Response, key: str) -> AsyncIterator[bytes]:
+        """
+        Reenvía los chunks al cliente a medida que llegan y los vuelca a un
+        archivo temporal de la caché; sólo se indexa si el stream termina completo.
+        """
+        writer = self.cache.open_writer(key)
+        completo = False
+        try:
+            async for chunk in response.aiter_bytes():
+                writer.write(chunk)
+                yield chunk
+            completo = True
+        except httpx.HTTPError as e:
+            logger.warning("stream de ElevenLabs interrumpido", extra={"error": str(e)})
+        finally:
+            await response.aclose()
+            if completo:
+                writer.commit()
+            else:
+                writer.abort()
+
+    def generate_report_speech(self, summary: dict) -> Optional[bytes]:
+        """
+        Genera audio narrando el resumen del reporte (versión síncrona, sin streaming)
+        """
+        api_key = self._api_key()
+        if not api_key:
+            logger.debug("ELEVENLABS_API_KEY no configurada")
+            return None
+        
+        # Construir texto narrativo del reporte
+        texto = self._build_report_narrative(summary)
+
+        # Misma narrativa con la misma voz/modelo: servir desde caché sin gastar créditos
+        key = self.cache_key(texto)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug("cache hit", extra={"bytes": len(cached)})
+            return cached
+        
+        # Llamar a ElevenLabs API - usar endpoint estándar sin output_format explícito
+        url = f"{self.base_url}/text-to-speech/{self.settings.elevenlabs_voice_id}"
+        headers, data = self._build_request(texto, api_key)
         
         try:
-            print(f"[VOICE] Calling ElevenLabs API with {len(texto)} chars")
-            response = requests.post(url, json=data, headers=headers, timeout=30)
-            print(f"[VOICE] Response status: {response.status_code}")
+            logger.debug("llamada a ElevenLabs", extra={"chars": len(texto)})
+            import requests  # sólo la ruta síncrona lo usa; no cargarlo al importar
+
+            with external_call("elevenlabs"):
+                response = requests.post(url, json=data, headers=headers, timeout=30)
             
             if response.status_code == 200:
-                print(f"[VOICE] Success - audio size: {len(response.content)} bytes")
+                logger.debug("audio generado", extra={"bytes": len(response.content)})
+                self.cache.put(key, response.content)
                 return response.content
             else:
-                print(f"[VOICE] Error ElevenLabs: {response.status_code}")
-                print(f"[VOICE] Response body: {response.text}")
+                logger.warning(
+                    "respuesta de error de ElevenLabs",
+                    extra={"status": response.status_code, "body": response.text[:500]}
+                )
                 return None
-        except Exception as e:
-            print(f"[VOICE] Exception generating voice: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("error generando audio")
             return None
     
     def _build_report_narrative(self, summary: dict) -> str:
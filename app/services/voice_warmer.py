@@ -0,0 +1,167 @@
+"""
+Precalentado de resúmenes de voz.
+
+Recalcula en segundo plano la narrativa de las combinaciones habituales
+(periodo × área) y sólo sintetiza audio cuando el texto cambió respecto a
+lo que ya hay en la caché. Un presupuesto diario de caracteres limita el
+gasto en la API de ElevenLabs; el consumo se guarda por día en voice_budget
+(sobrevive a reinicios) y sólo se cobra cuando el clip quedó en la caché.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, date
+from typing import List, Optional, TYPE_CHECKING
+from sqlalchemy import func, case
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.db.database import SessionLocal
+from app.models.checklist_entry import ChecklistEntrySQL
+from app.models.voice import VoiceBudgetSQL
+
+if TYPE_CHECKING:
+    from app.services.voice_service import VoiceService
+
+PERIODOS = ("7d", "30d", "90d")
+ETAPAS = ("prescripción", "preparación", "administración")
+
+logger = logging.getLogger(__name__)
+
+
+def periodo_desde(periodo: Optional[str], hasta: datetime, default_dias: int = 7) -> datetime:
+    dias = {"7d": 7, "30d": 30, "90d": 90}.get(periodo, default_dias)
+    return hasta - timedelta(days=dias)
+
+
+def build_voice_summary(db: Session, area: Optional[str] = None, periodo: Optional[str] = "7d") -> dict:
+    """
+    Resumen usado por la narrativa de voz y las recomendaciones,
+    calculado con una única consulta agrupada por etapa
+    """
+    desde = periodo_desde(periodo, datetime.now())
+    query = db.query(
+        ChecklistEntrySQL.protocolo_etapa,
+        func.count(ChecklistEntrySQL.id),
+        func.sum(case((ChecklistEntrySQL.cumple == True, 1), else_=0))
+    ).filter(ChecklistEntrySQL.fecha_hora >= desde)
+    if area:
+        query = query.filter(ChecklistEntrySQL.area == area)
+    por_etapa = {etapa: (total, cumple or 0) for etapa, total, cumple in
+                 query.group_by(ChecklistEntrySQL.protocolo_etapa).all()}
+
+    total_items = sum(t for t, _ in por_etapa.values())
+    items_cumplidos = sum(c for _, c in por_etapa.values())
+    porcentaje_cumplimiento = round((items_cumplidos / total_items * 100) if total_items > 0 else 0, 1)
+
+    cumplimiento_por_etapa = {}
+    for etapa in ETAPAS:
+        total_etapa, cumplidos_etapa = por_etapa.get(etapa, (0, 0))
+        cumplimiento_por_etapa[etapa] = {
+            "total": total_etapa,
+            "cumplidos": cumplidos_etapa,
+            "porcentaje": round((cumplidos_etapa / total_etapa * 100) if total_etapa > 0 else 0, 1)
+        }
+
+    return {
+        "total_items": total_items,
+        "items_cumplidos": items_cumplidos,
+        "porcentaje_cumplimiento": porcentaje_cumplimiento,
+        "cumplimiento_por_etapa": cumplimiento_por_etapa
+    }
+
+
+class VoiceWarmer:
+    """Regenera narrativas tras cambios en los datos y sintetiza sólo las nuevas"""
+
+    def __init__(self, voice_service: "VoiceService", daily_char_budget: Optional[int] = None):
+        self.voice_service = voice_service
+        self.daily_char_budget = (
+            daily_char_budget if daily_char_budget is not None else settings.voice_warm_daily_char_budget
+        )
+        self._ultimo_id: Optional[int] = None
+        self._ultimo_run: Optional[datetime] = None
+
+    def _hay_datos_nuevos(self) -> bool:
+        db = SessionLocal()
+        try:
+            ultimo_id = db.query(func.max(ChecklistEntrySQL.id)).scalar()
+        finally:
+            db.close()
+        nuevos = ultimo_id != self._ultimo_id
+        self._ultimo_id = ultimo_id
+        return nuevos
+
+    def _usado_hoy(self) -> int:
+        db = SessionLocal()
+        try:
+            return db.query(VoiceBudgetSQL.caracteres).filter(VoiceBudgetSQL.dia == date.today()).scalar() or 0
+        finally:
+            db.close()
+
+    def _cobrar(self, chars: int) -> None:
+        tabla = VoiceBudgetSQL.__table__
+        stmt = sqlite_insert(tabla).values(dia=date.today(), caracteres=chars, updated_at=datetime.utcnow())
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["dia"],
+            set_={"caracteres": tabla.c.caracteres + stmt.excluded.caracteres, "updated_at": stmt.excluded.updated_at},
+        )
+        db = SessionLocal()
+        try:
+            db.execute(stmt)
+            db.commit()
+        finally:
+            db.close()
+
+    def _pendientes(self) -> List[str]:
+        """Narrativas de todas las combinaciones cuyo audio aún no está en caché"""
+        db = SessionLocal()
+        try:
+            areas = [a[0] for a in db.query(ChecklistEntrySQL.area).distinct().all() if a[0]]
+            textos = []
+            # Primero la vista global, luego cada área; periodos cortos primero
+            for area in [None] + areas:
+                for periodo in PERIODOS:
+                    texto = self.voice_service._build_report_narrative(build_voice_summary(db, area, periodo))
+                    if self.voice_service.cache_key(texto) not in self.voice_service.cache:
+                        textos.append(texto)
+            # Distintas combinaciones pueden producir el mismo texto
+            return list(dict.fromkeys(textos))
+        finally:
+            db.close()
+
+    async def warm(self, force: bool = False) -> int:
+        """
+        Sintetiza las narrativas que cambiaron. Devuelve cuántos clips se generaron.
+        """
+        if not self.voice_service.is_enabled():
+            return 0
+        # Regenerar si llegaron registros (último id, visto desde cualquier worker)
+        # o si la ventana de los periodos se desplazó
+        nuevos = await asyncio.to_thread(self._hay_datos_nuevos)
+        max_age = timedelta(minutes=settings.voice_warm_max_age_minutes)
+        stale = self._ultimo_run is None or datetime.now() - self._ultimo_run > max_age
+        if not (force or nuevos or stale):
+            return 0
+        self._ultimo_run = datetime.now()
+
+        textos = await asyncio.to_thread(self._pendientes)
+        usados = await asyncio.to_thread(self._usado_hoy)
+        generados = 0
+        for texto in textos:
+            if usados + len(texto) > self.daily_char_budget:
+                logger.info("presupuesto diario de voz agotado", extra={"chars": usados})
+                break
+            stream = await self.voice_service.stream_text(texto)
+            if stream is None:
+                continue
+            async for _ in stream:
+                pass
+            # Sólo se cobra lo que quedó en la caché (un stream cortado no cuenta)
+            if self.voice_service.cache_key(texto) not in self.voice_service.cache:
+                continue
+            await asyncio.to_thread(self._cobrar, len(texto))
+            usados += len(texto)
+            generados += 1
+        if generados:
+            logger.info("resúmenes de voz precalentados", extra={"clips": generados, "chars": usados})
+        return generados
@@ -0,0 +1,158 @@
+"""
+Archivos estáticos precomprimidos y con huella de contenido.
+
+Al arrancar se generan hermanos ``.gz`` (y ``.br`` si está instalado brotli)
+de los recursos de texto de ``static/`` y un manifiesto ruta -> ruta con hash
+(``css/styles.css`` -> ``css/styles.3fa2b1c9.css``). ``url_for('static', ...)``
+devuelve la URL con hash, que se sirve con caché larga e inmutable; las URLs
+sin hash siguen funcionando y se revalidan con ETag.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict
+from starlette.routing import Mount
+from starlette.staticfiles import StaticFiles
+from app.middleware.compression import brotli, negotiate_encoding
+
+logger = logging.getLogger(__name__)
+
+PRECOMPRESS_EXTENSIONS = {".css", ".js", ".json", ".svg", ".html", ".txt", ".map", ".webmanifest"}
+# Se referencian con URL fija (registro del service worker, manifest)
+NO_FINGERPRINT = {"sw.js"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+
+
+def _write_if_smaller(source: Path, target: Path, data: bytes, original_size: int):
+    if len(data) >= original_size:
+        target.unlink(missing_ok=True)
+        return
+    # Temporal único: cada worker precomprime al arrancar y pueden coincidir en el mismo archivo
+    with tempfile.NamedTemporaryFile(dir=target.parent, prefix=target.name + ".", suffix=".tmp", delete=False) as f:
+        f.write(data)
+    try:
+        os.chmod(f.name, 0o644)  # mkstemp crea 0600
+        os.replace(f.name, target)
+    except OSError:
+        Path(f.name).unlink(missing_ok=True)
+        raise
+    stat = source.stat()
+    os.utime(target, (stat.st_atime, stat.st_mtime))
+
+
+def precompress_directory(directory: str, min_size: int = 256) -> int:
+    """Genera .gz/.br desactualizados o inexistentes; devuelve cuántos escribió"""
+    escritos = 0
+    for path in Path(directory).rglob("*"):
+        if not path.is_file() or path.suffix not in PRECOMPRESS_EXTENSIONS:
+            continue
+        size = path.stat().st_size
+        if size < min_size:
+            continue
+        variantes = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variantes.append((".br", lambda d: brotli.compress(d, quality=11)))
+        data = None
+        for sufijo, comprimir in variantes:
+            target = path.with_name(path.name + sufijo)
+            if target.exists() and target.stat().st_mtime >= path.stat().st_mtime:
+                continue
+            if data is None:
+                data = path.read_bytes()
+            try:
+                _write_if_smaller(path, target, comprimir(data), size)
+                escritos += 1
+            except OSError as e:
+                # Sistema de archivos de sólo lectura: se servirá sin precomprimir
+                logger.warning("no se pudo precomprimir", extra={"path": str(path), "error": str(e)})
+                return escritos
+    return escritos
+
+
+def build_manifest(directory: str) -> Dict[str, str]:
+    """ruta relativa -> ruta con hash de contenido (8 hex antes de la extensión)"""
+    manifest = {}
+    base = Path(directory)
+    for path in base.rglob("*"):
+        if not path.is_file() or path.suffix in (".gz", ".br", ".tmp"):
+            continue
+        rel = path.relative_to(base).as_posix()
+        if rel in NO_FINGERPRINT:
+            continue
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()[:8]
+        stem, dot, ext = rel.rpartition(".")
+        manifest[rel] = f"{stem}.{digest}.{ext}" if dot else f"{rel}.{digest}"
+    return manifest
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    def __init__(self, *args, precompress: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        if precompress and self.directory:
+            escritos = precompress_directory(str(self.directory))
+            if escritos:
+                logger.info("estáticos precomprimidos", extra={"files": escritos})
+        self.manifest = build_manifest(str(self.directory)) if self.directory else {}
+        self._originales = {hashed: rel for rel, hashed in self.manifest.items()}
+
+    def fingerprinted(self, path: str) -> str:
+        return self.manifest.get(path.lstrip("/"), path)
+
+    async def get_response(self, path: str, scope):
+        rel = path.replace(os.sep, "/")
+        original = self._originales.get(rel)
+        inmutable = original is not None
+        if inmutable:
+            path = original
+
+        response = await self._precompressed(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE if inmutable else REVALIDATE
+        return response
+
+    async def _precompressed(self, path: str, scope):
+        if scope["method"] not in ("GET", "HEAD") or Path(path).suffix not in PRECOMPRESS_EXTENSIONS:
+            return None
+        accept = ""
+        for name, value in scope.get("headers", ()):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept)
+        candidatas = {"br": [".br", ".gz"], "gzip": [".gz"]}.get(encoding, [])
+        if encoding == "br" and "gzip" not in accept.lower():
+            candidatas = [".br"]
+        for sufijo in candidatas:
+            full_path, stat_result = self.lookup_path(path + sufijo)
+            if stat_result is None:
+                continue
+            response = self.file_response(full_path, stat_result, scope)
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            if media_type.startswith("text/") or media_type == "application/javascript":
+                media_type += "; charset=utf-8"
+            response.headers["Content-Type"] = media_type
+            response.headers["Content-Encoding"] = "br" if sufijo == ".br" else "gzip"
+            response.headers["Vary"] = "Accept-Encoding"
+            return response
+        return None
+
+
+class StaticMount(Mount):
+    """Mount que hace que url_for('static', path=...) devuelva la URL con hash"""
+
+    def url_path_for(self, name: str, /, **path_params):
+        if name == self.name and "path" in path_params and isinstance(self.app, PrecompressedStaticFiles):
+            path_params["path"] = self.app.fingerprinted(path_params["path"])
+        return super().url_path_for(name, **path_params)
+
+
+def static_mount(path: str, directory: str, name: str = "static", precompress: bool = True) -> StaticMount:
+    return StaticMount(path, app=PrecompressedStaticFiles(directory=directory, precompress=precompress), name=name)
+
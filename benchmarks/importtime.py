@@ -0,0 +1,131 @@
+"""
+Informe de tiempo de importación de la app contra un presupuesto.
+
+Ejecuta ``python -X importtime -c "import app.main"`` en procesos limpios,
+toma el mínimo de cada módulo entre corridas (menos ruido), imprime una
+tabla con los módulos más costosos y el total por paquete de primer nivel,
+y verifica benchmarks/import_budget.json:
+
+- ``total_ms``: tiempo acumulado máximo de ``app.main``.
+- ``modules_ms``: tope del acumulado de módulos concretos.
+- ``forbidden``: paquetes que no deben cargarse al importar la app
+  (dependencias pesadas u opcionales que se importan de forma diferida).
+
+Uso:
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --runs 5 --top 40 --json benchmarks/results/importtime.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_PATH = Path(__file__).resolve().parent / "import_budget.json"
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, float, float]]:
+    """Líneas 'import time: self | cumulative | nombre' -> (módulo, profundidad, self_ms, cumulative_ms)"""
+    filas = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cum_us, nombre = line[len("import time:"):].split("|")
+        except ValueError:
+            continue
+        profundidad = (len(nombre) - len(nombre.lstrip(" "))) // 2
+        filas.append((nombre.strip(), profundidad, int(self_us) / 1000, int(cum_us) / 1000))
+    return filas
+
+
+def measure(module: str) -> List[Tuple[str, int, float, float]]:
+    env = dict(os.environ, PYTHONPATH=str(ROOT), LOG_LEVEL="ERROR")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"Falló la importación de {module}:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def best_of(module: str, runs: int) -> Dict[str, dict]:
+    mejores: Dict[str, dict] = {}
+    for _ in range(runs):
+        for nombre, profundidad, self_ms, cum_ms in measure(module):
+            actual = mejores.get(nombre)
+            if actual is None or cum_ms < actual["cumulative_ms"]:
+                mejores[nombre] = {"depth": profundidad, "self_ms": self_ms, "cumulative_ms": cum_ms}
+    return mejores
+
+
+def by_package(modulos: Dict[str, dict]) -> Dict[str, float]:
+    totales = defaultdict(float)
+    for nombre, datos in modulos.items():
+        totales[nombre.split(".")[0]] += datos["self_ms"]
+    return dict(sorted(totales.items(), key=lambda kv: -kv[1]))
+
+
+def check_budget(module: str, modulos: Dict[str, dict], budget: dict) -> List[str]:
+    fallos = []
+    total = modulos.get(module, {}).get("cumulative_ms", 0.0)
+    if budget.get("total_ms") is not None and total > budget["total_ms"]:
+        fallos.append(f"{module}: {total:.1f} ms > presupuesto {budget['total_ms']} ms")
+    for nombre, limite in budget.get("modules_ms", {}).items():
+        medido = modulos.get(nombre, {}).get("cumulative_ms")
+        if medido is not None and medido > limite:
+            fallos.append(f"{nombre}: {medido:.1f} ms > presupuesto {limite} ms")
+    for prohibido in budget.get("forbidden", []):
+        cargados = [n for n in modulos if n == prohibido or n.startswith(prohibido + ".")]
+        if cargados:
+            fallos.append(f"{prohibido} se importa al arrancar (debe ser diferido)")
+    return fallos
+
+
+def print_report(module: str, modulos: Dict[str, dict], top: int):
+    total = modulos.get(module, {}).get("cumulative_ms", 0.0)
+    print(f"\nImportar {module}: {total:.1f} ms acumulados, {len(modulos)} módulos\n")
+    print(f"{'módulo':<55} {'self ms':>9} {'acum ms':>9}")
+    print("-" * 75)
+    orden = sorted(modulos.items(), key=lambda kv: -kv[1]["cumulative_ms"])
+    for nombre, datos in orden[:top]:
+        print(f"{nombre[:55]:<55} {datos['self_ms']:>9.1f} {datos['cumulative_ms']:>9.1f}")
+    print(f"\n{'paquete':<30} {'self ms':>9}")
+    print("-" * 40)
+    for paquete, ms in list(by_package(modulos).items())[:15]:
+        print(f"{paquete:<30} {ms:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación de la app contra un presupuesto")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=3, help="Corridas; se toma el mínimo por módulo")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--budget", default=str(BUDGET_PATH))
+    parser.add_argument("--json", default=None, help="Guardar la medición en JSON")
+    args = parser.parse_args()
+
+    modulos = best_of(args.module, args.runs)
+    print_report(args.module, modulos, args.top)
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json).write_text(json.dumps({"module": args.module, "modules": modulos}, indent=2))
+
+    budget = json.loads(Path(args.budget).read_text()) if Path(args.budget).exists() else {}
+    fallos = check_budget(args.module, modulos, budget)
+    if fallos:
+        print("\nPresupuesto excedido:")
+        for f in fallos:
+            print(f"  - {f}")
+        sys.exit(1)
+    print("\nDentro del presupuesto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Benchmarks de la API ejecutando la app ASGI en el mismo proceso.
+
+Genera (o reutiliza) un dataset con generate_data.py, lanza cada escenario
+con httpx.ASGITransport y mide percentiles de latencia, throughput y RSS
+máximo. El resultado se guarda en JSON y puede compararse con una línea base
+para detectar regresiones (código de salida 1 si las hay).
+
+Uso:
+    python -m benchmarks.run --dataset 10k
+    python -m benchmarks.run --dataset 1m --only reports --save-baseline
+    python -m benchmarks.run --dataset 1m --baseline benchmarks/baselines/1m.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(__file__).resolve().parent / ".data"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+BASELINES_DIR = Path(__file__).resolve().parent / "baselines"
+PASSWORD = "Carga123!"
+SEED = 1234
+
+
+def dataset_path(name: str, end: str) -> Path:
+    return DATA_DIR / f"medcheck_{name}_{end.replace('-', '')}.db"
+
+
+def ensure_dataset(name: str, rows: int, end: str, users: int) -> Path:
+    """Generar el dataset una sola vez por tamaño y fecha final (las ventanas de los reportes son relativas a hoy)"""
+    path = dataset_path(name, end)
+    if path.exists():
+        return path
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.unlink(missing_ok=True)
+    print(f"📦 Generando dataset {name} ({rows:,} filas) en {path}…")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}", LOG_LEVEL="ERROR")
+    subprocess.run(
+        [sys.executable, str(ROOT / "generate_data.py"), "--rows", str(rows), "--users", str(users),
+         "--seed", str(SEED), "--end", end, "--password", PASSWORD, "--drop-indexes"],
+        cwd=ROOT, env=env, check=True
+    )
+    tmp.rename(path)
+    return path
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa en KB, macOS en bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+async def run_scenario(client, scenario, iterations: int, headers: dict) -> dict:
+    latencias = []
+    errores = 0
+    bytes_total = 0
+    sem = asyncio.Semaphore(scenario.concurrency)
+
+    async def una(i: int):
+        nonlocal errores, bytes_total
+        kwargs = {"headers": headers if scenario.auth else {}}
+        if scenario.json:
+            kwargs["json"] = scenario.json(i)
+        if scenario.form:
+            kwargs["data"] = scenario.form(i)
+        async with sem:
+            inicio = time.perf_counter()
+            response = await client.request(scenario.method, scenario.path, **kwargs)
+            latencias.append(time.perf_counter() - inicio)
+        bytes_total += len(response.content)
+        if response.status_code != scenario.expected_status:
+            errores += 1
+
+    # Calentamiento (cachés, compilación de plantillas, imports perezosos)
+    await una(-1)
+    latencias.clear()
+    errores = 0
+    bytes_total = 0
+
+    rss_antes = peak_rss_mb()
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una(i) for i in range(iterations)))
+    total = time.perf_counter() - inicio
+
+    ordenadas = sorted(latencias)
+    ms = lambda v: round(v * 1000, 3)  # noqa: E731
+    return {
+        "iterations": iterations,
+        "concurrency": scenario.concurrency,
+        "errors": errores,
+        "mean_ms": ms(sum(ordenadas) / len(ordenadas)) if ordenadas else 0.0,
+        "p50_ms": ms(percentile(ordenadas, 0.50)),
+        "p90_ms": ms(percentile(ordenadas, 0.90)),
+        "p95_ms": ms(percentile(ordenadas, 0.95)),
+        "p99_ms": ms(percentile(ordenadas, 0.99)),
+        "max_ms": ms(ordenadas[-1]) if ordenadas else 0.0,
+        "throughput_rps": round(iterations / total, 3) if total > 0 else 0.0,
+        "avg_response_bytes": bytes_total // max(iterations, 1),
+        # ru_maxrss es el máximo del proceso: el crecimiento indica el pico de este escenario
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_growth_mb": round(peak_rss_mb() - rss_antes, 1),
+    }
+
+
+async def run_all(args, scenarios) -> dict:
+    import httpx
+    from app.main import app
+    from app.db.bootstrap import migrate
+
+    migrate()
+    # Las excepciones de la app cuentan como errores (500) en lugar de abortar
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    resultados = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        login = await client.post("/auth/login", data={"username": "enf0001", "password": PASSWORD})
+        login.raise_for_status()
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        for scenario in scenarios:
+            iterations = args.iterations or scenario.iterations[args.dataset]
+            print(f"⏱  {scenario.name} ({iterations} iteraciones, concurrencia {scenario.concurrency})…", flush=True)
+            resultado = await run_scenario(client, scenario, iterations, headers)
+            resultados[scenario.name] = resultado
+            print(f"   p50={resultado['p50_ms']}ms p95={resultado['p95_ms']}ms "
+                  f"rps={resultado['throughput_rps']} errores={resultado['errors']} rss={resultado['peak_rss_mb']}MB")
+    return resultados
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(resultados: dict, baseline: dict, threshold: float) -> list:
+    """Regresiones: p95 por encima o throughput por debajo del umbral relativo"""
+    regresiones = []
+    for nombre, actual in resultados.items():
+        base = baseline.get("scenarios", {}).get(nombre)
+        if not base:
+            continue
+        if base["p95_ms"] > 0 and actual["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regresiones.append({"scenario": nombre, "metric": "p95_ms",
+                                "baseline": base["p95_ms"], "current": actual["p95_ms"]})
+        if base["throughput_rps"] > 0 and actual["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regresiones.append({"scenario": nombre, "metric": "throughput_rps",
+                                "baseline": base["throughput_rps"], "current": actual["throughput_rps"]})
+        if actual["errors"] > base.get("errors", 0):
+            regresiones.append({"scenario": nombre, "metric": "errors",
+                                "baseline": base.get("errors", 0), "current": actual["errors"]})
+    return regresiones
+
+
+def main():
+    from benchmarks.scenarios import DATASETS, build_scenarios
+
+    parser = argparse.ArgumentParser(description="Benchmarks de MedCheck")
+    parser.add_argument("--dataset", choices=sorted(DATASETS), default="10k")
+    parser.add_argument("--end", default=datetime.utcnow().strftime("%Y-%m-%d"),
+                        help="Fecha final del dataset (por defecto hoy UTC)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--only", action="append", default=[], help="Escenario o tag a ejecutar (repetible)")
+    parser.add_argument("--skip", action="append", default=[], help="Escenario o tag a omitir (repetible)")
+    parser.add_argument("--iterations", type=int, default=None, help="Forzar iteraciones por escenario")
+    parser.add_argument("--output", default=None, help="Ruta del JSON de resultados")
+    parser.add_argument("--baseline", default=None, help="JSON de línea base (por defecto baselines/<dataset>.json)")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Tolerancia relativa antes de marcar regresión")
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar el resultado como nueva línea base")
+    args = parser.parse_args()
+
+    db_path = ensure_dataset(args.dataset, DATASETS[args.dataset], args.end, args.users)
+    # Trabajar sobre una copia: POST /checklist/ modifica la base
+    run_db = db_path.with_name(db_path.stem + ".run.db")
+    # Copia en streaming (sin cargar el dataset en memoria, que inflaría peak_rss_mb)
+    for sufijo in ("-wal", "-shm"):
+        Path(f"{run_db}{sufijo}").unlink(missing_ok=True)
+    shutil.copyfile(db_path, run_db)
+    os.environ["DATABASE_URL"] = f"sqlite:///{run_db}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("SLOW_QUERY_MS", "100000")
+    os.chdir(ROOT)  # plantillas y estáticos usan rutas relativas
+    sys.path.insert(0, str(ROOT))
+
+    def seleccionado(s) -> bool:
+        claves = {s.name, *s.tags}
+        if args.only and not claves & set(args.only):
+            return False
+        return not claves & set(args.skip)
+
+    scenarios = [s for s in build_scenarios(PASSWORD) if seleccionado(s)]
+    try:
+        resultados = asyncio.run(run_all(args, scenarios))
+    finally:
+        run_db.unlink(missing_ok=True)
+
+    informe = {
+        "dataset": args.dataset,
+        "rows": DATASETS[args.dataset],
+        "created_at": datetime.utcnow().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "scenarios": resultados,
+    }
+
+    baseline_path = Path(args.baseline) if args.baseline else BASELINES_DIR / f"{args.dataset}.json"
+    if baseline_path.exists() and not args.save_baseline:
+        baseline = json.loads(baseline_path.read_text())
+        informe["baseline"] = {"path": str(baseline_path), "commit": baseline.get("commit")}
+        informe["regressions"] = compare(resultados, baseline, args.threshold)
+
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"{args.dataset}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+    print(f"📄 Resultados: {output}")
+
+    if args.save_baseline:
+        BASELINES_DIR.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+        print(f"📌 Línea base guardada en {baseline_path}")
+
+    regresiones = informe.get("regressions", [])
+    for r in regresiones:
+        print(f"❌ Regresión en {r['scenario']}: {r['metric']} {r['baseline']} → {r['current']}")
+    if regresiones:
+        sys.exit(1)
+    if "regressions" in informe:
+        print("✅ Sin regresiones respecto a la línea base")
+
+
+if __name__ == "__main__":
+    main()
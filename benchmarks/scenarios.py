@@ -0,0 +1,68 @@
+"""
+Escenarios de benchmark: endpoint, método, cuerpo e iteraciones por tamaño de dataset.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+# Filas de checklist_entries por dataset
+DATASETS = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+
+def checklist_payload(i: int) -> dict:
+    """Mismo cuerpo que envía checklist_form.html"""
+    return {
+        "area": "UCI",
+        "turno": ("mañana", "tarde", "noche")[i % 3],
+        "items": {
+            "prescripcion": {"legible": True, "completa": True, "alergias": i % 4 != 0},
+            "preparacion": {"higiene": True, "area": i % 5 != 0, "verificacion": True},
+            "administracion": {"paciente": True, "hora": i % 3 != 0, "via": True},
+        },
+        "observaciones": None,
+    }
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    # Iteraciones por dataset (los exportes completos no escalan igual que las lecturas)
+    iterations: Dict[str, int]
+    concurrency: int = 1
+    auth: bool = True
+    json: Optional[Callable[[int], dict]] = None
+    form: Optional[Callable[[int], dict]] = None
+    expected_status: int = 200
+    tags: tuple = field(default_factory=tuple)
+
+
+def login_form(password: str) -> Callable[[int], dict]:
+    return lambda i: {"username": f"enf{(i % 10) + 1:04d}", "password": password}
+
+
+def build_scenarios(password: str) -> list:
+    return [
+        Scenario("reports_dashboard", "GET", "/reports/dashboard?periodo=30d",
+                 {"10k": 50, "1m": 10, "10m": 3}, tags=("reports",)),
+        Scenario("reports_summary", "GET", "/reports/summary",
+                 {"10k": 50, "1m": 10, "10m": 3}, tags=("reports",)),
+        Scenario("reports_compliance_trends", "GET", "/reports/compliance-trends?periodo=90d",
+                 {"10k": 50, "1m": 10, "10m": 3}, tags=("reports",)),
+        Scenario("checklist_export_csv", "GET", "/checklist/export/csv",
+                 {"10k": 10, "1m": 3, "10m": 1}, tags=("exports",)),
+        Scenario("checklist_export_excel", "GET", "/checklist/export/excel",
+                 {"10k": 5, "1m": 1, "10m": 1}, tags=("exports",)),
+        Scenario("reports_export_pdf", "GET", "/reports/export/pdf",
+                 {"10k": 10, "1m": 3, "10m": 1}, tags=("exports",)),
+        Scenario("checklist_create", "POST", "/checklist/",
+                 {"10k": 200, "1m": 200, "10m": 200}, concurrency=4, json=checklist_payload,
+                 tags=("ingestion",)),
+        Scenario("auth_login", "POST", "/auth/login",
+                 {"10k": 20, "1m": 20, "10m": 20}, concurrency=4, auth=False, form=login_form(password),
+                 tags=("auth",)),
+    ]
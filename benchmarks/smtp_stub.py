@@ -0,0 +1,165 @@
+"""
+Servidor SMTP local mínimo y verificación de NotificationDispatcher.
+
+El stub entiende EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP y QUIT (sin TLS ni
+login), cuenta conexiones y mensajes entregados, rechaza con 550 los
+destinatarios ``rechazado@...`` y puede fallar los próximos N DATA con 451.
+Con ``--check`` comprueba contra él:
+
+- reutilización del pool: varios envíos seguidos usan una sola conexión;
+- deduplicación: la misma alerta al mismo destinatario se entrega una vez;
+- reintento: un 451 transitorio se reintenta por una conexión nueva;
+- error permanente: un destinatario rechazado no se reintenta.
+
+Uso:
+    python -m benchmarks.smtp_stub --check
+    python -m benchmarks.smtp_stub --port 2525   # SMTP_SERVER=127.0.0.1 SMTP_PORT=2525 SMTP_STARTTLS=false
+"""
+import argparse
+import asyncio
+import socketserver
+import sys
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.delivered = []  # (destinatarios, bytes)
+        self.rcpt_attempts = 0
+        self.fail_next_data = 0
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        state: StubState = self.server.state
+        with state.lock:
+            state.connections += 1
+        self.reply("220 medcheck-stub ESMTP")
+        destinatarios = []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            comando = raw.decode("utf-8", "replace").strip()
+            verbo = comando[:4].upper()
+            if verbo == "EHLO":
+                self.reply("250-medcheck-stub")
+                self.reply("250 8BITMIME")
+            elif verbo in ("HELO", "NOOP"):
+                self.reply("250 OK")
+            elif verbo == "MAIL":
+                destinatarios = []
+                self.reply("250 OK")
+            elif verbo == "RCPT":
+                with state.lock:
+                    state.rcpt_attempts += 1
+                if "rechazado@" in comando.lower():
+                    self.reply("550 No such user")
+                else:
+                    destinatarios.append(comando.split(":", 1)[1].strip(" <>"))
+                    self.reply("250 OK")
+            elif verbo == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                cuerpo = []
+                while True:
+                    linea = self.rfile.readline()
+                    if not linea or linea in (b".\r\n", b".\n"):
+                        break
+                    cuerpo.append(linea)
+                with state.lock:
+                    fallar = state.fail_next_data > 0
+                    if fallar:
+                        state.fail_next_data -= 1
+                    else:
+                        state.delivered.append((tuple(destinatarios), b"".join(cuerpo)))
+                self.reply("451 Try again later" if fallar else "250 OK")
+            elif verbo == "RSET":
+                destinatarios = []
+                self.reply("250 OK")
+            elif verbo == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class StubServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0):
+        super().__init__(("127.0.0.1", port), SMTPHandler)
+        self.state = StubState()
+
+
+def start_stub(port: int = 0) -> StubServer:
+    server = StubServer(port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def check() -> int:
+    sys.path.insert(0, str(ROOT))
+    from app.services.notification_service import NotificationDispatcher, SMTPConnectionPool
+
+    server = start_stub()
+    state = server.state
+    pool = SMTPConnectionPool("127.0.0.1", server.server_address[1], starttls=False, size=2, timeout=5)
+    dispatcher = NotificationDispatcher(pool, sender="medcheck@localhost", max_retries=2, backoff_seconds=0.01)
+    resultados = {}
+
+    async def escenario():
+        try:
+            enviados = [await dispatcher.send("enf@hospital.test", f"Alerta {i}", f"<p>{i}</p>") for i in range(5)]
+            resultados["pool reutiliza la conexión"] = all(enviados) and state.connections == 1
+
+            entregados = len(state.delivered)
+            duplicado = await dispatcher.send("ENF@hospital.test ", "Alerta 0", "<p>0</p>")
+            resultados["dedup no reenvía"] = duplicado and len(state.delivered) == entregados
+
+            state.fail_next_data = 1
+            conexiones = state.connections
+            ok = await dispatcher.send("enf@hospital.test", "Alerta reintento", "<p>r</p>")
+            resultados["reintento tras 451"] = (
+                ok and len(state.delivered) == entregados + 1 and state.connections == conexiones + 1
+            )
+
+            intentos = state.rcpt_attempts
+            rechazado = await dispatcher.send("rechazado@hospital.test", "Alerta", "<p>x</p>")
+            resultados["rechazo permanente sin reintentos"] = not rechazado and state.rcpt_attempts == intentos + 1
+        finally:
+            await dispatcher.close()
+
+    asyncio.run(escenario())
+    server.shutdown()
+    for nombre, ok in resultados.items():
+        print(f"  {'OK ' if ok else 'FALLA'}  {nombre}")
+    return 0 if resultados and all(resultados.values()) else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor SMTP local para probar el envío de notificaciones")
+    parser.add_argument("--check", action="store_true", help="Verificar NotificationDispatcher contra el stub")
+    parser.add_argument("--port", type=int, default=2525)
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(check())
+    server = start_stub(args.port)
+    print(f"Stub SMTP en 127.0.0.1:{args.port} (Ctrl+C para salir)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
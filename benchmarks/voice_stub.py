@@ -0,0 +1,139 @@
+"""
+Servidor local que reemplaza a la API de ElevenLabs y verificación de la caché de audio.
+
+El stub responde ``POST /v1/text-to-speech/<voz>/stream`` con bytes
+deterministas (derivados del texto) en varios chunks y cuenta las llamadas.
+Con ``--check`` levanta el stub, apunta VoiceService a él y comprueba:
+
+- la primera narración llama a la API y la repetida sale de la caché;
+- un texto distinto vuelve a llamar a la API;
+- otra instancia de AudioCache sobre el mismo directorio (otro worker)
+  encuentra el clip aunque no esté en su índice.
+
+Uso:
+    python -m benchmarks.voice_stub --check
+    python -m benchmarks.voice_stub --port 8765   # ELEVENLABS_BASE_URL=http://127.0.0.1:8765/v1
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHUNKS = 4
+
+
+def fake_audio(texto: str) -> bytes:
+    """Audio falso pero estable: el mismo texto produce los mismos bytes"""
+    semilla = hashlib.sha256(texto.encode("utf-8")).digest()
+    return b"ID3" + semilla * 256
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    calls = 0
+    _lock = threading.Lock()
+
+    def do_POST(self):
+        if not (self.path.startswith("/v1/text-to-speech/") and self.path.endswith("/stream")):
+            self.send_error(404)
+            return
+        if not self.headers.get("xi-api-key"):
+            self.send_error(401)
+            return
+        largo = int(self.headers.get("Content-Length") or 0)
+        texto = json.loads(self.rfile.read(largo) or b"{}").get("text", "")
+        with StubHandler._lock:
+            StubHandler.calls += 1
+        audio = fake_audio(texto)
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        paso = -(-len(audio) // CHUNKS)
+        for i in range(0, len(audio), paso):
+            trozo = audio[i:i + paso]
+            self.wfile.write(f"{len(trozo):x}\r\n".encode() + trozo + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def _narrar(service, texto: str) -> bytes:
+    stream = await service.stream_text(texto)
+    if stream is None:
+        raise RuntimeError("VoiceService no devolvió audio")
+    return b"".join([chunk async for chunk in stream])
+
+
+def check() -> int:
+    server = start_stub()
+    cache_dir = tempfile.mkdtemp(prefix="voice_cache_")
+    os.environ.update({
+        "ELEVENLABS_API_KEY": "stub",
+        "ELEVENLABS_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1",
+        "VOICE_CACHE_DIR": cache_dir,
+    })
+    sys.path.insert(0, str(ROOT))
+    from app.services.audio_cache import AudioCache
+    from app.services.voice_service import VoiceService
+
+    async def escenario():
+        service = VoiceService()
+        try:
+            primero = await _narrar(service, "Cumplimiento del 92 por ciento")
+            repetido = await _narrar(service, "Cumplimiento del 92 por ciento")
+            llamadas_repetido = StubHandler.calls
+            await _narrar(service, "Cumplimiento del 80 por ciento")
+            return service, primero, repetido, llamadas_repetido
+        finally:
+            await service.aclose()
+
+    # Worker que arrancó antes de que existiera el clip: no lo tiene en su índice
+    otro_worker = AudioCache(cache_dir, 1024 * 1024)
+    service, primero, repetido, llamadas_repetido = asyncio.run(escenario())
+    clave = service.cache_key("Cumplimiento del 92 por ciento")
+
+    resultados = {
+        "audio completo": primero == fake_audio("Cumplimiento del 92 por ciento"),
+        "repetido desde caché": repetido == primero and llamadas_repetido == 1,
+        "texto nuevo llama a la API": StubHandler.calls == 2,
+        "otro worker lee el clip": clave in otro_worker and otro_worker.get(clave) == primero,
+    }
+    server.shutdown()
+    for nombre, ok in resultados.items():
+        print(f"  {'OK ' if ok else 'FALLA'}  {nombre}")
+    return 0 if all(resultados.values()) else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub local de ElevenLabs para probar la caché de audio")
+    parser.add_argument("--check", action="store_true", help="Verificar VoiceService + AudioCache contra el stub")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(check())
+    server = start_stub(args.port)
+    print(f"Stub de ElevenLabs en http://127.0.0.1:{args.port}/v1 (Ctrl+C para salir)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
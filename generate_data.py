@@ -0,0 +1,292 @@
+"""
+Generador de datos sintéticos para pruebas de carga y escala.
+
+Crea usuarios (con contraseña ya hasheada) y registros de checklist_entries
+con la misma estructura que envía checklist_form.html: N áreas, 3 turnos,
+las etapas e ítems del formulario, deriva de cumplimiento por área y
+patrones por turno y fin de semana. Con la misma semilla y los mismos
+argumentos genera exactamente los mismos datos.
+
+Ejemplos:
+    python generate_data.py --rows 1000000 --areas 12 --users 200
+    python generate_data.py --rows 20000000 --drop-indexes --truncate --end 2025-12-31
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+import bcrypt
+from sqlalchemy import insert, text
+from app.db.database import engine
+from app.db.bootstrap import migrate
+from app.models.user import User
+from app.models.checklist_entry import ChecklistFactSQL
+from app.db.dimensions import dimension_cache
+
+# Mismos valores que envía templates/checklist_form.html
+TURNOS = ["mañana", "tarde", "noche"]
+ITEMS = {
+    "prescripcion": ["legible", "completa", "alergias"],
+    "preparacion": ["higiene", "area", "verificacion"],
+    "administracion": ["paciente", "hora", "via"],
+}
+AREAS_BASE = [
+    "UCI", "Urgencias", "Pediatría", "Medicina Interna", "Cirugía", "Ginecología",
+    "Neonatología", "Oncología", "Cardiología", "Traumatología", "Neurología", "Nefrología",
+]
+# Horario de cada turno (hora de inicio, duración en horas) y peso de actividad
+HORARIO_TURNO = {"mañana": (7, 8), "tarde": (15, 8), "noche": (23, 8)}
+PESO_TURNO = {"mañana": 0.42, "tarde": 0.35, "noche": 0.23}
+AJUSTE_TURNO = {"mañana": 0.0, "tarde": -0.02, "noche": -0.07}
+AJUSTE_FIN_DE_SEMANA = -0.03
+NOMBRES = ["Ana", "Luis", "María", "Carlos", "Lucía", "Jorge", "Sofía", "Pedro", "Elena", "Diego",
+           "Carmen", "Raúl", "Paula", "Andrés", "Isabel", "Miguel", "Laura", "Fernando"]
+APELLIDOS = ["García", "Martínez", "López", "Sánchez", "Pérez", "Gómez", "Díaz", "Torres",
+             "Ramírez", "Flores", "Romero", "Navarro", "Morales", "Ortega", "Castro", "Vargas"]
+OBSERVACIONES = [
+    "Se corrigió en el momento", "Falta de insumos", "Paciente en procedimiento",
+    "Prescripción pendiente de aclarar", "Sobrecarga de trabajo en el turno",
+]
+DEFAULT_PASSWORD = "Carga123!"
+SQLITE_DATETIME = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def build_areas(n: int) -> list:
+    if n <= len(AREAS_BASE):
+        return AREAS_BASE[:n]
+    extra = [f"{AREAS_BASE[i % len(AREAS_BASE)]} {i // len(AREAS_BASE) + 1}" for i in range(len(AREAS_BASE), n)]
+    return AREAS_BASE + extra
+
+
+def build_profiles(rng: random.Random, areas: list) -> dict:
+    """Cumplimiento base, deriva en el periodo y peso (volumen) de cada área"""
+    return {
+        area: {
+            "base": rng.uniform(0.72, 0.97),
+            "deriva": rng.uniform(-0.12, 0.10),
+            "peso": rng.uniform(0.5, 2.0),
+        }
+        for area in areas
+    }
+
+
+def build_item_difficulty(rng: random.Random) -> dict:
+    return {
+        (etapa, item): rng.uniform(-0.10, 0.02)
+        for etapa, items in ITEMS.items()
+        for item in items
+    }
+
+
+def create_users(rng: random.Random, areas: list, n_users: int, password: str, rounds: int) -> dict:
+    """
+    Inserta usuarios enf0001..enfN (se omiten los existentes). El hash bcrypt se
+    calcula una sola vez y se comparte: todos usan la misma contraseña.
+    """
+    hashed = bcrypt.hashpw(password.encode("utf-8")[:72], bcrypt.gensalt(rounds)).decode("utf-8")
+    filas = []
+    por_area = {area: [] for area in areas}
+    for i in range(1, n_users + 1):
+        username = f"enf{i:04d}"
+        area = areas[(i - 1) % len(areas)]
+        por_area[area].append(username)
+        filas.append({
+            "username": username,
+            "email": f"{username}@carga.medcheck.local",
+            "hashed_password": hashed,
+            "full_name": f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}",
+            "is_active": True,
+            "is_admin": False,
+        })
+
+    with engine.begin() as conn:
+        existentes = {
+            r[0] for r in conn.execute(text("SELECT username FROM users WHERE username LIKE 'enf%'"))
+        }
+        nuevos = [f for f in filas if f["username"] not in existentes]
+        if nuevos:
+            conn.execute(insert(User.__table__), nuevos)
+    print(f"👥 Usuarios: {len(nuevos)} nuevos, {len(existentes)} ya existían (contraseña: {password})")
+    return por_area
+
+
+def generate_rows(rng: random.Random, args, areas: list, usuarios: dict):
+    """Genera tuplas en orden cronológico (los ids crecen con la fecha)"""
+    perfiles = build_profiles(rng, areas)
+    dificultad = build_item_difficulty(rng)
+    items = [(etapa, item) for etapa, lista in ITEMS.items() for item in lista]
+    por_envio = len(items)
+    envios = math.ceil(args.rows / por_envio)
+
+    fin = datetime.strptime(args.end, "%Y-%m-%d") if args.end else datetime.utcnow().replace(
+        hour=0, minute=0, second=0, microsecond=0)
+    inicio = fin - timedelta(days=args.days)
+    pesos_area = [perfiles[a]["peso"] for a in areas]
+    pesos_turno = [PESO_TURNO[t] for t in TURNOS]
+    restantes = args.rows
+
+    for dia in range(args.days):
+        fecha = inicio + timedelta(days=dia)
+        hoy = envios // args.days + (1 if dia < envios % args.days else 0)
+        if hoy <= 0 or restantes <= 0:
+            continue
+        fraccion = dia / max(args.days - 1, 1)
+        fin_de_semana = AJUSTE_FIN_DE_SEMANA if fecha.weekday() >= 5 else 0.0
+
+        sel_areas = rng.choices(areas, weights=pesos_area, k=hoy)
+        sel_turnos = rng.choices(TURNOS, weights=pesos_turno, k=hoy)
+        dia_envios = []
+        for area, turno in zip(sel_areas, sel_turnos):
+            hora_inicio, duracion = HORARIO_TURNO[turno]
+            momento = fecha + timedelta(hours=hora_inicio, seconds=rng.random() * duracion * 3600)
+            dia_envios.append((momento, area, turno))
+        dia_envios.sort()
+
+        for momento, area, turno in dia_envios:
+            perfil = perfiles[area]
+            p_envio = perfil["base"] + perfil["deriva"] * (fraccion - 0.5) + AJUSTE_TURNO[turno] + fin_de_semana
+            candidatos = usuarios.get(area)
+            usuario = rng.choice(candidatos) if candidatos else "demo"
+            ts = momento.strftime(SQLITE_DATETIME)
+            for etapa, item in items[:min(por_envio, restantes)]:
+                p = min(0.995, max(0.02, p_envio + dificultad[(etapa, item)]))
+                cumple = rng.random() < p
+                observacion = None
+                if not cumple and rng.random() < args.observation_rate:
+                    observacion = rng.choice(OBSERVACIONES)
+                yield (ts, area, turno, etapa, item, cumple, observacion, usuario)
+            restantes -= por_envio
+
+
+def _indexes(conn) -> list:
+    return [
+        (nombre, sql) for nombre, sql in conn.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+            "AND tbl_name = 'checklist_facts' AND sql IS NOT NULL"
+        ))
+    ]
+
+
+def _encode_dimensions(rows):
+    """Nombres -> ids de dim_* (la caché crea cada valor nuevo una sola vez)"""
+    ids = {d: {} for d in ("area", "turno", "etapa", "item", "usuario")}
+
+    def cod(dimension, nombre):
+        id_ = ids[dimension].get(nombre)
+        if id_ is None:
+            id_ = ids[dimension][nombre] = dimension_cache.id(dimension, nombre)
+        return id_
+
+    for ts, area, turno, etapa, item, cumple, observacion, usuario in rows:
+        yield (ts, cod("area", area), cod("turno", turno), cod("etapa", etapa), cod("item", item),
+               cumple, observacion, cod("usuario", usuario))
+
+
+def bulk_insert(rows, batch_size: int, drop_indexes: bool, truncate: bool) -> int:
+    """
+    Inserción masiva. En SQLite usa executemany del DBAPI con PRAGMAs de carga;
+    en otros motores, insert() de SQLAlchemy Core por lotes.
+    """
+    tabla = ChecklistFactSQL.__table__
+    columnas = ["fecha_hora", "area_id", "turno_id", "etapa_id", "item_id", "cumple", "observaciones", "usuario_id"]
+    rows = _encode_dimensions(rows)
+    es_sqlite = engine.dialect.name == "sqlite"
+    total = 0
+    inicio = time.perf_counter()
+
+    indices = []
+    if truncate or drop_indexes:
+        with engine.begin() as conn:
+            if truncate:
+                conn.execute(tabla.delete())
+            if drop_indexes and es_sqlite:
+                indices = _indexes(conn)
+                for nombre, _ in indices:
+                    conn.execute(text(f'DROP INDEX IF EXISTS "{nombre}"'))
+
+    def lotes():
+        lote = []
+        for fila in rows:
+            lote.append(fila)
+            if len(lote) >= batch_size:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    if es_sqlite:
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA cache_size=-200000")
+            sql = f"INSERT INTO checklist_facts ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})"
+            for lote in lotes():
+                cursor.executemany(sql, lote)
+                raw.commit()
+                total += len(lote)
+                _progreso(total, inicio)
+            cursor.execute("PRAGMA synchronous=FULL")
+            cursor.close()
+        finally:
+            raw.close()
+    else:
+        with engine.begin() as conn:
+            for lote in lotes():
+                conn.execute(insert(tabla), [
+                    dict(zip(columnas, (datetime.strptime(f[0], SQLITE_DATETIME),) + f[1:])) for f in lote
+                ])
+                total += len(lote)
+                _progreso(total, inicio)
+
+    if indices:
+        print(f"🔧 Recreando {len(indices)} índices…")
+        with engine.begin() as conn:
+            for _, sql in indices:
+                conn.execute(text(sql))
+    if es_sqlite:
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+    return total
+
+
+def _progreso(total: int, inicio: float):
+    transcurrido = time.perf_counter() - inicio
+    print(f"   {total:,} filas ({total / max(transcurrido, 1e-9):,.0f} filas/s)", end="\r")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos de MedCheck")
+    parser.add_argument("--rows", type=int, default=100_000, help="Filas de checklist_entries a generar")
+    parser.add_argument("--areas", type=int, default=8, help="Número de áreas")
+    parser.add_argument("--users", type=int, default=50, help="Número de usuarios de carga")
+    parser.add_argument("--days", type=int, default=365, help="Días de historia")
+    parser.add_argument("--end", default=None, help="Fecha final YYYY-MM-DD (por defecto hoy UTC)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla (misma semilla = mismos datos)")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--observation-rate", type=float, default=0.15,
+                        help="Probabilidad de observación en ítems no cumplidos")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Contraseña de los usuarios de carga")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--truncate", action="store_true", help="Vaciar checklist_entries antes de cargar")
+    parser.add_argument("--drop-indexes", action="store_true",
+                        help="Quitar índices durante la carga y recrearlos al final (SQLite)")
+    args = parser.parse_args()
+
+    migrate()
+    rng = random.Random(args.seed)
+    areas = build_areas(args.areas)
+    usuarios = create_users(rng, areas, args.users, args.password, args.bcrypt_rounds)
+
+    print(f"🏥 Generando {args.rows:,} registros ({len(areas)} áreas, {args.days} días, semilla {args.seed})…")
+    inicio = time.perf_counter()
+    total = bulk_insert(generate_rows(rng, args, areas, usuarios), args.batch_size, args.drop_indexes, args.truncate)
+    transcurrido = time.perf_counter() - inicio
+    print(f"\n✅ {total:,} registros insertados en {transcurrido:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
-from app.db.database import create_tables
+from app.db.bootstrap import migrate
 
 if __name__ == "__main__":
     print("Creando tablas en la base de datos...")
-    create_tables()
-    print("¡Tablas creadas exitosamente!")
\ No newline at end of file
+    resultado = migrate()
+    print(f"¡Tablas creadas exitosamente! (esquema v{resultado['to_version']})")
@@ -0,0 +1,175 @@
+// Cola offline de listas de cotejo (IndexedDB) con sincronización por lotes.
+// Se usa desde las páginas y desde el Service Worker (importScripts), por eso
+// sólo depende de `self`. Cada envío lleva un client_id (UUID) que el servidor
+// usa como clave de idempotencia: reintentar un lote nunca duplica registros.
+// Cada envío guarda su autor; la cola queda particionada por usuario y sólo
+// se sincronizan los del usuario con sesión (el servidor rechaza el resto).
+(function (global) {
+  const DB_NAME = 'medcheck-offline';
+  const STORE = 'pendientes';
+  const SYNC_URL = '/checklist/sync';
+  const SYNC_TAG = 'medcheck-sync';
+  const BATCH_SIZE = 50;
+  const MAX_BACKOFF_MS = 5 * 60 * 1000;
+
+  let flushing = null;   // un solo flush a la vez por contexto
+  let retryTimer = null;
+  let failures = 0;
+
+  function openDb() {
+    return new Promise((resolve, reject) => {
+      const req = indexedDB.open(DB_NAME, 1);
+      req.onupgradeneeded = () => {
+        const store = req.result.createObjectStore(STORE, { keyPath: 'client_id' });
+        store.createIndex('captured_at', 'captured_at');
+      };
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => reject(req.error);
+    });
+  }
+
+  function tx(mode, fn) {
+    return openDb().then(db => new Promise((resolve, reject) => {
+      const t = db.transaction(STORE, mode);
+      const result = fn(t.objectStore(STORE));
+      t.oncomplete = () => { db.close(); resolve(result && 'result' in result ? result.result : result); };
+      t.onerror = () => { db.close(); reject(t.error); };
+    }));
+  }
+
+  function uuid() {
+    if (global.crypto && global.crypto.randomUUID) {
+      return global.crypto.randomUUID();
+    }
+    // Contextos no seguros (http en la red del hospital)
+    const b = global.crypto.getRandomValues(new Uint8Array(16));
+    b[6] = (b[6] & 0x0f) | 0x40;
+    b[8] = (b[8] & 0x3f) | 0x80;
+    const h = Array.from(b, x => x.toString(16).padStart(2, '0')).join('');
+    return `${h.slice(0, 8)}-${h.slice(8, 12)}-${h.slice(12, 16)}-${h.slice(16, 20)}-${h.slice(20)}`;
+  }
+
+  function currentAuthor() {
+    // Sólo las páginas conocen la sesión (<meta name="medcheck-user">); el SW envía todo
+    if (typeof document === 'undefined') return null;
+    const meta = document.querySelector('meta[name="medcheck-user"]');
+    return meta ? meta.content : null;
+  }
+
+  function enqueue(form, author) {
+    const submission = Object.assign({}, form, {
+      client_id: form.client_id || uuid(),
+      captured_at: form.captured_at || new Date().toISOString(),
+      author: author || form.author || currentAuthor()
+    });
+    if (!submission.author) {
+      return Promise.reject(new Error('Sin sesión: no se puede encolar la lista'));
+    }
+    return tx('readwrite', store => store.put(submission)).then(() => {
+      requestBackgroundSync();
+      return submission;
+    });
+  }
+
+  function pending(author) {
+    return tx('readonly', store => store.index('captured_at').getAll())
+      .then(items => author ? items.filter(s => s.author === author) : items);
+  }
+
+  function count(author = currentAuthor()) {
+    return pending(author).then(items => items.length);
+  }
+
+  function remove(ids) {
+    return tx('readwrite', store => ids.forEach(id => store.delete(id)));
+  }
+
+  function notify(detail) {
+    if (global.clients && global.clients.matchAll) {
+      global.clients.matchAll().then(list => list.forEach(c => c.postMessage(Object.assign({ type: 'offline-sync' }, detail))));
+    } else if (global.dispatchEvent && typeof CustomEvent !== 'undefined') {
+      global.dispatchEvent(new CustomEvent('offline-sync', { detail }));
+    }
+  }
+
+  function scheduleRetry() {
+    if (retryTimer || typeof setTimeout === 'undefined') return;
+    // Backoff exponencial con jitter: evita que todos los dispositivos reintenten a la vez
+    const base = Math.min(MAX_BACKOFF_MS, 5000 * Math.pow(2, failures));
+    retryTimer = setTimeout(() => { retryTimer = null; flush(); }, base / 2 + Math.random() * base / 2);
+  }
+
+  async function flushBatches() {
+    const author = currentAuthor();
+    const ajenos = new Set();  // author_mismatch: se conservan para su usuario
+    let synced = 0;
+    for (;;) {
+      const batch = (await pending(author)).filter(s => !ajenos.has(s.client_id)).slice(0, BATCH_SIZE);
+      if (!batch.length) break;
+      const response = await fetch(SYNC_URL, {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ submissions: batch })
+      });
+      if (response.status === 401 || response.status === 403) {
+        // Sesión vencida: se conserva la cola hasta el próximo login
+        notify({ status: 'auth', pending: await count() });
+        return synced;
+      }
+      if (!response.ok) {
+        // Incluye 422 del sobre completo: nunca se descarta el lote, se reintenta
+        throw new Error(`sync HTTP ${response.status}`);
+      }
+      const data = await response.json();
+      // created/duplicate: el servidor ya lo tiene; invalid: sólo ese envío se descarta
+      const invalid = data.results.filter(r => r.status === 'invalid');
+      if (invalid.length) {
+        console.warn('Sync: envíos rechazados por validación', invalid);
+        notify({ status: 'invalid', invalid });
+      }
+      data.results.filter(r => r.status === 'author_mismatch').forEach(r => ajenos.add(r.client_id));
+      await remove(data.results.filter(r => r.status !== 'author_mismatch').map(r => r.client_id).filter(Boolean));
+      synced += data.created;
+    }
+    return synced;
+  }
+
+  function flush() {
+    if (flushing) return flushing;
+    if (global.navigator && global.navigator.onLine === false) return Promise.resolve(0);
+    flushing = flushBatches()
+      .then(synced => {
+        failures = 0;
+        return count().then(left => {
+          if (synced) notify({ status: 'synced', synced, pending: left });
+          return synced;
+        });
+      })
+      .catch(err => {
+        failures += 1;
+        console.warn('Sync pendiente, se reintentará:', err);
+        scheduleRetry();
+        return 0;
+      })
+      .finally(() => { flushing = null; });
+    return flushing;
+  }
+
+  function requestBackgroundSync() {
+    // Background Sync deja que el SW sincronice aunque la pestaña se cierre
+    if (global.navigator && global.navigator.serviceWorker && 'SyncManager' in global) {
+      global.navigator.serviceWorker.ready
+        .then(reg => reg.sync.register(SYNC_TAG))
+        .catch(() => {});
+    }
+  }
+
+  global.MedcheckOfflineQueue = { enqueue, flush, count, currentAuthor, SYNC_TAG };
+
+  // En páginas: sincronizar al cargar y al recuperar conexión
+  if (typeof window !== 'undefined' && global === window) {
+    window.addEventListener('online', () => flush());
+    window.addEventListener('load', () => flush());
+  }
+})(self);
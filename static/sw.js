@@ -1,9 +1,22 @@
 // Service Worker para PWA offline
-const CACHE_NAME = 'medcheck-v1';
+importScripts('/static/js/offline_queue.js');
+
+const CACHE_NAME = 'medcheck-v2';
+const API_CACHE_NAME = 'medcheck-api-v1';
+// APIs de reportes servidas con stale-while-revalidate: sólo las que usan conditional()
+// (ETag/304) y no dependen del usuario. La caché se borra al cerrar sesión (base.html).
+const REPORT_APIS = [
+  '/reports/summary',
+  '/reports/compliance-trends',
+  '/reports/turnos-comparison'
+];
+// Nunca interceptar: streams (SSE), exportes, audio y respuestas por usuario
+const BYPASS = ['/reports/stream', '/reports/export/', '/checklist/export/', '/reports/voice-summary', '/reports/recommendations'];
 const urlsToCache = [
   '/',
   '/static/css/styles.css',
   '/static/js/main.js',
+  '/static/js/offline_queue.js',
   '/static/img/logo.png',
   '/static/img/logo-192.png',
   '/static/img/logo-512.png',
@@ -31,7 +44,7 @@ self.addEventListener('activate', event => {
     caches.keys().then(cacheNames => {
       return Promise.all(
         cacheNames.map(cacheName => {
-          if (cacheName !== CACHE_NAME) {
+          if (cacheName !== CACHE_NAME && cacheName !== API_CACHE_NAME) {
             console.log('🗑️ Service Worker: Eliminando caché antiguo', cacheName);
             return caches.delete(cacheName);
           }
@@ -41,8 +54,51 @@ self.addEventListener('activate', event => {
   );
 });
 
+// Background Sync: vaciar la cola offline de listas de cotejo al volver la conexión
+self.addEventListener('sync', event => {
+  if (event.tag === self.MedcheckOfflineQueue.SYNC_TAG) {
+    event.waitUntil(self.MedcheckOfflineQueue.flush());
+  }
+});
+
+// Stale-while-revalidate: responder con la copia guardada y revalidar en segundo
+// plano. La revalidación pasa por la caché HTTP del navegador, que envía
+// If-None-Match; si el ETag cambió se avisa a las páginas abiertas.
+function staleWhileRevalidate(event) {
+  const request = event.request;
+  const revalidate = caches.open(API_CACHE_NAME).then(cache =>
+    fetch(request).then(response => {
+      if (response && response.status === 200) {
+        return cache.match(request).then(previous => {
+          const before = previous && previous.headers.get('ETag');
+          const after = response.headers.get('ETag');
+          return cache.put(request, response.clone()).then(() => {
+            if (previous && before !== after) {
+              self.clients.matchAll().then(clients => clients.forEach(client =>
+                client.postMessage({ type: 'report-updated', url: request.url })
+              ));
+            }
+            return response;
+          });
+        });
+      }
+      return response;
+    })
+  );
+  event.waitUntil(revalidate.catch(() => {}));
+  return caches.match(request, { cacheName: API_CACHE_NAME }).then(cached => cached || revalidate);
+}
+
 // Estrategia: Network-first con fallback a caché
 self.addEventListener('fetch', event => {
+  const url = new URL(event.request.url);
+  if (event.request.method !== 'GET' || BYPASS.some(p => url.pathname.startsWith(p))) {
+    return;
+  }
+  if (url.origin === self.location.origin && REPORT_APIS.includes(url.pathname)) {
+    event.respondWith(staleWhileRevalidate(event));
+    return;
+  }
   event.respondWith(
     fetch(event.request)
       .then(response => {